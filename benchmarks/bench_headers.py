@@ -0,0 +1,99 @@
+"""
+    Headers benchmarks
+    ~~~~~~~~~~~~~~~~~~
+
+    Measures header lookups on response sized `Headers` objects.  A subclass
+    that restores the previous, linear scan, lookups is included for
+    comparison.  Run from the root of the repository with::
+
+        PYTHONPATH=. python benchmarks/bench_headers.py
+"""
+import timeit
+
+from verktyg import exceptions
+from verktyg.http import Headers
+
+
+class LegacyHeaders(Headers):
+    def __getitem__(self, key, _get_mode=False):
+        if not _get_mode:
+            if isinstance(key, int):
+                return self._list[key]
+            elif isinstance(key, slice):
+                return self.__class__(self._list[key])
+        if not isinstance(key, str):
+            raise exceptions.BadRequestKeyError(key)
+        ikey = key.lower()
+        for k, v in self._list:
+            if k.lower() == ikey:
+                return v
+        if _get_mode:
+            raise KeyError()
+        raise exceptions.BadRequestKeyError(key)
+
+    def getlist(self, key, type=None, as_bytes=False):
+        ikey = key.lower()
+        result = []
+        for k, v in self:
+            if k.lower() == ikey:
+                result.append(v)
+        return result
+
+    def __contains__(self, key):
+        try:
+            self.__getitem__(key, _get_mode=True)
+        except KeyError:
+            return False
+        return True
+
+
+# Headers that are looked up while finalizing a response.  Most of them are
+# not usually present.
+LOOKUPS = [
+    'Location', 'Content-Location', 'Content-Length', 'Content-Type',
+    'Content-Encoding', 'Transfer-Encoding', 'ETag', 'Cache-Control',
+    'Vary', 'Date', 'Last-Modified', 'Expires', 'Set-Cookie',
+    'WWW-Authenticate',
+]
+
+
+def make_headers(headers_class, count):
+    headers = headers_class([
+        ('Content-Type', 'text/html; charset=utf-8'),
+        ('Content-Length', '1024'),
+        ('Set-Cookie', 'session=abc; Path=/'),
+        ('Set-Cookie', 'theme=dark; Path=/'),
+    ])
+    for i in range(count - len(headers)):
+        headers.add('X-Custom-Header-%d' % i, 'value %d' % i)
+    return headers
+
+
+def bench(headers_class, count):
+    headers = make_headers(headers_class, count)
+
+    def run():
+        for key in LOOKUPS:
+            headers.get(key)
+            key in headers
+        headers.getlist('Set-Cookie')
+        headers.set('Content-Length', '2048')
+
+    number = 10000
+    seconds = min(timeit.repeat(run, number=number, repeat=3))
+    return seconds / number * 1000 * 1000
+
+
+def main():
+    for count in [10, 20, 40]:
+        for name, headers_class in [
+            ('legacy', LegacyHeaders),
+            ('indexed', Headers),
+        ]:
+            print('%-4d %-10s %8.2f us/response' % (
+                count, name, bench(headers_class, count),
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+    Response benchmarks
+    ~~~~~~~~~~~~~~~~~~~
+
+    Measures how many small JSON responses per second can be turned into
+    WSGI responses.  A subclass that forces the previous header finalization,
+    which copies the headers before building the WSGI header list, is
+    included for comparison.  Run from the root of the repository with::
+
+        PYTHONPATH=. python benchmarks/bench_responses.py
+"""
+import json
+import timeit
+
+from verktyg.test import create_environ
+from verktyg.responses import BaseResponse
+
+
+class LegacyResponse(BaseResponse):
+    def get_wsgi_headers(self, environ):
+        return super(LegacyResponse, self).get_wsgi_headers(environ)
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+def bench(response_class, extra_headers):
+    environ = create_environ('/api/items/1')
+    body = json.dumps({'id': 1, 'name': 'item', 'tags': ['a', 'b']})
+    headers = [
+        ('X-Header-%d' % i, 'value %d' % i) for i in range(extra_headers)
+    ]
+
+    def run():
+        response = response_class(
+            [body], mimetype='application/json', headers=headers,
+        )
+        for chunk in response(environ, start_response):
+            pass
+
+    number = 20000
+    seconds = min(timeit.repeat(run, number=number, repeat=3))
+    return number / seconds
+
+
+def main():
+    for extra_headers in [0, 10, 30]:
+        for name, response_class in [
+            ('legacy', LegacyResponse),
+            ('fast path', BaseResponse),
+        ]:
+            print('%-3d %-10s %10.0f responses/s' % (
+                extra_headers, name, bench(response_class, extra_headers),
+            ))
+
+
+if __name__ == '__main__':
+    main()
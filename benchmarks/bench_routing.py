@@ -0,0 +1,143 @@
+"""
+    Routing benchmarks
+    ~~~~~~~~~~~~~~~~~~
+
+    Compares the matchers and match cache available to `URLMap` on a map
+    with a large number of routes, and the cost of adding a route to such a
+    map once it is in use.  Run from the root of the repository with::
+
+        PYTHONPATH=. python benchmarks/bench_routing.py
+"""
+import re
+import timeit
+from itertools import count
+
+from verktyg.routing import (
+    URLMap, Route, LinearMatcher, TrieMatcher, RegexMatcher,
+)
+
+
+CONFIGURATIONS = [
+    ('linear', {'matcher_class': LinearMatcher}),
+    ('trie', {'matcher_class': TrieMatcher}),
+    ('regex', {'matcher_class': RegexMatcher}),
+    ('cached', {'matcher_class': LinearMatcher, 'match_cache_size': 1024}),
+]
+
+
+def make_routes(resources=300):
+    for i in range(resources):
+        name = 'resource%d' % i
+        yield Route('/api/v1/%s/' % name, endpoint=name + '/list')
+        yield Route('/api/v1/%s/<int:id>' % name, endpoint=name + '/show')
+        yield Route(
+            '/api/v1/%s/<int:id>/edit' % name, endpoint=name + '/edit',
+        )
+        yield Route(
+            '/api/v1/%s/<int:id>/<any(a, b):kind>' % name,
+            endpoint=name + '/kind',
+        )
+        yield Route(
+            '/api/v1/%s/by-name/<name>' % name, endpoint=name + '/by_name',
+        )
+
+
+def bench_match(options, paths, number=2000):
+    adapter = URLMap(make_routes(), **options).bind('example.com')
+
+    def run():
+        for path in paths:
+            try:
+                adapter.match(path)
+            except Exception:
+                pass
+
+    run()
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def bench_build(number=2000):
+    adapter = URLMap(make_routes()).bind('example.com')
+    builds = [
+        ('resource0/list', {}),
+        ('resource150/show', {'id': 42}),
+        ('resource299/kind', {'id': 42, 'kind': 'a', 'page': 2}),
+    ]
+
+    def run():
+        for endpoint, values in builds:
+            adapter.build(endpoint, values)
+
+    run()
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def bench_build_variants(variants=50, number=2000):
+    routes = [Route('/list/', defaults={'page': 1}, endpoint='list')]
+    for i in range(variants):
+        routes.append(Route(
+            '/variant/<arg%d>/<int:page>' % i, endpoint='list',
+        ))
+    routes.append(Route('/list/<int:page>', endpoint='list'))
+    adapter = URLMap(routes).bind('example.com')
+
+    def run():
+        adapter.build('list', {'page': 2})
+
+    run()
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def bench_startup(options, resources=1000):
+    # `make_routes` creates five routes per resource.
+    def run():
+        re.purge()
+        adapter = URLMap(make_routes(resources), **options).bind('example.com')
+        adapter.match('/api/v1/resource0/')
+
+    return min(timeit.repeat(run, number=1, repeat=3))
+
+
+def bench_add_route(options, resources=600, repeat=20):
+    # `make_routes` creates five routes per resource.
+    router = URLMap(make_routes(resources), **options)
+    adapter = router.bind('example.com')
+    adapter.match('/api/v1/resource0/')
+    counter = count()
+
+    def run():
+        i = next(counter)
+        router.add_routes(Route('/extra/%d' % i, endpoint='extra%d' % i))
+        adapter.match('/extra/%d' % i)
+
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main():
+    cases = [
+        ('first route', ['/api/v1/resource0/']),
+        ('late match', ['/api/v1/resource299/42/edit']),
+        ('miss', ['/api/v2/nothing/here']),
+    ]
+    for case, paths in cases:
+        for name, options in CONFIGURATIONS:
+            seconds = bench_match(options, paths, number=200)
+            print('%-12s %-10s %10.2f us' % (case, name, seconds * 1e6))
+    seconds = bench_build()
+    print('%-12s %-10s %10.2f us' % ('build', '', seconds * 1e6))
+    seconds = bench_build_variants()
+    print('%-12s %-10s %10.2f us' % ('variants', '', seconds * 1e6))
+    for name, options in [
+        ('eager', {}),
+        ('lazy', {'lazy': True}),
+        ('lazy+trie', {'lazy': True, 'matcher_class': TrieMatcher}),
+    ]:
+        seconds = bench_startup(options)
+        print('%-12s %-10s %10.2f ms' % ('startup', name, seconds * 1e3))
+    for name, options in CONFIGURATIONS:
+        seconds = bench_add_route(dict(options, lazy=True))
+        print('%-12s %-10s %10.2f ms' % ('add route', name, seconds * 1e3))
+
+
+if __name__ == '__main__':
+    main()
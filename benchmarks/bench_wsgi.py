@@ -0,0 +1,131 @@
+"""
+    WSGI helper benchmarks
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures the throughput of the line and chunk iterators used to read
+    request bodies.  The previous, `splitlines` based, implementations are
+    included for comparison.  Run from the root of the repository with::
+
+        PYTHONPATH=. python benchmarks/bench_wsgi.py
+"""
+import re
+import timeit
+from io import BytesIO, StringIO
+from itertools import chain
+
+from verktyg.wsgi import (
+    LimitedStream, _make_chunk_iter, make_line_iter, make_chunk_iter,
+)
+
+
+def legacy_make_line_iter(stream, limit=None, buffer_size=10 * 1024):
+    _iter = _make_chunk_iter(stream, limit, buffer_size)
+
+    def _iter_basic_lines():
+        buffer = []
+        while 1:
+            new_data = next(_iter, '')
+            if not new_data:
+                break
+            new_buf = []
+            for item in chain(buffer, new_data.splitlines(True)):
+                new_buf.append(item)
+                if item and item[-1:] in '\r\n':
+                    yield ''.join(new_buf)
+                    new_buf = []
+            buffer = new_buf
+        if buffer:
+            yield ''.join(buffer)
+
+    previous = ''
+    for item in _iter_basic_lines():
+        if item == '\n' and previous[-1:] == '\r':
+            previous += item
+            item = ''
+        if previous:
+            yield previous
+        previous = item
+    if previous:
+        yield previous
+
+
+def legacy_make_chunk_iter(stream, separator, limit=None, buffer_size=10240):
+    _iter = _make_chunk_iter(stream, limit, buffer_size)
+
+    first_item = next(_iter, '')
+    if not first_item:
+        return
+
+    _iter = chain((first_item,), _iter)
+    if isinstance(first_item, str):
+        _split = re.compile(r'(%s)' % re.escape(separator)).split
+        _join = ''.join
+    else:
+        _split = re.compile(b'(' + re.escape(separator) + b')').split
+        _join = b''.join
+
+    buffer = []
+    while 1:
+        new_data = next(_iter, '')
+        if not new_data:
+            break
+        chunks = _split(new_data)
+        new_buf = []
+        for item in chain(buffer, chunks):
+            if item == separator:
+                yield _join(new_buf)
+                new_buf = []
+            else:
+                new_buf.append(item)
+        buffer = new_buf
+    if buffer:
+        yield _join(buffer)
+
+
+def make_body(line_length, size=8 * 1024 * 1024):
+    line = b'x' * (line_length - 2) + b'\r\n'
+    return line * (size // len(line))
+
+
+def bench(func, body, stream_class=BytesIO):
+    def run():
+        stream = LimitedStream(stream_class(body), len(body))
+        for line in func(stream):
+            pass
+
+    seconds = min(timeit.repeat(run, number=1, repeat=3))
+    return len(body) / seconds / 1024 / 1024
+
+
+def main():
+    for line_length in [80, 1024, 64 * 1024]:
+        body = make_body(line_length)
+        text = body.decode('ascii')
+        cases = [
+            ('legacy lines (str)', legacy_make_line_iter, text, StringIO),
+            ('lines (str)', make_line_iter, text, StringIO),
+            ('lines', make_line_iter, body, BytesIO),
+            (
+                'lines (memoryview)',
+                lambda s: make_line_iter(s, as_memoryview=True),
+                body, BytesIO,
+            ),
+            (
+                'legacy chunks',
+                lambda s: legacy_make_chunk_iter(s, b'\r\n'),
+                body, BytesIO,
+            ),
+            ('chunks', lambda s: make_chunk_iter(s, b'\r\n'), body, BytesIO),
+            (
+                'chunks (memoryview)',
+                lambda s: make_chunk_iter(s, b'\r\n', as_memoryview=True),
+                body, BytesIO,
+            ),
+        ]
+        for name, func, data, stream_class in cases:
+            throughput = bench(func, data, stream_class)
+            print('%-8d %-20s %10.1f MB/s' % (line_length, name, throughput))
+
+
+if __name__ == '__main__':
+    main()
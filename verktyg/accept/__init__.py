@@ -12,17 +12,30 @@
 import functools
 
 from verktyg.accept.content_type import (
-    parse_content_type_header, parse_accept_header
+    parse_content_type_header, parse_accept_header,
+    parse_accept_header_cached,
 )
 from verktyg.accept.language import (
     parse_language_header, parse_accept_language_header,
+    parse_accept_language_header_cached,
 )
 from verktyg.accept.charset import (
     parse_charset_header, parse_accept_charset_header,
+    parse_accept_charset_header_cached,
 )
 
 from verktyg.exceptions import NotAcceptable
 
+__all__ = [
+    'Acceptability', 'Representation', 'select_representation',
+    'parse_content_type_header', 'parse_accept_header',
+    'parse_accept_header_cached',
+    'parse_language_header', 'parse_accept_language_header',
+    'parse_accept_language_header_cached',
+    'parse_charset_header', 'parse_accept_charset_header',
+    'parse_accept_charset_header_cached',
+]
+
 
 @functools.total_ordering
 class Acceptability(object):
@@ -89,17 +102,19 @@ def select_representation(
     if accept is None:
         accept = '*/*'
     if isinstance(accept, str):
-        accept = parse_accept_header(accept)
+        accept = parse_accept_header_cached(accept)
 
     if accept_language is None:
         accept_language = '*'
     if isinstance(accept_language, str):
-        accept_language = parse_accept_language_header(accept_language)
+        accept_language = parse_accept_language_header_cached(
+            accept_language
+        )
 
     if accept_charset is None:
         accept_charset = '*'
     if isinstance(accept_charset, str):
-        accept_charset = parse_accept_charset_header(accept_charset)
+        accept_charset = parse_accept_charset_header_cached(accept_charset)
 
     for representation in representations:
         try:
@@ -10,7 +10,7 @@
 import re
 import functools
 
-from verktyg.datastructures import ImmutableDict
+from verktyg.datastructures import ImmutableDict, LRUCache
 from verktyg.exceptions import NotAcceptable
 
 
@@ -97,12 +97,12 @@ class Accept(object):
     range_type = None
 
     def __init__(self, options):
-        self._options = []
-        for option in options:
-            if isinstance(option, str):
-                option = (option,)
-
-            self._options.append(self.range_type(*option))
+        # immutable so that parsed headers can be shared between requests.
+        self._options = tuple(
+            self.range_type(option) if isinstance(option, str)
+            else self.range_type(*option)
+            for option in options
+        )
 
     def __iter__(self):
         return iter(self._options)
@@ -244,3 +244,41 @@ def split_accept_string(string):
         q = params.pop('q', '1.0')
 
         yield accept.strip(), q, params
+
+
+class ParserCache(object):
+    """Wraps a header parsing function to reuse the objects it returned for
+    header strings that have been seen recently.  The parsed objects are
+    immutable so can be shared between requests.
+
+    To stop clients from flushing the cache by sending a different header
+    with every request, a header is only cached the second time it is seen
+    within the last `maxsize` distinct headers, and headers longer than
+    `max_length` are never cached.
+
+    :param parse:
+        A function taking a header string and returning the parsed header.
+    :param maxsize:
+        The maximum number of parsed headers to keep.
+    :param max_length:
+        The length of the longest header that will be cached.
+    """
+
+    def __init__(self, parse, maxsize=256, max_length=512):
+        self.parse = parse
+        self.max_length = max_length
+        self.cache = LRUCache(maxsize)
+        self._seen = LRUCache(maxsize)
+
+    def __call__(self, string):
+        result = self.cache.get(string)
+        if result is not None:
+            return result
+
+        result = self.parse(string)
+        if len(string) <= self.max_length:
+            if string in self._seen:
+                self.cache.set(string, result)
+            else:
+                self._seen.set(string, True)
+        return result
@@ -42,5 +42,12 @@ def parse_accept_charset_header(string):
     return CharsetAccept(_base.split_accept_string(string))
 
 
+#: Like `parse_accept_charset_header` but reuses the objects returned for
+#: recently seen headers.
+parse_accept_charset_header_cached = _base.ParserCache(
+    parse_accept_charset_header
+)
+
+
 def parse_charset_header(string):
     return Charset(string)
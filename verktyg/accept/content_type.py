@@ -143,6 +143,13 @@ def parse_accept_header(string):
     return ContentTypeAccept(_base.split_accept_string(string))
 
 
+#: Like `parse_accept_header` but reuses the objects returned for
+#: recently seen headers.
+parse_accept_header_cached = _base.ParserCache(
+    parse_accept_header
+)
+
+
 def parse_content_type_header(string, qs=None):
     """Creates a new `ContentType` object from a mime type string.
     """
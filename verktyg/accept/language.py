@@ -74,5 +74,12 @@ def parse_accept_language_header(string):
     return LanguageAccept(_base.split_accept_string(string))
 
 
+#: Like `parse_accept_language_header` but reuses the objects returned for
+#: recently seen headers.
+parse_accept_language_header_cached = _base.ParserCache(
+    parse_accept_language_header
+)
+
+
 def parse_language_header(string):
     return Language(string)
@@ -18,6 +18,8 @@ from verktyg.routing import URLMap, Route, RequestRedirect
 from verktyg.dispatch import Dispatcher
 from verktyg.views import expose
 from verktyg.requests import BaseRequest
+from verktyg.responses import BaseResponse
+from verktyg.wsgi import ClosingIterator
 from verktyg import requests
 
 
@@ -34,6 +36,10 @@ class BaseApplication(object):
         self.config = ImmutableDict(config)
 
         self._url_map = URLMap(routes, converters=converters)
+        # finish preparing the router now, rather than on the first request,
+        # so that it is shared by workers forked after the application is
+        # created.
+        self._url_map.compile_routes()
         root_components = urlparse(app_root)
         self._map_adapter = self._url_map.bind(
             url_scheme=root_components.scheme,
@@ -87,9 +93,40 @@ class BaseApplication(object):
             return handler(self, request, exc_type, exc_value, exc_traceback)
 
     def _wsgi_inner(self, wsgi_env, start_response):
-        with self.request_class(wsgi_env) as request:
-            with self._get_response(request) as response:
-                yield from response(wsgi_env, start_response)
+        request = self.request_class(wsgi_env)
+        try:
+            response = self._get_response(request)
+        except BaseException:
+            request.close()
+            raise
+
+        def close():
+            try:
+                response.close()
+            finally:
+                request.close()
+
+        try:
+            if (
+                type(response).__call__ is not BaseResponse.__call__ or
+                not response.is_sequence or response.direct_passthrough
+            ):
+                return ClosingIterator(
+                    response(wsgi_env, start_response), close,
+                )
+
+            # The body is already in memory so there is no reason to keep
+            # the request and response open until the server gets round to
+            # closing the iterable.  Hand it over as a single chunk.
+            app_iter, status, headers = response.get_wsgi_response(wsgi_env)
+            body = b''.join(app_iter)
+        except BaseException:
+            close()
+            raise
+
+        close()
+        start_response(status, headers)
+        return [body] if body else []
 
     def __call__(self, wsgi_env, start_response):
         wsgi_env['verktyg.application'] = self
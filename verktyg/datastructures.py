@@ -10,8 +10,10 @@
         BSD, see LICENSE for more details.
 """
 import re
+import threading
 from copy import deepcopy
 from itertools import repeat
+from collections import OrderedDict
 
 from verktyg import exceptions
 
@@ -1009,3 +1011,74 @@ class CallbackDict(UpdateDictMixin, dict):
             self.__class__.__name__,
             dict.__repr__(self)
         )
+
+
+class LRUCache(object):
+    """A thread safe mapping that holds at most `maxsize` items, discarding
+    the least recently used item when a new one is added to a full cache.
+
+    The number of successful and failed lookups are counted in the `hits`
+    and `misses` attributes, which can be used to pick a suitable size.
+
+    :param maxsize:
+        The maximum number of items to keep.
+    """
+
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least one')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for `key` and mark it as recently used, or return
+        `default` if the key is not in the cache.
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store `value` under `key`, evicting the least recently used item
+        if the cache is full.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all items from the cache.  The counters are not reset."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s size=%d maxsize=%d hits=%d misses=%d>' % (
+            self.__class__.__name__, len(self), self.maxsize,
+            self.hits, self.misses,
+        )
@@ -5,7 +5,8 @@
     :copyright: (c) 2014 by Ben Mather.
     :license: BSD, see LICENSE for more details.
 """
-from verktyg.exceptions import NotImplemented, MethodNotAllowed
+from verktyg.datastructures import LRUCache
+from verktyg.exceptions import NotImplemented, MethodNotAllowed, NotAcceptable
 from verktyg.accept import Representation, select_representation
 
 
@@ -72,10 +73,28 @@ class Binding(BindingFactory, Representation):
 
 
 class Dispatcher(BindingFactory):
-    def __init__(self, views=[]):
+    """Selects the binding to handle a request from its endpoint, method and
+    accept headers.
+
+    Clients tend to send only a handful of distinct accept headers so the
+    outcome of a lookup is cached, keyed on the endpoint, the method and the
+    raw header strings.  The cache is an `LRUCache`, available as `cache`,
+    and is cleared whenever bindings are added.
+
+    :param views:
+        An iterable of binding factories to add to the dispatcher.
+    :param cache_size:
+        The maximum number of lookup results to cache.  Set to `None` to
+        disable caching.
+    """
+    def __init__(self, views=[], cache_size=1024):
         self._index = {}
         self._views = []
 
+        self.cache = None
+        if cache_size:
+            self.cache = LRUCache(cache_size)
+
         for view in views:
             self.add_bindings(view)
 
@@ -97,6 +116,9 @@ class Dispatcher(BindingFactory):
 
                 self._views.append(view)
 
+        if self.cache is not None:
+            self.cache.clear()
+
     def get_bindings(self):
         return iter(self._views)
 
@@ -104,6 +126,29 @@ class Dispatcher(BindingFactory):
         self, name, method='GET',
         accept='*/*', accept_language=None, accept_charset=None,
     ):
+        if self.cache is None or not all(
+            header is None or isinstance(header, str)
+            for header in (accept, accept_language, accept_charset)
+        ):
+            return self._lookup(
+                name, method, accept, accept_language, accept_charset,
+            )
+
+        key = (name, method, accept, accept_language, accept_charset)
+        result = self.cache.get(key)
+        if result is None:
+            try:
+                result = self._lookup(*key), None
+            except (NotImplemented, MethodNotAllowed, NotAcceptable) as e:
+                result = None, e.__class__
+            self.cache.set(key, result)
+
+        binding, error = result
+        if error is not None:
+            raise error()
+        return binding
+
+    def _lookup(self, name, method, accept, accept_language, accept_charset):
         with_name = self._index.get(name)
         if name not in self._index:
             raise NotImplemented()
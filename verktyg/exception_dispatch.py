@@ -5,10 +5,14 @@
     :copyright: (c) 2014 by Ben Mather.
     :license: BSD, see LICENSE for more details.
 """
+from verktyg.datastructures import LRUCache
 from verktyg.exceptions import NotAcceptable
 from verktyg.accept import Representation, select_representation
 
 
+_missing = object()
+
+
 class ExceptionHandlerFactory(object):
     def get_exception_handlers(self):
         raise NotImplementedError()
@@ -53,9 +57,30 @@ class ExceptionHandler(ExceptionHandlerFactory, Representation):
 
 
 class ExceptionDispatcher(ExceptionHandlerFactory):
-    def __init__(self, handlers=[]):
+    """Selects the handler used to render an exception.
+
+    The handlers that apply to each exception class are worked out from its
+    method resolution order the first time it is looked up, and the outcome
+    of negotiating a representation is cached in an `LRUCache`, available as
+    `cache`, keyed on the exception class and the raw accept headers.  Both
+    are kept in caches of at most `cache_size` entries and are discarded
+    whenever handlers are added.
+
+    :param handlers:
+        An iterable of exception handler factories.
+    :param cache_size:
+        The maximum number of exception classes and of lookup results to
+        cache.  Set to `None` to disable caching.
+    """
+    def __init__(self, handlers=[], cache_size=1024):
         self._handlers = {}
 
+        self.cache = None
+        self._chains = None
+        if cache_size:
+            self.cache = LRUCache(cache_size)
+            self._chains = LRUCache(cache_size)
+
         self.add_exception_handlers(*handlers)
 
     def add_exception_handlers(self, *factories):
@@ -76,6 +101,10 @@ class ExceptionDispatcher(ExceptionHandlerFactory):
                     self._handlers[handler.exception_class] = []
                 self._handlers[handler.exception_class].append(handler)
 
+        if self.cache is not None:
+            self.cache.clear()
+            self._chains.clear()
+
     def get_exception_handlers(self):
         return iter(self._handlers)
 
@@ -102,14 +131,43 @@ class ExceptionDispatcher(ExceptionHandlerFactory):
             A callable object accepting am application object, a request, and
             an exception and returning a verktyg response
         """
+        if self.cache is None or not all(
+            header is None or isinstance(header, str)
+            for header in (accept, accept_language, accept_charset)
+        ):
+            return self._lookup(
+                exception_class, accept, accept_language, accept_charset,
+            )
+
+        key = (exception_class, accept, accept_language, accept_charset)
+        action = self.cache.get(key, _missing)
+        if action is _missing:
+            action = self._lookup(*key)
+            self.cache.set(key, action)
+        return action
+
+    def _get_chain(self, exception_class):
+        if self._chains is not None:
+            chain = self._chains.get(exception_class)
+            if chain is not None:
+                return chain
+
         # Use the method resolution order of the exception to rank handlers
-        for cls in exception_class.mro():
-            if cls not in self._handlers:
-                continue
+        chain = tuple(
+            self._handlers[cls] for cls in exception_class.mro()
+            if cls in self._handlers
+        )
+        if self._chains is not None:
+            self._chains.set(exception_class, chain)
+        return chain
 
+    def _lookup(
+        self, exception_class, accept, accept_language, accept_charset,
+    ):
+        for handlers in self._get_chain(exception_class):
             try:
                 handler = select_representation(
-                    self._handlers[cls],
+                    handlers,
                     accept=accept,
                     accept_language=accept_language,
                     accept_charset=accept_charset
@@ -0,0 +1,541 @@
+"""
+    verktyg.formparser
+    ~~~~~~~~~~~~~~~~~~
+
+    This module implements the form parsing.  Multipart bodies are parsed
+    incrementally from the input stream so that large uploads are never
+    buffered in memory in their entirety.
+
+    :copyright:
+        (c) 2017 Ben Mather, based on Werkzeug, see AUTHORS for more details.
+    :license:
+        BSD, see LICENSE for more details.
+"""
+import re
+from tempfile import SpooledTemporaryFile
+from urllib.parse import unquote_to_bytes
+
+from verktyg.datastructures import MultiDict
+from verktyg.http import Headers, FileStorage, parse_options_header
+from verktyg.wsgi import get_input_stream, get_content_length
+from verktyg.exceptions import RequestEntityTooLarge
+
+
+_multipart_boundary_re = re.compile('^[ -~]{0,200}[!-~]$')
+
+# Events emitted by `MultiPartParser._iter_events`.
+_begin_part = 'begin'
+_part_data = 'data'
+_end_part = 'end'
+
+# Size of the blocks read from the input stream.
+_buffer_size = 64 * 1024
+
+# Parser states.
+_preamble = 0
+_boundary = 1
+_headers = 2
+_body = 3
+_epilogue = 4
+
+
+def default_stream_factory(
+    total_content_length, filename, content_type, content_length=None,
+):
+    """The stream factory that is used per default.  Uploaded files are
+    kept in memory until they grow past 500KB at which point they are
+    rolled over to a temporary file on disk.
+    """
+    return SpooledTemporaryFile(max_size=1024 * 500, mode='wb+')
+
+
+def _iter_urlencoded(stream, max_size=None, buffer_size=_buffer_size):
+    """Reads an url encoded body from `stream` one block at a time and
+    yields the raw `&` separated pairs.  At most one incomplete pair is kept
+    buffered between reads.
+    """
+    total = 0
+    buf = bytearray()
+    while True:
+        chunk = stream.read(buffer_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_size is not None and total > max_size:
+            raise RequestEntityTooLarge()
+
+        # Only the new block is searched so that a single long value does
+        # not result in the buffer being scanned over and over again.
+        index = chunk.rfind(b'&')
+        if index == -1:
+            buf += chunk
+            continue
+        buf += chunk[:index]
+        for pair in bytes(buf).split(b'&'):
+            if pair:
+                yield pair
+        buf = bytearray(chunk[index + 1:])
+    if buf:
+        yield bytes(buf)
+
+
+def _url_unquote_plus(value, charset, errors):
+    return unquote_to_bytes(
+        value.replace(b'+', b' ')
+    ).decode(charset, errors)
+
+
+def parse_form_data(
+    environ, stream_factory=None, charset='utf-8', errors='replace',
+    max_form_memory_size=None, max_content_length=None, cls=None,
+    silent=True, max_form_parts=None,
+):
+    """Parse the form data in the environ and return it as tuple in the form
+    ``(stream, form, files)``.  You should only call this method if the
+    transport method is `POST`, `PUT`, or `PATCH`.
+
+    If the mimetype of the data transmitted is `multipart/form-data` the
+    files multidict will be filled with `FileStorage` objects.  If the
+    mimetype is unknown the input stream is wrapped and returned as first
+    argument, else the stream is empty.
+
+    :param environ:
+        The WSGI environment to be used for parsing.
+    :param stream_factory:
+        An optional callable that returns a new read and writeable file
+        descriptor.  This callable works the same as
+        :func:`default_stream_factory`.
+    :param charset:
+        The character set for URL and url encoded form data.
+    :param errors:
+        The encoding error behavior.
+    :param max_form_memory_size:
+        The maximum number of bytes to be accepted for in-memory stored form
+        data.  If the data exceeds the value specified an
+        :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception is raised.
+    :param max_content_length:
+        If this is provided and the transmitted data is longer than this
+        value an :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception
+        is raised.
+    :param cls:
+        An optional dict class to use.  If this is not specified or `None`
+        the default :class:`MultiDict` is used.
+    :param silent:
+        If set to False parsing errors will not be caught.
+    :param max_form_parts:
+        The maximum number of fields and files that will be accepted.  If
+        more are transmitted an
+        :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception is raised.
+    :return:
+        A tuple in the form ``(stream, form, files)``.
+    """
+    return FormDataParser(
+        stream_factory, charset, errors, max_form_memory_size,
+        max_content_length, cls, silent, max_form_parts,
+    ).parse_from_environ(environ)
+
+
+def is_valid_multipart_boundary(boundary):
+    """Checks if the string given is a valid multipart boundary."""
+    return _multipart_boundary_re.match(boundary) is not None
+
+
+class FormDataParser(object):
+    """This class implements parsing of form data.  It can be subclassed and
+    extended but for most mimetypes it is a better idea to use the untouched
+    stream and expose it as separate attributes on a request object.
+
+    :param stream_factory:
+        An optional callable that returns a new read and writeable file
+        descriptor.  This callable works the same as
+        :func:`default_stream_factory`.
+    :param charset:
+        The character set for URL and url encoded form data.
+    :param errors:
+        The encoding error behavior.
+    :param max_form_memory_size:
+        The maximum number of bytes to be accepted for in-memory stored form
+        data.
+    :param max_content_length:
+        If this is provided and the transmitted data is longer than this
+        value an :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception
+        is raised.
+    :param cls:
+        An optional dict class to use.  If this is not specified or `None`
+        the default :class:`MultiDict` is used.
+    :param silent:
+        If set to False parsing errors will not be caught.
+    :param max_form_parts:
+        The maximum number of fields and files that will be accepted.
+    """
+
+    def __init__(
+        self, stream_factory=None, charset='utf-8', errors='replace',
+        max_form_memory_size=None, max_content_length=None, cls=None,
+        silent=True, max_form_parts=None,
+    ):
+        if stream_factory is None:
+            stream_factory = default_stream_factory
+        self.stream_factory = stream_factory
+        self.charset = charset
+        self.errors = errors
+        self.max_form_memory_size = max_form_memory_size
+        self.max_content_length = max_content_length
+        if cls is None:
+            cls = MultiDict
+        self.cls = cls
+        self.silent = silent
+        self.max_form_parts = max_form_parts
+
+    def get_parse_func(self, mimetype, options):
+        return self.parse_functions.get(mimetype)
+
+    def parse_from_environ(self, environ):
+        """Parses the information from the environment as form data.
+
+        :param environ:
+            The WSGI environment to be used for parsing.
+        :return:
+            A tuple in the form ``(stream, form, files)``.
+        """
+        content_type = environ.get('CONTENT_TYPE', '')
+        content_length = get_content_length(environ)
+        mimetype, options = parse_options_header(content_type)
+        return self.parse(
+            get_input_stream(environ), mimetype, content_length, options,
+        )
+
+    def parse(self, stream, mimetype, content_length, options=None):
+        """Parses the information from the given stream, mimetype,
+        content length and mimetype parameters.
+
+        :param stream:
+            An input stream
+        :param mimetype:
+            The mimetype of the data
+        :param content_length:
+            The content length of the incoming data
+        :param options:
+            Optional mimetype parameters (used for the multipart boundary for
+            instance)
+        :return:
+            A tuple in the form ``(stream, form, files)``.
+        """
+        if (
+            self.max_content_length is not None and
+            content_length is not None and
+            content_length > self.max_content_length
+        ):
+            raise RequestEntityTooLarge()
+        if options is None:
+            options = {}
+
+        parse_func = self.get_parse_func(mimetype, options)
+        if parse_func is not None:
+            try:
+                return parse_func(
+                    self, stream, mimetype, content_length, options,
+                )
+            except ValueError:
+                if not self.silent:
+                    raise
+
+        return stream, self.cls(), self.cls()
+
+    def _parse_multipart(self, stream, mimetype, content_length, options):
+        parser = MultiPartParser(
+            self.stream_factory, self.charset, self.errors,
+            max_form_memory_size=self.max_form_memory_size,
+            max_content_length=self.max_content_length,
+            max_form_parts=self.max_form_parts,
+            cls=self.cls,
+        )
+        boundary = options.get('boundary')
+        if boundary is None:
+            raise ValueError('Missing boundary')
+        if not is_valid_multipart_boundary(boundary):
+            raise ValueError('Invalid boundary: %s' % boundary)
+        form, files = parser.parse(
+            stream, boundary.encode('ascii'), content_length,
+        )
+        return stream, form, files
+
+    def _parse_urlencoded(self, stream, mimetype, content_length, options):
+        max_size = self.max_form_memory_size
+        if (
+            max_size is not None and
+            content_length is not None and
+            content_length > max_size
+        ):
+            raise RequestEntityTooLarge()
+
+        max_form_parts = self.max_form_parts
+        charset = self.charset
+        errors = self.errors
+
+        form = []
+        for pair in _iter_urlencoded(stream, max_size):
+            if max_form_parts is not None and len(form) >= max_form_parts:
+                raise RequestEntityTooLarge()
+            key, sep, value = pair.partition(b'=')
+            form.append((
+                _url_unquote_plus(key, charset, errors),
+                _url_unquote_plus(value, charset, errors),
+            ))
+        return stream, self.cls(form), self.cls()
+
+    parse_functions = {
+        'multipart/form-data': _parse_multipart,
+        'application/x-www-form-urlencoded': _parse_urlencoded,
+        'application/x-url-encoded': _parse_urlencoded,
+    }
+
+
+class MultiPartParser(object):
+    """Incremental parser for `multipart/form-data` request bodies.
+
+    The input stream is read in blocks of `buffer_size` bytes and only the
+    part of the body that could still contain a boundary is kept buffered.
+    Regular fields are collected in memory, subject to
+    `max_form_memory_size`, while the contents of uploaded files are written
+    straight into the streams returned by `stream_factory` as they arrive.
+
+    :param stream_factory:
+        Callable used to create the streams that uploaded files are written
+        to.  See :func:`default_stream_factory`.
+    :param charset:
+        The character set used to decode field values and part headers.
+    :param errors:
+        The encoding error behavior.
+    :param max_form_memory_size:
+        The maximum number of bytes of non-file fields that will be held in
+        memory.
+    :param max_content_length:
+        The maximum number of bytes that will be read from the stream.  Only
+        needed if the stream is not already limited to the content length.
+    :param max_form_parts:
+        The maximum number of parts that will be accepted.
+    :param cls:
+        The dict class to return the form and files in.
+    :param buffer_size:
+        The number of bytes to read from the input stream at a time.
+    """
+
+    #: The maximum size of the header block of a single part.
+    max_header_size = 8 * 1024
+
+    def __init__(
+        self, stream_factory=None, charset='utf-8', errors='replace',
+        max_form_memory_size=None, max_content_length=None, cls=None,
+        buffer_size=_buffer_size, max_form_parts=None,
+    ):
+        if stream_factory is None:
+            stream_factory = default_stream_factory
+        self.stream_factory = stream_factory
+        self.charset = charset
+        self.errors = errors
+        self.max_form_memory_size = max_form_memory_size
+        self.max_content_length = max_content_length
+        self.max_form_parts = max_form_parts
+        if cls is None:
+            cls = MultiDict
+        self.cls = cls
+
+        # The buffer needs to be able to hold a complete boundary.
+        assert buffer_size >= 1024, 'buffer size has to be at least 1KB'
+        self.buffer_size = buffer_size
+
+    def fail(self, message):
+        raise ValueError(message)
+
+    def parse_headers(self, data):
+        """Parses the header block of a single part into a
+        :class:`~verktyg.http.Headers` object.
+        """
+        headers = []
+        for line in data.decode(self.charset, self.errors).split('\r\n'):
+            if line[:1] in (' ', '\t') and headers:
+                # Folded header.  Append to previous value.
+                key, value = headers[-1]
+                headers[-1] = (key, value + ' ' + line.strip())
+                continue
+            key, sep, value = line.partition(':')
+            if not sep:
+                self.fail('Invalid part header: %r' % line)
+            headers.append((key.strip(), value.strip()))
+        return Headers(headers)
+
+    def _iter_events(self, stream, boundary):
+        """Reads the multipart body from `stream` and generates a sequence of
+        ``(event, value)`` tuples.  Each part produces a `_begin_part` event
+        with the part headers, any number of `_part_data` events carrying a
+        slice of the part body and finally an `_end_part` event.
+        """
+        delimiter = b'\r\n--' + boundary
+        delimiter_length = len(delimiter)
+        buffer_size = self.buffer_size
+        max_content_length = self.max_content_length
+        max_header_size = self.max_header_size
+
+        # The leading line break allows the first boundary to be matched
+        # using the same delimiter as the following ones.
+        buf = bytearray(b'\r\n')
+        total = 0
+        state = _preamble
+
+        while True:
+            chunk = stream.read(buffer_size)
+            if chunk:
+                total += len(chunk)
+                if max_content_length is not None:
+                    if total > max_content_length:
+                        raise RequestEntityTooLarge()
+                buf += chunk
+
+            while True:
+                if state == _body:
+                    index = buf.find(delimiter)
+                    if index == -1:
+                        # Keep enough of the tail of the buffer around to
+                        # match a delimiter that is split across reads.
+                        flush = len(buf) - delimiter_length + 1
+                        if flush > 0:
+                            yield _part_data, buf[:flush]
+                            del buf[:flush]
+                        break
+                    if index:
+                        yield _part_data, buf[:index]
+                    del buf[:index + delimiter_length]
+                    yield _end_part, None
+                    state = _boundary
+
+                elif state == _preamble:
+                    index = buf.find(delimiter)
+                    if index == -1:
+                        discard = len(buf) - delimiter_length + 1
+                        if discard > 0:
+                            del buf[:discard]
+                        break
+                    del buf[:index + delimiter_length]
+                    state = _boundary
+
+                elif state == _boundary:
+                    if buf[:2] == b'--':
+                        state = _epilogue
+                        break
+                    index = buf.find(b'\r\n')
+                    if index == -1:
+                        if len(buf) > max_header_size:
+                            self.fail('Invalid boundary')
+                        break
+                    # The boundary may be followed by transport padding.
+                    if buf[:index].strip(b' \t'):
+                        self.fail('Invalid boundary')
+                    del buf[:index + 2]
+                    state = _headers
+
+                elif state == _headers:
+                    if buf[:2] == b'\r\n':
+                        index = 0
+                    else:
+                        index = buf.find(b'\r\n\r\n')
+                        if index == -1:
+                            if len(buf) > max_header_size:
+                                self.fail('Part headers too large')
+                            break
+                    headers = self.parse_headers(bytes(buf[:index]))
+                    del buf[:index + (2 if index == 0 else 4)]
+                    yield _begin_part, headers
+                    state = _body
+
+                else:
+                    break
+
+            if state == _epilogue:
+                # Whatever is left of the stream is discarded.
+                return
+            if not chunk:
+                self.fail('Unexpected end of form data')
+
+    def parse(self, stream, boundary, content_length):
+        """Parses a multipart body.
+
+        :param stream:
+            The stream to read the body from.
+        :param boundary:
+            The multipart boundary as a bytestring.
+        :param content_length:
+            The total length of the body if known.  Passed on to the stream
+            factory.
+        :return:
+            A tuple in the form ``(form, files)``.
+        """
+        max_form_memory_size = self.max_form_memory_size
+        max_form_parts = self.max_form_parts
+        in_memory = 0
+        parts = 0
+
+        form = []
+        files = []
+        container = None
+        is_file = False
+        try:
+            for event, value in self._iter_events(stream, boundary):
+                if event == _part_data:
+                    if is_file:
+                        container.write(value)
+                    else:
+                        in_memory += len(value)
+                        if (
+                            max_form_memory_size is not None and
+                            in_memory > max_form_memory_size
+                        ):
+                            raise RequestEntityTooLarge()
+                        container += value
+
+                elif event == _begin_part:
+                    parts += 1
+                    if max_form_parts is not None and parts > max_form_parts:
+                        raise RequestEntityTooLarge()
+
+                    headers = value
+                    disposition, extra = parse_options_header(
+                        headers.get('content-disposition')
+                    )
+                    if disposition != 'form-data':
+                        self.fail('Invalid content disposition')
+                    name = extra.get('name')
+                    filename = extra.get('filename')
+
+                    is_file = filename is not None
+                    if is_file:
+                        container = self.stream_factory(
+                            total_content_length=content_length,
+                            filename=filename,
+                            content_type=headers.get('content-type'),
+                            content_length=headers.get(
+                                'content-length', type=int,
+                            ),
+                        )
+                    else:
+                        container = bytearray()
+
+                else:
+                    if is_file:
+                        container.seek(0)
+                        files.append((name, FileStorage(
+                            container, filename, name, headers=headers,
+                        )))
+                    else:
+                        form.append((name, container.decode(
+                            self.charset, self.errors,
+                        )))
+                    container = None
+        except BaseException:
+            if is_file and container is not None:
+                container.close()
+            for name, storage in files:
+                storage.close()
+            raise
+
+        return self.cls(form), self.cls(files)
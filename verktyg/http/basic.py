@@ -150,12 +150,26 @@ class Headers(object):
 
     def __init__(self, defaults=None):
         self._list = []
+        # Maps lower case header names to the list of their values in order.
+        # Set to `None` whenever the list is changed in a way that is not
+        # cheap to track and rebuilt on the next lookup.
+        self._index = {}
         if defaults is not None:
             if isinstance(defaults, (list, Headers)):
                 self._list.extend(defaults)
+                self._index = None
             else:
                 self.extend(defaults)
 
+    def _get_index(self):
+        index = self._index
+        if index is None:
+            index = {}
+            for key, value in self._list:
+                index.setdefault(key.lower(), []).append(value)
+            self._index = index
+        return index
+
     def __getitem__(self, key, _get_mode=False):
         if not _get_mode:
             if isinstance(key, int):
@@ -164,10 +178,9 @@ class Headers(object):
                 return self.__class__(self._list[key])
         if not isinstance(key, str):
             raise exceptions.BadRequestKeyError(key)
-        ikey = key.lower()
-        for k, v in self._list:
-            if k.lower() == ikey:
-                return v
+        values = self._get_index().get(key.lower())
+        if values is not None:
+            return values[0]
         # micro optimization: if we are in get mode we will catch that
         # exception one stack level down so we can raise a standard
         # key error instead of our special one.
@@ -240,18 +253,19 @@ class Headers(object):
         :return:
             A :class:`list` of all the values for the key.
         """
-        ikey = key.lower()
+        values = self._get_index().get(key.lower(), ())
+        if not as_bytes and type is None:
+            return list(values)
         result = []
-        for k, v in self:
-            if k.lower() == ikey:
-                if as_bytes:
-                    v = v.encode('latin1')
-                if type is not None:
-                    try:
-                        v = type(v)
-                    except ValueError:
-                        continue
-                result.append(v)
+        for v in values:
+            if as_bytes:
+                v = v.encode('latin1')
+            if type is not None:
+                try:
+                    v = type(v)
+                except ValueError:
+                    continue
+            result.append(v)
         return result
 
     def get_all(self, name):
@@ -294,8 +308,11 @@ class Headers(object):
     def __delitem__(self, key, _index_operation=True):
         if _index_operation and isinstance(key, (int, slice)):
             del self._list[key]
+            self._index = None
             return
         key = key.lower()
+        if self._get_index().pop(key, None) is None:
+            return
         new = []
         for k, v in self._list:
             if k.lower() != key:
@@ -321,9 +338,11 @@ class Headers(object):
             An item.
         """
         if key is None:
-            return self._list.pop()
+            key = -1
         if isinstance(key, int):
-            return self._list.pop(key)
+            rv = self._list.pop(key)
+            self._index = None
+            return rv
         try:
             rv = self[key]
             self.remove(key)
@@ -339,11 +358,9 @@ class Headers(object):
 
     def __contains__(self, key):
         """Check if a key is present."""
-        try:
-            self.__getitem__(key, _get_mode=True)
-        except KeyError:
+        if not isinstance(key, str):
             return False
-        return True
+        return key.lower() in self._get_index()
 
     has_key = __contains__
 
@@ -372,6 +389,8 @@ class Headers(object):
         _value = unicodify_header_value(_value)
         self._validate_value(_value)
         self._list.append((_key, _value))
+        if self._index is not None:
+            self._index.setdefault(_key.lower(), []).append(_value)
 
     def _validate_value(self, value):
         if not isinstance(value, str):
@@ -393,6 +412,7 @@ class Headers(object):
     def clear(self):
         """Clears all headers."""
         del self._list[:]
+        self._index = {}
 
     def set(self, _key, _value, **kw):
         """Remove all header tuples for `key` and add a new one.  The newly
@@ -412,20 +432,23 @@ class Headers(object):
             _value = _options_header_vkw(_value, kw)
         _value = unicodify_header_value(_value)
         self._validate_value(_value)
-        if not self._list:
+        ikey = _key.lower()
+        index = self._get_index()
+        if ikey not in index:
             self._list.append((_key, _value))
+            index[ikey] = [_value]
             return
         listiter = iter(self._list)
-        ikey = _key.lower()
         for idx, (old_key, old_value) in enumerate(listiter):
             if old_key.lower() == ikey:
                 # replace first ocurrence
                 self._list[idx] = (_key, _value)
                 break
-        else:
-            self._list.append((_key, _value))
-            return
-        self._list[idx + 1:] = [t for t in listiter if t[0].lower() != ikey]
+        if len(index[ikey]) > 1:
+            self._list[idx + 1:] = [
+                t for t in listiter if t[0].lower() != ikey
+            ]
+        index[ikey] = [_value]
 
     def setdefault(self, key, value):
         """Returns the value for the key if it is in the dict, otherwise it
@@ -453,6 +476,7 @@ class Headers(object):
                 self._list[key] = value[0]
             else:
                 self._list[key] = value
+            self._index = None
         else:
             self.set(key, value)
 
@@ -391,6 +391,9 @@ class ResponseCacheControl(_CacheControl):
     must_revalidate = cache_property('must-revalidate', None, bool)
     proxy_revalidate = cache_property('proxy-revalidate', None, bool)
     s_maxage = cache_property('s-maxage', None, None)
+    stale_while_revalidate = cache_property(
+        'stale-while-revalidate', None, int,
+    )
 
 
 # attach cache_property to the _CacheControl as staticmethod
@@ -19,7 +19,10 @@
     :copyright: (c) 2014 by the Werkzeug Team, see AUTHORS for more details.
     :license: BSD, see LICENSE for more details.
 """
+import json
+import mmap
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
 from urllib.parse import parse_qsl
 
 from verktyg.utils import cached_property
@@ -38,8 +41,15 @@ from verktyg.http import (
 )
 from verktyg.wsgi import (
     EnvironHeaders, wsgi_decoding_dance,
-    get_current_url, get_host, get_input_stream, get_content_length
+    get_current_url, get_host, get_input_stream, get_content_length,
+    make_line_iter, DecompressingStream,
 )
+from verktyg.urls import LazyURLArgs
+from verktyg.exceptions import (
+    BadRequest, RequestEntityTooLarge, RequestURITooLarge,
+    UnsupportedMediaType,
+)
+from verktyg.formparser import FormDataParser, default_stream_factory
 
 
 def _assert_not_shallow(request):
@@ -112,6 +122,28 @@ class BaseRequest(object):
     #: Have a look at :ref:`dealing-with-request-data` for more details.
     max_form_memory_size = None
 
+    #: the maximum number of fields and files accepted in a submitted form.
+    #: This is forwarded to the form data parsing function
+    #: (:func:`parse_form_data`).  When set and the :attr:`form` or
+    #: :attr:`files` attribute is accessed and more fields are transmitted a
+    #: :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception is raised.
+    max_form_parts = None
+
+    #: the maximum number of URL parameters accepted in the query string.
+    #: When set and the :attr:`args` attribute is accessed for a query string
+    #: with more parameters a
+    #: :exc:`~verktyg.exceptions.RequestURITooLarge` exception is raised.
+    #: This applies whether or not :attr:`lazy_args` is set.  The default,
+    #: `None`, does not limit the number of parameters.
+    max_query_parameters = None
+
+    #: if set to `True` :attr:`args` is a
+    #: :class:`~verktyg.urls.LazyURLArgs` that only decodes the keys that are
+    #: looked up and only builds a :attr:`parameter_storage_class` instance
+    #: once it is iterated.  Useful for endpoints that receive long query
+    #: strings but only read a couple of parameters.
+    lazy_args = False
+
     #: the class to use for `args` and `form`.  The default is an
     #: :class:`~verktyg.datastructures.ImmutableMultiDict` which supports
     #: multiple values per key.  alternatively it makes sense to use an
@@ -146,6 +178,30 @@ class BaseRequest(object):
     #: buffer up the input stream.  By default it's enabled.
     disable_data_descriptor = False
 
+    #: If set, :meth:`get_data` buffers the request body in a
+    #: :class:`~tempfile.SpooledTemporaryFile` instead of a bytestring.
+    #: Bodies of up to this many bytes are held in memory, larger ones are
+    #: written to a temporary file on disk.  Repeated calls to
+    #: :meth:`get_data`, :meth:`get_data_view` and form parsing are all
+    #: served from the same buffer.
+    body_memory_threshold = None
+
+    #: If set to `True` request bodies sent with a `Content-Encoding` of
+    #: `gzip` or `deflate` are decompressed incrementally as :attr:`stream`
+    #: is read.  Bodies with any other content coding are rejected with an
+    #: :exc:`~verktyg.exceptions.UnsupportedMediaType` exception.
+    decompress_body = False
+
+    #: The maximum size of a decompressed request body.  Only used if
+    #: :attr:`decompress_body` is enabled.  If more data would be
+    #: decompressed a :exc:`~verktyg.exceptions.RequestEntityTooLarge`
+    #: exception is raised.
+    max_decompressed_size = 16 * 1024 * 1024
+
+    #: The form data parser that should be used.  Can be replaced to
+    #: customize the form data parsing.
+    form_data_parser_class = FormDataParser
+
     def __init__(self, environ, populate_request=True, shallow=False):
         self.environ = environ
         if populate_request and not shallow:
@@ -199,16 +255,132 @@ class BaseRequest(object):
         finally:
             builder.close()
 
+    @property
+    def want_form_data_parsed(self):
+        """Returns True if the request carries content that should be
+        parsed.  This is the case if a content type is transmitted.
+        """
+        return bool(self.environ.get('CONTENT_TYPE'))
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None,
+        content_length=None,
+    ):
+        """Called to get a stream for the file upload.
+
+        This must provide a file-like class with `read()`, `readline()`
+        and `seek()` methods that is both writeable and readable.
+
+        The default implementation keeps small files in memory and rolls
+        larger ones over to a temporary file on disk.
+
+        :param total_content_length:
+            The total content length of all the data in the request combined.
+            This value is guaranteed to be there.
+        :param content_type:
+            The mimetype of the uploaded file.
+        :param filename:
+            The filename of the uploaded file.  May be `None`.
+        :param content_length:
+            The length of this file.  This value is usually not provided
+            because webbrowsers do not provide this value.
+        """
+        return default_stream_factory(
+            total_content_length=total_content_length,
+            content_type=content_type,
+            filename=filename,
+            content_length=content_length,
+        )
+
+    def make_form_data_parser(self):
+        """Creates the form data parser.  Instantiates the
+        :attr:`form_data_parser_class` with some parameters.
+        """
+        return self.form_data_parser_class(
+            self._get_file_stream,
+            'utf-8',
+            self.encoding_errors,
+            self.max_form_memory_size,
+            self.max_content_length,
+            self.parameter_storage_class,
+            max_form_parts=self.max_form_parts,
+        )
+
+    def _load_form_data(self):
+        """Method used internally to retrieve submitted data.  After calling
+        this sets `form` and `files` on the request object to multi dicts
+        filled with the incoming form data.  As a matter of fact the input
+        stream will be empty afterwards.
+        """
+        # abort early if we have already consumed the stream
+        if 'form' in self.__dict__:
+            return
+
+        _assert_not_shallow(self)
+
+        if self.want_form_data_parsed:
+            content_type = self.environ.get('CONTENT_TYPE', '')
+            content_length = get_content_length(self.environ)
+            mimetype, options = parse_options_header(content_type)
+            parser = self.make_form_data_parser()
+            data = parser.parse(
+                self._get_stream_for_parsing(),
+                mimetype, content_length, options,
+            )
+        else:
+            data = (
+                self.stream,
+                self.parameter_storage_class(),
+                self.parameter_storage_class(),
+            )
+
+        # inject the values into the instance dict so that we bypass
+        # our cached_property non-data descriptor.
+        d = self.__dict__
+        d['stream'], d['form'], d['files'] = data
+
     def _get_stream_for_parsing(self):
         """This is the same as accessing :attr:`stream` with the difference
         that if it finds cached data from calling :meth:`get_data` first it
         will create a new stream out of the cached data.
         """
+        body_buffer = getattr(self, '_body_buffer', None)
+        if body_buffer is not None:
+            body_buffer.seek(0)
+            return body_buffer
         cached_data = getattr(self, '_cached_data', None)
         if cached_data is not None:
             return BytesIO(cached_data)
         return self.stream
 
+    def _get_body_buffer(self):
+        """Reads the input stream into a spooled temporary file the first
+        time it is called and returns the file positioned at the start.
+        """
+        body_buffer = getattr(self, '_body_buffer', None)
+        if body_buffer is None:
+            body_buffer = SpooledTemporaryFile(
+                max_size=self.body_memory_threshold,
+            )
+            stream = self.stream
+            readinto = getattr(stream, 'readinto', None)
+            if readinto is not None:
+                chunk = memoryview(bytearray(64 * 1024))
+                while True:
+                    size = readinto(chunk)
+                    if not size:
+                        break
+                    body_buffer.write(chunk[:size])
+            else:
+                while True:
+                    data = stream.read(64 * 1024)
+                    if not data:
+                        break
+                    body_buffer.write(data)
+            self._body_buffer = body_buffer
+        body_buffer.seek(0)
+        return body_buffer
+
     def call_on_close(self, func):
         """Adds a function to the internal list of functions that should
         be called as part of closing down the request.  Also returns the
@@ -225,6 +397,17 @@ class BaseRequest(object):
         files = self.__dict__.get('files')
         for key, value in iter_multi_items(files or ()):
             value.close()
+        body_mmap = getattr(self, '_body_mmap', None)
+        if body_mmap is not None:
+            try:
+                body_mmap.close()
+            except BufferError:
+                # Views of the body are still alive.  The mapping will be
+                # closed once they are garbage collected.
+                pass
+        body_buffer = getattr(self, '_body_buffer', None)
+        if body_buffer is not None:
+            body_buffer.close()
         for func in self._on_close:
             func()
 
@@ -241,9 +424,24 @@ class BaseRequest(object):
         the length of the input.  Werkzeug will internally always refer to
         this stream to read data which makes it possible to wrap this
         object with a stream that does filtering.
+
+        If :attr:`decompress_body` is enabled compressed request bodies are
+        decompressed as they are read from this stream.
         """
         _assert_not_shallow(self)
-        return get_input_stream(self.environ)
+        stream = get_input_stream(self.environ)
+        if self.decompress_body:
+            encoding = self.environ.get('HTTP_CONTENT_ENCODING', '')
+            encoding = encoding.strip().lower()
+            if encoding in ('gzip', 'x-gzip', 'deflate'):
+                stream = DecompressingStream(
+                    stream, encoding, max_size=self.max_decompressed_size,
+                )
+            elif encoding and encoding != 'identity':
+                raise UnsupportedMediaType(
+                    'Unsupported content encoding: %s' % encoding
+                )
+        return stream
 
     @cached_property
     def input_stream(self):
@@ -261,14 +459,59 @@ class BaseRequest(object):
         is returned from this function.  This can be changed by setting
         :attr:`parameter_storage_class` to a different type.  This might
         be necessary if the order of the form data is important.
+
+        If :attr:`lazy_args` is set a :class:`~verktyg.urls.LazyURLArgs`
+        wrapping the raw query string is returned instead.
         """
+        if self.lazy_args:
+            return LazyURLArgs(
+                self.environ.get('QUERY_STRING', ''),
+                self.parameter_storage_class,
+                errors=self.encoding_errors,
+                max_parameters=self.max_query_parameters,
+            )
+
         qs = wsgi_decoding_dance(
             self.environ.get('QUERY_STRING', ''),
             errors=self.encoding_errors,
         )
-        return self.parameter_storage_class(parse_qsl(
-            qs, errors=self.encoding_errors,
-        ))
+        try:
+            args = parse_qsl(
+                qs, errors=self.encoding_errors,
+                max_num_fields=self.max_query_parameters,
+            )
+        except ValueError:
+            raise RequestURITooLarge()
+        return self.parameter_storage_class(args)
+
+    @cached_property
+    def form(self):
+        """The form parameters.  By default an
+        :class:`~verktyg.datastructures.ImmutableMultiDict`
+        is returned from this function.  This can be changed by setting
+        :attr:`parameter_storage_class` to a different type.  This might
+        be necessary if the order of the form data is important.
+        """
+        self._load_form_data()
+        return self.form
+
+    @cached_property
+    def files(self):
+        """:class:`~verktyg.datastructures.MultiDict` object containing
+        all uploaded files.  Each key in :attr:`files` is the name from the
+        ``<input type="file" name="">``.  Each value in :attr:`files` is a
+        :class:`~verktyg.http.FileStorage` object.
+
+        Note that :attr:`files` will only contain data if the request method
+        was POST, PUT or PATCH and the ``<form>`` that posted to the request
+        had ``enctype="multipart/form-data"``.  It will be empty otherwise.
+
+        Uploaded files are written to a temporary file on disk once they
+        grow past a small threshold so large uploads are never held in
+        memory in their entirety.
+        """
+        self._load_form_data()
+        return self.files
 
     def get_data(self, cache=True, as_text=False):
         """This reads the buffered incoming data from the client into one
@@ -281,17 +524,108 @@ class BaseRequest(object):
 
         If `as_text` is set to `True` the return value will be a decoded
         unicode string.
+
+        If :attr:`body_memory_threshold` is set the body is cached in a
+        spooled temporary file rather than in memory and each call returns
+        a fresh copy read from that file.
         """
         rv = getattr(self, '_cached_data', None)
         if rv is None:
-            rv = self.stream.read()
-            if cache:
-                self._cached_data = rv
+            if hasattr(self, '_body_buffer') or (
+                cache and self.body_memory_threshold is not None
+            ):
+                rv = self._get_body_buffer().read()
+            else:
+                rv = self.stream.read()
+                if cache:
+                    self._cached_data = rv
         if as_text:
             # TODO charset
             rv = rv.decode('utf-8', self.encoding_errors)
         return rv
 
+    def get_data_view(self):
+        """Returns a read-only :class:`memoryview` of the request body.
+
+        If :attr:`body_memory_threshold` is set and the body was too large
+        to be kept in memory, the view is backed by a memory map of the
+        temporary file it was spooled to so that it can be parsed without
+        reading it into memory first.  All views should be released before
+        the request is closed.
+        """
+        threshold = self.body_memory_threshold
+        if threshold is None:
+            return memoryview(self.get_data())
+
+        body_mmap = getattr(self, '_body_mmap', None)
+        if body_mmap is None:
+            body_buffer = self._get_body_buffer()
+            size = body_buffer.seek(0, 2)
+            body_buffer.seek(0)
+            if not size > threshold:
+                # The body is still held in memory.
+                return memoryview(body_buffer.read())
+            body_mmap = mmap.mmap(
+                body_buffer.fileno(), 0, access=mmap.ACCESS_READ,
+            )
+            self._body_mmap = body_mmap
+        return memoryview(body_mmap)
+
+    def iter_json_lines(self, max_record_size=None, max_size=None):
+        """Lazily decodes a newline delimited JSON request body and yields
+        the records one at a time as they are read from the input stream,
+        so that large batches never have to be held in memory.  Blank lines
+        are skipped.
+
+        A record that can not be decoded results in a
+        :exc:`~verktyg.exceptions.BadRequest` exception being raised when
+        it is reached.  Records preceding it will already have been
+        yielded.
+
+        :param max_record_size:
+            The maximum size in bytes of a single encoded record.  If a
+            larger record is transmitted a
+            :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception is
+            raised.
+        :param max_size:
+            The maximum size in bytes of the entire body.  Defaults to
+            :attr:`max_content_length`.
+        """
+        if max_size is None:
+            max_size = self.max_content_length
+        content_length = get_content_length(self.environ)
+        if (
+            max_size is not None and
+            content_length is not None and
+            content_length > max_size
+        ):
+            raise RequestEntityTooLarge()
+
+        lines = make_line_iter(
+            self._get_stream_for_parsing(), max_length=max_record_size,
+        )
+        total = 0
+        while True:
+            try:
+                line = next(lines)
+            except StopIteration:
+                return
+            except ValueError:
+                raise RequestEntityTooLarge()
+
+            # The body might not have a declared length.
+            total += len(line)
+            if max_size is not None and total > max_size:
+                raise RequestEntityTooLarge()
+
+            if line.isspace():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise BadRequest('Invalid JSON record')
+            yield record
+
     @cached_property
     def cookies(self):
         """Read only access to the retrieved cookie values as dictionary."""
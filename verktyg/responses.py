@@ -20,6 +20,8 @@
     :license: BSD, see LICENSE for more details.
 """
 from datetime import datetime, timedelta
+from hashlib import md5
+from itertools import chain
 from urllib.parse import urljoin
 
 from verktyg.urls import iri_to_uri
@@ -67,6 +69,33 @@ def _iter_encoded(iterable, charset):
             yield item
 
 
+def _iter_coalesced(iterable, buffer_size):
+    buf = bytearray()
+    for item in iterable:
+        if not item:
+            # An empty chunk is a request to flush whatever is buffered.
+            if buf:
+                yield bytes(buf)
+                del buf[:]
+            continue
+        if not buf and len(item) >= buffer_size:
+            yield item
+            continue
+        buf += item
+        if len(buf) >= buffer_size:
+            yield bytes(buf)
+            del buf[:]
+    if buf:
+        yield bytes(buf)
+
+
+def _get_last(headers, key):
+    values = headers.getlist(key)
+    if values:
+        return values[-1]
+    return None
+
+
 class BaseResponse(object):
 
     """Base response class.  The most important fact about a response object
@@ -158,6 +187,14 @@ class BaseResponse(object):
     #: header if possible?  This is true by default.
     automatically_set_content_length = True
 
+    #: If set, :meth:`iter_encoded` collects small chunks of the response
+    #: body into buffers of at least this many bytes before passing them on
+    #: to the server, instead of handing over every chunk that the response
+    #: iterable yields.  Generators that need to get data out earlier can
+    #: yield an empty string to send everything buffered so far.  Disabled by
+    #: default.
+    write_buffer_size = None
+
     def __init__(
         self, response=None, status=None, headers=None,
         mimetype=None, content_type=None, direct_passthrough=False,
@@ -389,13 +426,18 @@ class BaseResponse(object):
         If the response object is invoked as WSGI application the return
         value of this method is used as application iterator unless
         :attr:`direct_passthrough` was activated.
+
+        If :attr:`write_buffer_size` is set small chunks are coalesced.
         """
         if __debug__:
             _warn_if_string(self.response)
         # Encode in a separate function so that self.response is fetched
         # early.  This allows us to wrap the response with the return
         # value from get_app_iter or iter_encoded.
-        return _iter_encoded(self.response, self.charset)
+        rv = _iter_encoded(self.response, self.charset)
+        if self.write_buffer_size:
+            rv = _iter_coalesced(rv, self.write_buffer_size)
+        return rv
 
     def set_cookie(
         self, key, value='', max_age=None, expires=None,
@@ -509,23 +551,12 @@ class BaseResponse(object):
             Returns a new :class:`~verktyg.http.Headers` object.
         """
         headers = Headers(self.headers)
-        location = None
-        content_location = None
-        content_length = None
+        # If a header was set more than once the last value wins.
+        location = _get_last(headers, u'location')
+        content_location = _get_last(headers, u'content-location')
+        content_length = _get_last(headers, u'content-length')
         status = self.status_code
 
-        # iterate over the headers to find all values in one go.  Because
-        # get_wsgi_headers is used each response that gives us a tiny
-        # speedup.
-        for key, value in headers:
-            ikey = key.lower()
-            if ikey == u'location':
-                location = value
-            elif ikey == u'content-location':
-                content_location = value
-            elif ikey == u'content-length':
-                content_length = value
-
         # make sure the location header is an absolute URL
         if location is not None:
             old_location = location
@@ -572,6 +603,42 @@ class BaseResponse(object):
 
         return headers
 
+    def get_wsgi_header_list(self, environ):
+        """Returns the list of headers that should be passed to
+        `start_response`.  This is the same as calling :meth:`to_wsgi_list`
+        on the result of :meth:`get_wsgi_headers` but, for the common case
+        where there is no location header to rewrite and the status code
+        does not require entity headers to be changed, builds the list in a
+        single pass without first copying the headers.
+
+        :param environ:
+            The WSGI environment of the request.
+        :return:
+            A list of ``(key, value)`` tuples.
+        """
+        headers = self.headers
+        status = self.status_code
+        if (
+            # Subclasses that change how headers are finalized need to go
+            # through the slow path.
+            self.get_wsgi_headers.__func__ is not
+            BaseResponse.get_wsgi_headers or
+            not isinstance(headers, Headers) or
+            status < 200 or status in (204, 304) or
+            u'location' in headers or u'content-location' in headers
+        ):
+            return self.get_wsgi_headers(environ).to_wsgi_list()
+
+        rv = list(headers)
+        if (
+            self.automatically_set_content_length and
+            self.is_sequence and u'content-length' not in headers
+        ):
+            rv.append((
+                u'Content-Length', str(sum(len(x) for x in self.response)),
+            ))
+        return rv
+
     def get_app_iter(self, environ):
         """Returns the application iterator for the given environ.  Depending
         on the request method and the current status code the return value
@@ -613,9 +680,9 @@ class BaseResponse(object):
         :return:
             An ``(app_iter, status, headers)`` tuple.
         """
-        headers = self.get_wsgi_headers(environ)
+        headers = self.get_wsgi_header_list(environ)
         app_iter = self.get_app_iter(environ)
-        return app_iter, self.status, headers.to_wsgi_list()
+        return app_iter, self.status, headers
 
     def __call__(self, environ, start_response):
         """Process this response as WSGI application.
@@ -656,6 +723,10 @@ class ETagResponseMixin(object):
     response class does not do that.
     """
 
+    #: the maximum number of bytes of a streamed response that
+    #: :meth:`add_streamed_etag` will buffer in order to generate an etag.
+    streamed_etag_max_size = 1024 * 1024
+
     @property
     def cache_control(self):
         """The Cache-Control general-header field is used to specify
@@ -671,12 +742,16 @@ class ETagResponseMixin(object):
             self.headers.get('cache-control'), on_update, ResponseCacheControl,
         )
 
-    def make_conditional(self, request_or_environ):
+    def make_conditional(self, request_or_environ, add_etag=False):
         """Make the response conditional to the request.  This method works
         best if an etag was defined for the response already.  The `add_etag`
         method can be used to do that.  If called without etag just the date
         header is set.
 
+        If `add_etag` is set an etag is added using :meth:`add_streamed_etag`
+        so responses that are too large to buffer are passed through
+        unchanged rather than read into memory.
+
         This does nothing if the request method in the request or environ is
         anything but GET or HEAD.
 
@@ -689,10 +764,16 @@ class ETagResponseMixin(object):
         :param request_or_environ:
             A request object or WSGI environment to be used to make the
             response conditional against.
+        :param add_etag:
+            Generate a strong etag from the response body if there is none
+            yet.
         """
         environ = getattr(request_or_environ, 'environ', request_or_environ)
         assert isinstance(environ, dict)
         if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            buffered = True
+            if add_etag:
+                buffered = self.add_streamed_etag()
             # if the date is not in the headers, add it now.  We however
             # will not override an already existing header.  Unfortunately
             # this header will be overriden by many WSGI servers including
@@ -700,7 +781,7 @@ class ETagResponseMixin(object):
             if 'date' not in self.headers:
                 self.headers['Date'] = http_date()
             if (
-                self.automatically_set_content_length and
+                self.automatically_set_content_length and buffered and
                 'content-length' not in self.headers
             ):
                 length = self.calculate_content_length()
@@ -717,6 +798,55 @@ class ETagResponseMixin(object):
         if overwrite or 'etag' not in self.headers:
             self.set_etag(generate_etag(self.get_data()), weak)
 
+    def add_streamed_etag(self, overwrite=False, max_size=None):
+        """Add a strong etag for the current response if there is none yet,
+        hashing the body as it is read instead of joining it in memory first.
+
+        At most `max_size` bytes of a streamed body are buffered.  If the
+        body turns out to be larger, the part that was read is put back in
+        front of the rest of the iterable, no etag is set and the response is
+        streamed as before.  Bodies that are already buffered are always
+        hashed.
+
+        :param overwrite:
+            Replace an existing etag.
+        :param max_size:
+            The maximum number of bytes to buffer.  Defaults to
+            :attr:`streamed_etag_max_size`.
+        :return:
+            `True` if the response has an etag and a buffered body,
+            otherwise `False`.
+        """
+        if not overwrite and 'etag' in self.headers:
+            return self.is_sequence
+        if self.direct_passthrough:
+            return False
+        if self.is_sequence:
+            max_size = None
+        elif max_size is None:
+            max_size = self.streamed_etag_max_size
+
+        # the iterable is replaced below so make sure that it still gets
+        # closed along with the response.
+        if hasattr(self.response, 'close'):
+            self.call_on_close(self.response.close)
+
+        iterator = self.iter_encoded()
+        chunks = []
+        size = 0
+        digest = md5()
+        for chunk in iterator:
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                self.response = chain(chunks, iterator)
+                return False
+            digest.update(chunk)
+
+        self.response = chunks
+        self.set_etag(digest.hexdigest())
+        return True
+
     def set_etag(self, etag, weak=False):
         """Set the etag, and override the old one if there was one."""
         self.headers['ETag'] = quote_etag(etag, weak)
@@ -93,7 +93,12 @@
 """
 import re
 import uuid
+import bisect
+import hashlib
+import inspect
 import posixpath
+import threading
+import itertools
 from urllib.parse import (
     urlencode, quote as urlquote, urljoin,
     urlunparse, ParseResult
@@ -101,7 +106,7 @@ from urllib.parse import (
 
 from pprint import pformat
 
-from verktyg.datastructures import ImmutableDict, MultiDict
+from verktyg.datastructures import ImmutableDict, MultiDict, LRUCache
 from verktyg.wsgi import wsgi_decoding_dance
 from verktyg.exceptions import HTTPException, NotFound
 
@@ -118,6 +123,7 @@ _route_re = re.compile(r'''
     >
 ''', re.VERBOSE)
 _simple_route_re = re.compile(r'<([^>]+)>')
+_named_group_re = re.compile(r'\(\?P<\w+>')
 _converter_args_re = re.compile(r'''
     ((?P<name>\w+)\s*=\s*)?
     (?P<value>
@@ -202,6 +208,50 @@ def parse_route(route):
         yield None, None, remaining
 
 
+def _fingerprint_value(value):
+    # functions and classes are identified by name as their `repr` includes
+    # their address.
+    if hasattr(value, '__qualname__'):
+        return '%s.%s' % (value.__module__, value.__qualname__)
+    return repr(value)
+
+
+def _fingerprint_route_factory(factory):
+    # Routes are fingerprinted before they are bound, as binding fills in
+    # defaults from the router and compiles them.
+    if isinstance(factory, Route):
+        return (
+            factory.route, factory.subdomain, factory.host,
+            sorted(
+                (key, _fingerprint_value(value))
+                for key, value in (factory.defaults or {}).items()
+            ),
+            factory.build_only, factory.strict_slashes, factory.alias,
+            _fingerprint_value(factory.endpoint),
+            _fingerprint_value(factory.redirect_to),
+        )
+
+    state = []
+    for key, value in sorted(vars(factory).items()):
+        if isinstance(value, RouteFactory):
+            value = _fingerprint_route_factory(value)
+        elif isinstance(value, (list, tuple)):
+            value = [
+                _fingerprint_route_factory(item)
+                if isinstance(item, RouteFactory)
+                else _fingerprint_value(item)
+                for item in value
+            ]
+        elif isinstance(value, dict):
+            value = sorted(
+                (key, _fingerprint_value(item)) for key, item in value.items()
+            )
+        else:
+            value = _fingerprint_value(value)
+        state.append((key, value))
+    return _fingerprint_value(factory.__class__), state
+
+
 class RoutingException(Exception):
     """Special exceptions that require the application to redirect, notifying
     about missing urls, etc.
@@ -529,6 +579,10 @@ class Route(RouteFactory):
         else:
             self.arguments = set()
         self._trace = self._converters = self._regex = self._weights = None
+        self._regex_source = None
+        self._domain_builder = self._path_builder = None
+        self._required_arguments = self._known_arguments = None
+        self._default_items = None
 
     def empty(self):
         """Return an unbound copy of this route.  This can be useful if you
@@ -625,15 +679,71 @@ class Route(RouteFactory):
         if not self.is_leaf:
             self._trace.append((False, '/'))
 
+        self._compile_builder()
+
         if self.build_only:
             return
-        regex = r'^%s%s$' % (
+        self._regex_source = r'^%s%s$' % (
             u''.join(regex_parts),
             '(?<!/)(?P<__suffix__>/?)'
             if (not self.is_leaf or not self.strict_slashes)
             else ''
         )
-        self._regex = re.compile(regex, re.UNICODE)
+        self._regex = None
+        if not self.router.lazy:
+            self.compile_regex()
+
+    def compile_regex(self):
+        """Compiles the regular expression for matching this route, unless
+        it has already been compiled, and returns it.  Called by `compile`
+        unless the router is lazy, in which case it is called by `match` the
+        first time the route is tried.
+
+        :internal:
+        """
+        regex = self._regex
+        if regex is None and not self.build_only:
+            regex = self._regex = re.compile(self._regex_source, re.UNICODE)
+        return regex
+
+    def _compile_builder(self):
+        # splits the trace into the parts needed to build the domain and the
+        # path.  Adjacent static parts are quoted and joined in advance and
+        # dynamic parts are replaced with the `to_url` method of their
+        # converter, so that `build` only has to call those and join the
+        # results.
+        domain_parts = []
+        path_parts = parts = domain_parts
+        static = []
+        for is_dynamic, data in self._trace:
+            if not is_dynamic and data == '|' and parts is domain_parts:
+                if static:
+                    parts.append((None, ''.join(static)))
+                    static = []
+                path_parts = parts = []
+            elif is_dynamic:
+                if static:
+                    parts.append((None, ''.join(static)))
+                    static = []
+                parts.append((self._converters[data].to_url, data))
+            else:
+                static.append(urlquote(
+                    data, encoding=self.router.charset, safe='/:|+',
+                ))
+        if static:
+            parts.append((None, ''.join(static)))
+
+        self._domain_builder = tuple(domain_parts)
+        self._path_builder = tuple(path_parts)
+
+        # the arguments that need to be passed, and the defaults that must
+        # not be contradicted by the values, for this route to be suitable.
+        defaults = self.defaults or {}
+        self._required_arguments = frozenset(
+            key for key in self.arguments if key not in defaults
+        )
+        self._default_items = tuple(defaults.items())
+        self._known_arguments = frozenset(self.arguments)
 
     def match(self, path):
         """Check if the route matches a given path. Path is a string in the
@@ -647,7 +757,7 @@ class Route(RouteFactory):
         :internal:
         """
         if not self.build_only:
-            m = self._regex.search(path)
+            m = (self._regex or self.compile_regex()).search(path)
             if m is not None:
                 groups = m.groupdict()
                 # we have a folder like part of the url without a trailing
@@ -685,25 +795,28 @@ class Route(RouteFactory):
 
         :internal:
         """
-        tmp = []
-        add = tmp.append
-        processed = set(self.arguments)
-        for is_dynamic, data in self._trace:
-            if is_dynamic:
-                try:
-                    add(self._converters[data].to_url(values[data]))
-                except ValidationError:
-                    return
-                processed.add(data)
-            else:
-                add(urlquote(data, encoding=self.router.charset, safe='/:|+'))
-        domain_part, url = (u''.join(tmp)).split(u'|', 1)
+        try:
+            domain_part = ''.join([
+                data if to_url is None else to_url(values[data])
+                for to_url, data in self._domain_builder
+            ])
+            url = ''.join([
+                data if to_url is None else to_url(values[data])
+                for to_url, data in self._path_builder
+            ])
+        except ValidationError:
+            return
 
         if append_unknown:
-            query_vars = MultiDict(values)
-            for key in processed:
-                if key in query_vars:
-                    del query_vars[key]
+            known = self._known_arguments
+            query_vars = None
+            for key in values:
+                if key not in known:
+                    query_vars = MultiDict({
+                        key: value for key, value in values.items()
+                        if key not in known
+                    })
+                    break
 
             if query_vars:
                 url += u'?' + urlencode(
@@ -729,20 +842,17 @@ class Route(RouteFactory):
 
         :internal:
         """
-        defaults = self.defaults or ()
-
         # all arguments required must be either in the defaults dict or
         # the value dictionary otherwise it's not suitable
-        for key in self.arguments:
-            if key not in defaults and key not in values:
+        for key in self._required_arguments:
+            if key not in values:
                 return False
 
         # in case defaults are given we ensure that either the value was
         # skipped or the value is the same as the default value.
-        if defaults:
-            for key, value in defaults.items():
-                if key in values and value != values[key]:
-                    return False
+        for key, value in self._default_items:
+            if key in values and value != values[key]:
+                return False
 
         return True
 
@@ -772,6 +882,13 @@ class Route(RouteFactory):
             -len(self.defaults or ())
         )
 
+    def __getstate__(self):
+        # compiled expressions are recompiled when unpickled, so rather than
+        # doing that for every route they are left to be compiled on demand.
+        state = self.__dict__.copy()
+        state['_regex'] = None
+        return state
+
     def __eq__(self, other):
         return (
             self.__class__ is other.__class__ and
@@ -801,9 +918,15 @@ class Route(RouteFactory):
 
 
 class BaseConverter(object):
-    """Base class for all converters."""
+    """Base class for all converters.
+
+    Converters whose regular expression can match a slash must set
+    `part_isolating` to `False` so that matchers which split the path into
+    segments know not to do so for routes using them.
+    """
     regex = '[^/]+'
     weight = 100
+    part_isolating = True
 
     def __init__(self, router):
         self.router = router
@@ -883,6 +1006,7 @@ class PathConverter(BaseConverter):
     """
     regex = '[^/].*?'
     weight = 200
+    part_isolating = False
 
 
 class NumberConverter(BaseConverter):
@@ -996,6 +1120,304 @@ DEFAULT_CONVERTERS = {
 }
 
 
+class BaseMatcher(object):
+    """Base class for the engines used by a `URLMap` to find the routes that
+    might match a path.
+
+    A matcher is created from the routes of the router, sorted by their match
+    compare key, the first time the router is used.  Routes added after that
+    are passed to `insert`.  `MapAdapter.match` calls `Route.match` on each
+    candidate in turn so matchers are free to return routes that turn out not
+    to match, but must never leave out one that would and must preserve the
+    order of the routes.
+
+    :param routes:
+        The sorted list of routes to match against.
+    """
+
+    def __init__(self, routes):
+        self.routes = [route for route in routes if not route.build_only]
+        self._ranks = None
+
+    def insert(self, index, route):
+        """Add a route to a matcher that is already in use.  The default
+        implementation creates the matcher again from scratch, subclasses
+        should override this to avoid that.
+
+        :param index:
+            The position of the new route in `routes`.
+        :param route:
+            The route to add.  Never a build only route.
+        """
+        routes = list(self.routes)
+        routes.insert(index, route)
+        self.__init__(routes)
+
+    def __getstate__(self):
+        # the ranks are keyed on the ids of the routes, which are different
+        # once they are unpickled.
+        state = self.__dict__.copy()
+        state['_ranks'] = None
+        return state
+
+    def _get_ranks(self):
+        # maps the id of each route, as routes compare equal by value, to
+        # its position in `routes`.  Rebuilt after routes are inserted.
+        ranks = self._ranks
+        if ranks is None:
+            ranks = self._ranks = {
+                id(route): index for index, route in enumerate(self.routes)
+            }
+        return ranks
+
+    def iter_candidates(self, path):
+        """Return an iterable of the routes that should be tried for a path
+        in the form ``"subdomain|/path"``.
+        """
+        raise NotImplementedError()
+
+
+class LinearMatcher(BaseMatcher):
+    """The default matcher.  Tries every route one after another."""
+
+    def insert(self, index, route):
+        self.routes.insert(index, route)
+
+    def iter_candidates(self, path):
+        return self.routes
+
+
+class _TrieNode(object):
+    __slots__ = ('static', 'dynamic', 'routes')
+
+    def __init__(self):
+        #: maps static segments to child nodes.
+        self.static = {}
+        #: list of ``(regex, node)`` tuples for segments with converters.
+        self.dynamic = []
+        #: list of ``(route, slash_optional)`` tuples for the routes ending
+        #: at this node.
+        self.routes = []
+
+
+class TrieMatcher(BaseMatcher):
+    """Splits the path of every route into segments and arranges them in a
+    prefix tree.  Static segments are looked up in a dictionary, segments that
+    contain converters are tested with a regular expression made from the
+    converters' regular expressions.  This means that the cost of finding the
+    routes for a path depends on the number of segments in the path rather
+    than on the number of routes in the router.
+
+    Routes using a converter that can match a slash (see
+    `BaseConverter.part_isolating`) can not be split into segments and are
+    always returned as candidates.
+    """
+
+    def __init__(self, routes):
+        BaseMatcher.__init__(self, routes)
+        self._root = _TrieNode()
+        self._unsplittable = []
+
+        for route in self.routes:
+            self._add(route)
+
+    def insert(self, index, route):
+        self.routes.insert(index, route)
+        self._ranks = None
+        self._add(route)
+
+    def _add(self, route):
+        segments = self._split_route(route)
+        if segments is None:
+            self._unsplittable.append(route)
+            return
+
+        node = self._root
+        for segment in segments:
+            node = self._get_child(node, segment)
+        node.routes.append((
+            route, not route.is_leaf or not route.strict_slashes,
+        ))
+
+    def _split_route(self, route):
+        trace = route._trace
+        if not route.is_leaf:
+            # the trailing slash of branch routes is handled by
+            # `iter_candidates`.
+            trace = trace[:-1]
+
+        segments = [[]]
+        for is_dynamic, data in trace:
+            if is_dynamic:
+                converter = route._converters[data]
+                if not converter.part_isolating:
+                    return None
+                segments[-1].append(converter)
+            else:
+                first, *rest = data.split('/')
+                segments[-1].append(first)
+                segments.extend([part] for part in rest)
+        return segments
+
+    def _get_child(self, node, segment):
+        if all(isinstance(part, str) for part in segment):
+            key = ''.join(segment)
+            if key not in node.static:
+                node.static[key] = _TrieNode()
+            return node.static[key]
+
+        regex = ''.join(
+            re.escape(part) if isinstance(part, str)
+            else '(?:%s)' % part.regex
+            for part in segment
+        )
+        for other_regex, child in node.dynamic:
+            if other_regex.pattern == regex:
+                return child
+        child = _TrieNode()
+        node.dynamic.append((re.compile(regex, re.UNICODE), child))
+        return child
+
+    def _find_nodes(self, segments):
+        nodes = [self._root]
+        for segment in segments:
+            next_nodes = []
+            for node in nodes:
+                child = node.static.get(segment)
+                if child is not None:
+                    next_nodes.append(child)
+                for regex, child in node.dynamic:
+                    if regex.fullmatch(segment) is not None:
+                        next_nodes.append(child)
+            if not next_nodes:
+                return ()
+            nodes = next_nodes
+        return nodes
+
+    def iter_candidates(self, path):
+        ranks = self._get_ranks()
+        candidates = {ranks[id(route)]: route for route in self._unsplittable}
+
+        for node in self._find_nodes(path.split('/')):
+            for route, slash_optional in node.routes:
+                candidates[ranks[id(route)]] = route
+
+        # routes that end in a slash, or that don't care about slashes, also
+        # match the path without it.
+        if path.endswith('/'):
+            for node in self._find_nodes(path[:-1].split('/')):
+                for route, slash_optional in node.routes:
+                    if slash_optional:
+                        candidates[ranks[id(route)]] = route
+
+        return [candidates[index] for index in sorted(candidates)]
+
+
+class RegexMatcher(BaseMatcher):
+    """Joins the regular expressions of all routes into a single alternation
+    so that the first route that matches a path can be found with one call to
+    `re.match`.  Only that route's converters then need to be run.  If they
+    reject the value the remaining routes are tried one after another.
+
+    Routes inserted after the matcher was created are joined into a second,
+    much smaller, expression, which is compiled when it is next needed.  Once
+    there are more than `max_pending_routes` of them everything is compiled
+    into a single expression again.
+
+    If the combined expression can not be compiled, for example because the
+    router has more routes than `max_routes` or the expression exceeds the
+    limits of the `re` module, the matcher falls back to trying every route.
+    """
+
+    #: the maximum number of routes to join into a single expression.
+    max_routes = 5000
+
+    #: the maximum number of inserted routes to match separately.
+    max_pending_routes = 100
+
+    def __init__(self, routes):
+        BaseMatcher.__init__(self, routes)
+        self._compiled_routes = list(self.routes)
+        self._regex = self._compile(self._compiled_routes)
+        self._pending_routes = []
+        self._pending_regex = None
+
+    def _compile(self, routes):
+        if len(routes) > self.max_routes:
+            return None
+
+        # converter values are extracted by `Route.match` so all named groups
+        # are dropped from the combined expression.  Static parts of the
+        # routes are escaped so this can't match anything but a group.  The
+        # alternative that matched is identified by an empty group at its
+        # end, as wrapping each one in a group slows `re` down a lot.
+        regex = '|'.join(
+            '(?:%s)(?P<_%d>)' % (
+                _named_group_re.sub('(?:', route._regex_source), index,
+            )
+            for index, route in enumerate(routes)
+        )
+        try:
+            # an empty alternation would match anything.
+            return re.compile(regex or '(?!)', re.UNICODE)
+        except (re.error, OverflowError, RecursionError):
+            return None
+
+    def insert(self, index, route):
+        self.routes.insert(index, route)
+        self._ranks = None
+        if self._regex is None:
+            return
+        self._pending_routes.append(route)
+        self._pending_regex = None
+
+    def _compile_pending(self):
+        if len(self._pending_routes) > self.max_pending_routes:
+            self._compiled_routes = list(self.routes)
+            self._regex = self._compile(self._compiled_routes)
+            self._pending_routes = []
+            return
+
+        # the alternatives must be in the order of the routes so that the
+        # first one to match is the first route that matches.
+        ranks = self._get_ranks()
+        self._pending_routes.sort(key=lambda route: ranks[id(route)])
+        self._pending_regex = self._compile(self._pending_routes)
+        if self._pending_regex is None:
+            self._regex = None
+            self._pending_routes = []
+
+    def iter_candidates(self, path):
+        if self._pending_routes and self._pending_regex is None:
+            self._compile_pending()
+
+        if self._regex is None:
+            yield from self.routes
+            return
+
+        m = self._regex.match(path)
+        if not self._pending_routes:
+            if m is None:
+                return
+            index = int(m.lastgroup[1:])
+            yield from itertools.islice(self.routes, index, None)
+            return
+
+        # the first route to match is the earlier of the first matching
+        # route in each expression.
+        ranks = self._get_ranks()
+        indexes = []
+        if m is not None:
+            route = self._compiled_routes[int(m.lastgroup[1:])]
+            indexes.append(ranks[id(route)])
+        m = self._pending_regex.match(path)
+        if m is not None:
+            route = self._pending_routes[int(m.lastgroup[1:])]
+            indexes.append(ranks[id(route)])
+        if indexes:
+            yield from itertools.islice(self.routes, min(indexes), None)
+
+
 class URLMap(object):
     """The router class stores all the URL rules and some configuration
     parameters.  Some of the configuration values are only stored on the
@@ -1029,20 +1451,54 @@ class URLMap(object):
         If set to `True` it enables the host matching feature and disables the
         subdomain one.  If enabled the `host` parameter to routes is used
         instead of the `subdomain` one.
+    :param matcher_class:
+        The :class:`BaseMatcher` subclass used to find the routes that match
+        a path.  Defaults to :class:`LinearMatcher`.  Routes added once the
+        router is in use are inserted into the existing matcher with
+        :meth:`BaseMatcher.insert`.
+    :param lazy:
+        If set to `True` the regular expressions of routes are only compiled
+        when they are first needed for matching, rather than when the routes
+        are added, which makes creating maps with many routes much faster.
+        Use :meth:`compile_routes` to compile them ahead of time.
+    :param match_cache_size:
+        If set, the outcome of matching the most recently requested paths is
+        kept in an :class:`~verktyg.datastructures.LRUCache` of this size.
+        The cache is available as `match_cache` and is cleared whenever
+        routes are added.
     """
 
     default_converters = ImmutableDict(DEFAULT_CONVERTERS)
 
+    #: the matcher used if no `matcher_class` is passed to the constructor.
+    matcher_class = LinearMatcher
+
     def __init__(
         self, routes=None, default_subdomain='', charset='utf-8',
         strict_slashes=True, redirect_defaults=True,
         converters=None, sort_parameters=False, sort_key=None,
-        encoding_errors='replace', host_matching=False,
+        encoding_errors='replace', host_matching=False, matcher_class=None,
+        lazy=False, match_cache_size=None,
     ):
         self._routes = []
+        self._match_keys = []
+        # the match compare keys of the routes passed to the matcher.
+        self._matcher_keys = []
+        self._pending_routes = []
+        self._update_lock = threading.Lock()
         self._routes_by_endpoint = {}
+        self._arguments_by_endpoint = {}
+        self._build_candidates = {}
+        self._matcher = None
         self._remap = True
 
+        self.match_cache = None
+        if match_cache_size:
+            self.match_cache = LRUCache(match_cache_size)
+
+        if matcher_class is not None:
+            self.matcher_class = matcher_class
+
         self.default_subdomain = default_subdomain
         self.charset = charset
         self.encoding_errors = encoding_errors
@@ -1056,6 +1512,17 @@ class URLMap(object):
 
         self.sort_parameters = sort_parameters
         self.sort_key = sort_key
+        self.lazy = lazy
+
+        self._options_fingerprint = self._fingerprint_options(
+            default_subdomain=default_subdomain, charset=charset,
+            strict_slashes=strict_slashes, redirect_defaults=redirect_defaults,
+            converters=converters, sort_parameters=sort_parameters,
+            sort_key=sort_key, encoding_errors=encoding_errors,
+            host_matching=host_matching, matcher_class=matcher_class,
+            lazy=lazy, match_cache_size=match_cache_size,
+        )
+        self._route_fingerprints = []
 
         self.add_routes(*routes or ())
 
@@ -1099,14 +1566,109 @@ class URLMap(object):
         :param routefactory:
             A :class:`Route` or :class:`RouteFactory`
         """
+        routes = []
         for factory in factories:
+            self._route_fingerprints.append(
+                _fingerprint_route_factory(factory)
+            )
             for route in factory.get_routes(self):
                 route.bind(self)
-                self._routes.append(route)
-                self._routes_by_endpoint.setdefault(
-                    route.endpoint, []
-                ).append(route)
-        self._remap = True
+                routes.append(route)
+        with self._update_lock:
+            self._pending_routes.extend(routes)
+            self._remap = True
+
+    def compile_routes(self, background=False):
+        """Sort the routes, build the matcher and compile the regular
+        expressions of all routes that have not been compiled yet.
+
+        Servers that fork worker processes should call this in the master
+        process so that the workers inherit a router that is ready to use
+        instead of each preparing their own copy.
+
+        :param background:
+            If `True` the routes are compiled in a daemon thread, which is
+            returned, and routes needed for matching in the meantime are
+            compiled on demand.
+        """
+        if background:
+            thread = threading.Thread(target=self.compile_routes, daemon=True)
+            thread.start()
+            return thread
+
+        self.update()
+        for route in list(self._routes):
+            route.compile_regex()
+
+    @classmethod
+    def _fingerprint_options(cls, **options):
+        converters = dict(cls.default_converters)
+        converters.update(options.pop('converters', None) or {})
+        matcher_class = (
+            options.pop('matcher_class', None) or cls.matcher_class
+        )
+        return [
+            sorted(
+                (name, _fingerprint_value(value))
+                for name, value in options.items()
+            ),
+            sorted(
+                (name, _fingerprint_value(converter))
+                for name, converter in converters.items()
+            ),
+            _fingerprint_value(matcher_class),
+        ]
+
+    @staticmethod
+    def _hash_fingerprint(options_fingerprint, route_fingerprints):
+        definition = [options_fingerprint, route_fingerprints]
+        return hashlib.sha1(repr(definition).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get_fingerprint(cls, routes=None, **kwargs):
+        """Return the :meth:`fingerprint` that a router created with the
+        same arguments would have, without binding or compiling any routes.
+        This makes it possible to look up a pickled router before doing any
+        of the work that loading it is meant to save.
+
+        Takes the same arguments as the constructor.
+        """
+        arguments = inspect.signature(cls.__init__).bind(
+            None, routes, **kwargs
+        )
+        arguments.apply_defaults()
+        options = dict(arguments.arguments)
+        del options['self'], options['routes']
+        return cls._hash_fingerprint(
+            cls._fingerprint_options(**options),
+            [_fingerprint_route_factory(factory) for factory in routes or ()],
+        )
+
+    def fingerprint(self):
+        """Return a hash of the route definitions and every setting of the
+        router that can be used to key a cache of pickled routers.  Routes
+        are hashed as they were passed to the router, before being bound, so
+        this does not require the routes to be sorted or compiled.  Use
+        :meth:`get_fingerprint` to compute it without creating a router.
+
+        Routers can be pickled once their routes have been compiled.  The
+        regular expressions of the routes are not included and are compiled
+        again the first time each route is needed, so a router loaded from a
+        cache file is ready to use straight away.  Converters and endpoints
+        must be picklable.
+        """
+        return self._hash_fingerprint(
+            self._options_fingerprint, self._route_fingerprints,
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_update_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._update_lock = threading.Lock()
 
     def bind(
         self, server_name, script_name=None, subdomain=None,
@@ -1238,12 +1800,125 @@ class URLMap(object):
         """Called before matching and building to keep the compiled routes
         in the correct order after things changed.
         """
-        if self._remap:
-            self._routes.sort(key=lambda x: x.match_compare_key())
-            for routes in self._routes_by_endpoint.values():
+        if not self._remap:
+            return
+
+        with self._update_lock:
+            if not self._remap:
+                return
+            pending, self._pending_routes = self._pending_routes, []
+
+            # routes added to a router that is already in use are inserted
+            # after the existing routes that compare equal, which gives the
+            # same order as appending them and sorting everything again.
+            # Once the matcher exists the routes are inserted into it in the
+            # same way, rather than creating it again.
+            matcher = self._matcher
+            for route in pending:
+                key = route.match_compare_key()
+                index = bisect.bisect_right(self._match_keys, key)
+                self._match_keys.insert(index, key)
+                self._routes.insert(index, route)
+                if matcher is not None and not route.build_only:
+                    index = bisect.bisect_right(self._matcher_keys, key)
+                    self._matcher_keys.insert(index, key)
+                    matcher.insert(index, route)
+
+            endpoints = set()
+            for route in pending:
+                self._routes_by_endpoint.setdefault(
+                    route.endpoint, []
+                ).append(route)
+                endpoints.add(route.endpoint)
+
+            for endpoint in endpoints:
+                routes = self._routes_by_endpoint[endpoint]
                 routes.sort(key=lambda x: x.build_compare_key())
+                self._arguments_by_endpoint[endpoint] = frozenset().union(
+                    *(route.arguments for route in routes)
+                )
+            self._build_candidates = {}
+            if matcher is None:
+                self._matcher = self.matcher_class(self._routes)
+                self._matcher_keys = [
+                    key for key, route in zip(self._match_keys, self._routes)
+                    if not route.build_only
+                ]
+            if self.match_cache is not None:
+                self.match_cache.clear()
             self._remap = False
 
+    def get_build_candidates(self, endpoint, values):
+        """Return the routes for an endpoint that could be built from a dict
+        of values, in the order in which they should be tried.  These are the
+        routes that have no required arguments missing from the values.  Any
+        defaults still need to be checked with `Route.suitable_for`.
+
+        The candidates are computed once for each set of argument names used
+        by the routes of the endpoint, so the cost of looking them up does not
+        depend on the number of routes.
+
+        :internal:
+        """
+        self.update()
+        arguments = self._arguments_by_endpoint.get(endpoint)
+        if arguments is None:
+            return ()
+
+        key = endpoint, arguments.intersection(values)
+        try:
+            return self._build_candidates[key]
+        except KeyError:
+            pass
+
+        names = key[1]
+        candidates = tuple(
+            route for route in self._routes_by_endpoint[endpoint]
+            if route._required_arguments <= names
+        )
+        self._build_candidates[key] = candidates
+        return candidates
+
+    def match_path(self, path):
+        """Find the route matching a path in the form ``"subdomain|/path"``,
+        as assembled by `MapAdapter.match`.
+
+        Returns a ``(route, values, redirect)`` tuple.  `route` and `values`
+        are `None` if nothing matched.  `redirect` is `None`, or either
+        `RequestSlash` or `RequestAliasRedirect` if the route that matched
+        asks for a redirect.
+
+        If the router has a match cache, the outcome is looked up there first.
+
+        :internal:
+        """
+        self.update()
+        if self.match_cache is None:
+            return self._match_path(path)
+
+        outcome = self.match_cache.get(path)
+        if outcome is None:
+            outcome = self._match_path(path)
+            self.match_cache.set(path, outcome)
+
+        route, values, redirect = outcome
+        if values is not None:
+            # values are modified by the adapter when handling defaults.
+            values = dict(values)
+        return route, values, redirect
+
+    def _match_path(self, path):
+        for route in self._matcher.iter_candidates(path):
+            try:
+                rv = route.match(path)
+            except RequestSlash:
+                return route, None, RequestSlash
+            except RequestAliasRedirect as e:
+                return route, e.matched_values, RequestAliasRedirect
+            if rv is not None:
+                return route, rv, None
+        return None, None, None
+
     def __repr__(self):
         routes = self.iter_routes()
         return '%s(%s)' % (self.__class__.__name__, pformat(list(routes)))
@@ -1344,50 +2019,46 @@ class MapAdapter(object):
             self.subdomain, path_info.lstrip('/')
         )
 
-        for route in self.router._routes:
-            try:
-                rv = route.match(path)
-            except RequestSlash:
-                raise RequestRedirect(self.make_redirect_url(
-                    urlquote(
-                        path_info, encoding=self.router.charset, safe='/:|+'
-                    ) + '/', query_args
-                ))
-            except RequestAliasRedirect as e:
-                raise RequestRedirect(self.make_alias_redirect_url(
-                    path, route.endpoint, e.matched_values, query_args
-                ))
-            if rv is None:
-                continue
-
-            if self.router.redirect_defaults:
-                redirect_url = self.get_default_redirect(route, rv, query_args)
-                if redirect_url is not None:
-                    raise RequestRedirect(redirect_url)
-
-            if route.redirect_to is not None:
-                if isinstance(route.redirect_to, str):
-                    def _handle_match(match):
-                        value = rv[match.group(1)]
-                        return route._converters[match.group(1)].to_url(value)
-                    redirect_url = _simple_route_re.sub(
-                        _handle_match, route.redirect_to,
-                    )
-                else:
-                    redirect_url = route.redirect_to(self, **rv)
-                raise RequestRedirect(str(urljoin('%s://%s%s%s' % (
-                    self.url_scheme,
-                    self.subdomain and self.subdomain + '.' or '',
-                    self.server_name,
-                    self.script_name
-                ), redirect_url)))
-
-            if return_route:
-                return route, rv
+        route, rv, redirect = self.router.match_path(path)
+        if redirect is RequestSlash:
+            raise RequestRedirect(self.make_redirect_url(
+                urlquote(
+                    path_info, encoding=self.router.charset, safe='/:|+'
+                ) + '/', query_args
+            ))
+        if redirect is RequestAliasRedirect:
+            raise RequestRedirect(self.make_alias_redirect_url(
+                path, route.endpoint, rv, query_args
+            ))
+        if route is None:
+            raise NotFound()
+
+        if self.router.redirect_defaults:
+            redirect_url = self.get_default_redirect(route, rv, query_args)
+            if redirect_url is not None:
+                raise RequestRedirect(redirect_url)
+
+        if route.redirect_to is not None:
+            if isinstance(route.redirect_to, str):
+                def _handle_match(match):
+                    value = rv[match.group(1)]
+                    return route._converters[match.group(1)].to_url(value)
+                redirect_url = _simple_route_re.sub(
+                    _handle_match, route.redirect_to,
+                )
             else:
-                return route.endpoint, rv
-
-        raise NotFound()
+                redirect_url = route.redirect_to(self, **rv)
+            raise RequestRedirect(str(urljoin('%s://%s%s%s' % (
+                self.url_scheme,
+                self.subdomain and self.subdomain + '.' or '',
+                self.server_name,
+                self.script_name
+            ), redirect_url)))
+
+        if return_route:
+            return route, rv
+        else:
+            return route.endpoint, rv
 
     def test(self, path_info=None):
         """Test if a route would match.  Works like `match` but returns `True`
@@ -1539,7 +2210,7 @@ class MapAdapter(object):
             values = {}
 
         rv = None
-        for route in self.router._routes_by_endpoint.get(endpoint, ()):
+        for route in self.router.get_build_candidates(endpoint, values):
             if route.suitable_for(values):
                 rv = route.build(values, append_unknown)
                 if rv is not None:
@@ -1557,7 +2228,13 @@ class MapAdapter(object):
                 (host_matching and host == self.server_name) or
                 (not host_matching and domain_part == self.subdomain)
             ):
-                return str(urljoin(self.script_name, './' + path.lstrip('/')))
+                path = path.lstrip('/')
+                # `urljoin` is only needed to resolve dot segments and to
+                # collapse empty ones.
+                full_path = self.script_name + path.partition('?')[0]
+                if '/.' in full_path or '//' in full_path:
+                    return str(urljoin(self.script_name, './' + path))
+                return self.script_name + path
 
         return urlunparse(ParseResult(
             scheme=self.url_scheme or '',
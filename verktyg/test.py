@@ -98,12 +98,11 @@ def stream_encode_multipart(
                         break
                     write_binary(chunk)
             else:
+                write('\r\n\r\n')
                 if isinstance(value, str):
                     write(value)
                 else:
                     write_binary(value)
-                write('\r\n\r\n')
-                write_binary(value)
             write('\r\n')
     write('--%s--\r\n' % boundary)
 
@@ -571,7 +570,9 @@ class EnvironBuilder(object):
             )
             content_type += '; boundary="%s"' % boundary
         elif content_type == 'application/x-www-form-urlencoded':
-            values = urlencode(self.form, encoding=self.charset)
+            values = urlencode(
+                list(self.form.items(multi=True)), encoding=self.charset,
+            )
             values = values.encode('ascii')
             content_length = len(values)
             input_stream = BytesIO(values)
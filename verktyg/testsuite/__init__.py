@@ -13,8 +13,9 @@ import unittest
 from verktyg.testsuite import (
     test_utils, test_datastructures, test_exceptions, test_http,
     test_accept_content_type, test_accept_language, test_accept_charset,
-    test_accept, test_wsgi, test_requests, test_responses, test_routing,
-    test_dispatch, test_views, test_application, test_urls,
+    test_accept, test_wsgi, test_formparser, test_requests, test_responses,
+    test_routing, test_dispatch, test_exception_dispatch, test_views,
+    test_application, test_urls,
 )
 
 
@@ -25,10 +26,12 @@ suite = unittest.TestSuite((
     loader.loadTestsFromModule(test_exceptions),
     loader.loadTestsFromModule(test_http),
     loader.loadTestsFromModule(test_wsgi),
+    loader.loadTestsFromModule(test_formparser),
     loader.loadTestsFromModule(test_requests),
     loader.loadTestsFromModule(test_responses),
     loader.loadTestsFromModule(test_routing),
     loader.loadTestsFromModule(test_dispatch),
+    loader.loadTestsFromModule(test_exception_dispatch),
     loader.loadTestsFromModule(test_accept_content_type),
     loader.loadTestsFromModule(test_accept_language),
     loader.loadTestsFromModule(test_accept_charset),
@@ -13,6 +13,7 @@ from verktyg.exceptions import NotAcceptable
 from verktyg.accept import (
     Representation, select_representation, parse_accept_header,
 )
+from verktyg.accept._base import ParserCache
 
 
 class RepresentationTestCase(unittest.TestCase):
@@ -87,3 +88,41 @@ class RepresentationTestCase(unittest.TestCase):
             NotAcceptable,
             select_representation, [pdf_repr], accept='text/html'
         )
+
+
+class ParserCacheTestCase(unittest.TestCase):
+    def test_cached_after_second_use(self):
+        parse = ParserCache(parse_accept_header)
+
+        first = parse('text/html')
+        second = parse('text/html')
+        self.assertIsNot(first, second)
+        self.assertIs(parse('text/html'), second)
+        self.assertEqual(parse.cache.hits, 1)
+        self.assertEqual(parse.cache.misses, 2)
+
+    def test_unique_headers_not_cached(self):
+        parse = ParserCache(parse_accept_header, maxsize=4)
+        parse('text/html')
+        parse('text/html')
+
+        for i in range(100):
+            parse('text/x-%d' % i)
+        self.assertEqual(len(parse.cache), 1)
+        self.assertIn('text/html', parse.cache)
+
+    def test_long_headers_not_cached(self):
+        parse = ParserCache(parse_accept_header, max_length=16)
+        header = 'text/html,application/json'
+        for i in range(3):
+            parse(header)
+        self.assertEqual(len(parse.cache), 0)
+
+    def test_invalid_header(self):
+        parse = ParserCache(parse_accept_header)
+        for i in range(3):
+            self.assertRaises(ValueError, parse, 'text/html;q')
+
+    def test_immutable(self):
+        accept = parse_accept_header('text/html,application/json')
+        self.assertIsInstance(accept._options, tuple)
@@ -9,12 +9,13 @@
 """
 import unittest
 
-from verktyg.test import Client
+from verktyg.test import Client, create_environ
 from verktyg.exceptions import HTTPException, NotFound, ImATeapot
 from verktyg.responses import Response, BaseResponse
 from verktyg.views import expose
 from verktyg.routing import Route
 from verktyg.application import ApplicationBuilder
+from verktyg.wsgi import ResponseCacheMiddleware
 
 
 class ApplicationTestCase(unittest.TestCase):
@@ -198,3 +199,68 @@ class ApplicationTestCase(unittest.TestCase):
         except NotFound:
             pass
         self.assertEqual(closed, 2)
+
+    def test_close_before_return(self):
+        closed = []
+
+        builder = ApplicationBuilder()
+        builder.add_routes(
+            Route('/', endpoint='index'),
+            Route('/stream', endpoint='stream'),
+        )
+
+        @expose(builder, 'index')
+        def index(app, request):
+            request.call_on_close(lambda: closed.append('request'))
+            response = Response(['Hello ', 'World'])
+            response.call_on_close(lambda: closed.append('response'))
+            return response
+
+        @expose(builder, 'stream')
+        def stream(app, request):
+            request.call_on_close(lambda: closed.append('request'))
+            response = Response(iter(['Hello ', 'World']))
+            response.call_on_close(lambda: closed.append('response'))
+            return response
+
+        app = builder()
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started.append((status, headers))
+
+        app_iter = app(create_environ('/'), start_response)
+        self.assertEqual(app_iter, [b'Hello World'])
+        self.assertEqual(closed, ['response', 'request'])
+        self.assertEqual(started[-1][0], '200 OK')
+        self.assertIn(('Content-Length', '11'), started[-1][1])
+
+        del closed[:]
+        app_iter = app(create_environ('/stream'), start_response)
+        self.assertEqual(closed, [])
+        self.assertEqual(b''.join(app_iter), b'Hello World')
+        app_iter.close()
+        self.assertIn('response', closed)
+        self.assertEqual(closed[-1], 'request')
+
+    def test_response_cache_middleware(self):
+        calls = 0
+
+        builder = ApplicationBuilder()
+
+        @builder.expose(route='/')
+        def index(app, req):
+            nonlocal calls
+            calls += 1
+            response = Response('Hello %d' % calls)
+            response.headers['Cache-Control'] = 'max-age=60'
+            return response
+
+        builder.add_middleware(ResponseCacheMiddleware)
+
+        app = builder()
+        client = Client(app, BaseResponse)
+
+        self.assertEqual(client.get('/').get_data(), b'Hello 1')
+        self.assertEqual(client.get('/').get_data(), b'Hello 1')
+        self.assertEqual(calls, 1)
@@ -618,3 +618,39 @@ class CallbackDictTestCase(unittest.TestCase):
             self.assertRaises(KeyError, lambda: dct.__delitem__('x'))
         with assert_calls(0, 'callback triggered by failed pop'):
             self.assertRaises(KeyError, lambda: dct.pop('x'))
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def test_get_set(self):
+        cache = datastructures.LRUCache(2)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b', 'default'), 'default')
+        self.assertIn('a', cache)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 2)
+
+    def test_eviction(self):
+        cache = datastructures.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        cache = datastructures.LRUCache(2)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 1)
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, datastructures.LRUCache, 0)
@@ -146,3 +146,40 @@ class DispatchTestCase(unittest.TestCase):
         self.assertEqual(
             'Nested',
             parent.lookup('nested')(None, None))
+
+    def test_lookup_cache(self):
+        dispatcher = Dispatcher([
+            Binding(
+                'test', _make_view('json'), content_type='application/json'
+            ),
+            Binding('test', _make_view('html'), content_type='text/html'),
+        ], cache_size=16)
+
+        for i in range(2):
+            self.assertEqual(
+                'html',
+                dispatcher.lookup('test', accept='text/html')(None, None)
+            )
+            self.assertRaises(
+                NotAcceptable, dispatcher.lookup, 'test', accept='image/png'
+            )
+            self.assertRaises(
+                MethodNotAllowed, dispatcher.lookup, 'test', method='PUT'
+            )
+        self.assertEqual(dispatcher.cache.hits, 3)
+        self.assertEqual(dispatcher.cache.misses, 3)
+
+        # adding bindings invalidates the cache
+        dispatcher.add_bindings(
+            Binding('test', _make_view('png'), content_type='image/png'),
+        )
+        self.assertEqual(
+            'png', dispatcher.lookup('test', accept='image/png')(None, None)
+        )
+
+    def test_lookup_cache_disabled(self):
+        dispatcher = Dispatcher([
+            Binding('test', _make_view('get')),
+        ], cache_size=None)
+        self.assertIsNone(dispatcher.cache)
+        self.assertEqual('get', dispatcher.lookup('test')(None, None))
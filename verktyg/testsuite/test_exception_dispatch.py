@@ -0,0 +1,105 @@
+"""
+    verktyg.testsuite.test_exception_dispatch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for the exception dispatcher.
+
+    :copyright: (c) 2014 by Ben Mather.
+    :license: BSD, see LICENSE for more details.
+"""
+import unittest
+
+from verktyg.exception_dispatch import ExceptionHandler, ExceptionDispatcher
+
+
+class _BaseError(Exception):
+    pass
+
+
+class _ChildError(_BaseError):
+    pass
+
+
+def _make_action(value):
+    def action(app, req, exc_type, exc_value, exc_traceback):
+        return value
+    return action
+
+
+class ExceptionDispatcherTestCase(unittest.TestCase):
+    def test_mro_lookup(self):
+        base_action = _make_action('base')
+        child_action = _make_action('child')
+        dispatcher = ExceptionDispatcher([
+            ExceptionHandler(_BaseError, base_action),
+            ExceptionHandler(_ChildError, child_action),
+        ])
+
+        self.assertIs(dispatcher.lookup(_ChildError), child_action)
+        self.assertIs(dispatcher.lookup(_BaseError), base_action)
+        self.assertIsNone(dispatcher.lookup(ValueError))
+
+    def test_accept_fallthrough(self):
+        base_action = _make_action('base')
+        json_action = _make_action('json')
+        dispatcher = ExceptionDispatcher([
+            ExceptionHandler(_BaseError, base_action),
+            ExceptionHandler(
+                _ChildError, json_action, content_type='application/json',
+            ),
+        ])
+
+        self.assertIs(
+            dispatcher.lookup(_ChildError, accept='application/json'),
+            json_action,
+        )
+        self.assertIs(
+            dispatcher.lookup(_ChildError, accept='text/html'),
+            base_action,
+        )
+
+    def test_cache(self):
+        action = _make_action('base')
+        dispatcher = ExceptionDispatcher([
+            ExceptionHandler(_BaseError, action),
+        ])
+
+        for i in range(2):
+            self.assertIs(dispatcher.lookup(_ChildError), action)
+            self.assertIsNone(dispatcher.lookup(ValueError))
+        self.assertEqual(dispatcher.cache.hits, 2)
+        self.assertEqual(dispatcher.cache.misses, 2)
+
+        # adding handlers invalidates the cache
+        child_action = _make_action('child')
+        dispatcher.add_exception_handlers(
+            ExceptionHandler(_ChildError, child_action),
+        )
+        self.assertIs(dispatcher.lookup(_ChildError), child_action)
+
+        value_action = _make_action('value')
+        dispatcher.add_exception_handlers(
+            ExceptionHandler(ValueError, value_action),
+        )
+        self.assertIs(dispatcher.lookup(ValueError), value_action)
+
+    def test_cache_disabled(self):
+        action = _make_action('base')
+        dispatcher = ExceptionDispatcher([
+            ExceptionHandler(_BaseError, action),
+        ], cache_size=None)
+        self.assertIsNone(dispatcher.cache)
+        self.assertIs(dispatcher.lookup(_ChildError), action)
+
+    def test_cache_bounded(self):
+        action = _make_action('base')
+        dispatcher = ExceptionDispatcher([
+            ExceptionHandler(_BaseError, action),
+        ], cache_size=2)
+
+        # Dynamically created exception classes must not accumulate.
+        for i in range(10):
+            error_class = type('Error%d' % i, (_BaseError,), {})
+            self.assertIs(dispatcher.lookup(error_class), action)
+        self.assertEqual(len(dispatcher.cache), 2)
+        self.assertEqual(len(dispatcher._chains), 2)
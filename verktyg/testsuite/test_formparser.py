@@ -0,0 +1,263 @@
+"""
+    verktyg.testsuite.formparser
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for the form parsing facilities.
+
+    :copyright:
+        (c) 2017 Ben Mather, based on Werkzeug, see AUTHORS for more details.
+    :license:
+        BSD, see LICENSE for more details.
+"""
+import unittest
+
+from io import BytesIO
+
+from verktyg.test import create_environ
+from verktyg.requests import Request
+from verktyg.exceptions import RequestEntityTooLarge
+from verktyg.formparser import (
+    FormDataParser, MultiPartParser, parse_form_data, _iter_urlencoded,
+)
+
+
+def _multipart(*parts, boundary='boundary'):
+    body = b''.join(
+        b'--' + boundary.encode('ascii') + b'\r\n' + headers + b'\r\n\r\n' +
+        data + b'\r\n'
+        for headers, data in parts
+    )
+    return body + b'--' + boundary.encode('ascii') + b'--\r\n'
+
+
+def _field(name, value):
+    return (
+        b'Content-Disposition: form-data; name="' + name + b'"', value,
+    )
+
+
+def _file(name, filename, value, content_type=b'text/plain'):
+    return (
+        b'Content-Disposition: form-data; name="' + name + b'"; '
+        b'filename="' + filename + b'"\r\n'
+        b'Content-Type: ' + content_type, value,
+    )
+
+
+class FormParserTestCase(unittest.TestCase):
+    def test_multipart(self):
+        upload = BytesIO(b'file contents')
+        req = Request.from_values(method='POST', data={
+            'foo': 'bar',
+            'baz': ['one', 'two'],
+            'upload': (upload, 'test.txt', 'text/plain'),
+        })
+
+        self.assertEqual(req.form['foo'], 'bar')
+        self.assertEqual(req.form.getlist('baz'), ['one', 'two'])
+        self.assertEqual(req.files['upload'].filename, 'test.txt')
+        self.assertEqual(req.files['upload'].name, 'upload')
+        self.assertEqual(req.files['upload'].content_type, 'text/plain')
+        self.assertEqual(req.files['upload'].read(), b'file contents')
+        req.close()
+
+    def test_large_file_spooled_to_disk(self):
+        data = b'0123456789abcdef' * (1024 * 64)
+        req = Request.from_values(method='POST', data={
+            'upload': (BytesIO(data), 'large.bin'),
+            'small': (BytesIO(b'small'), 'small.bin'),
+        })
+
+        self.assertTrue(req.files['upload'].stream._rolled)
+        self.assertFalse(req.files['small'].stream._rolled)
+        self.assertEqual(req.files['upload'].read(), data)
+        self.assertEqual(req.files['small'].read(), b'small')
+        req.close()
+
+    def test_split_boundaries(self):
+        # Check that the result does not depend on where the reads from the
+        # input stream happen to split the body.
+        value = b'\r\n--boundar\r\n-' * 100
+        body = (
+            b'preamble\r\n' +
+            _multipart(
+                _field(b'a', value),
+                (b'Content-Disposition: form-data; name="b"', b''),
+                _file(b'c', b'c.txt', value * 20),
+            ) +
+            b'epilogue'
+        )
+        for offset in range(0, 40, 3):
+            stream = BytesIO(body)
+            parser = MultiPartParser(buffer_size=1024 + offset)
+            form, files = parser.parse(stream, b'boundary', len(body))
+            self.assertEqual(form['a'], value.decode('ascii'))
+            self.assertEqual(form['b'], '')
+            self.assertEqual(files['c'].read(), value * 20)
+
+    def test_missing_content_disposition(self):
+        body = b'--boundary\r\n\r\nvalue\r\n--boundary--'
+        parser = MultiPartParser()
+        with self.assertRaises(ValueError):
+            parser.parse(BytesIO(body), b'boundary', len(body))
+
+    def test_transport_padding(self):
+        body = (
+            b'--boundary  \r\n'
+            b'Content-Disposition: form-data; name="foo"\r\n\r\n'
+            b'bar\r\n'
+            b'--boundary--'
+        )
+        form, files = MultiPartParser().parse(
+            BytesIO(body), b'boundary', len(body),
+        )
+        self.assertEqual(form['foo'], 'bar')
+
+    def test_truncated(self):
+        body = _multipart(_field(b'foo', b'bar'))[:-20]
+        environ = create_environ(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+            content_length=len(body),
+        )
+        stream, form, files = parse_form_data(environ)
+        self.assertEqual(form, {})
+        self.assertEqual(files, {})
+
+        environ = create_environ(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+            content_length=len(body),
+        )
+        with self.assertRaises(ValueError):
+            parse_form_data(environ, silent=False)
+
+    def test_missing_boundary(self):
+        parser = FormDataParser(silent=False)
+        with self.assertRaises(ValueError):
+            parser.parse(BytesIO(b''), 'multipart/form-data', 0, {})
+
+    def test_max_content_length(self):
+        body = _multipart(_file(b'foo', b'foo.txt', b'x' * 1000))
+        req = Request.from_values(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+            content_length=len(body),
+        )
+        req.max_content_length = 500
+        with self.assertRaises(RequestEntityTooLarge):
+            req.files
+
+    def test_max_content_length_unknown_length(self):
+        body = _multipart(_file(b'foo', b'foo.txt', b'x' * 100000))
+        environ = create_environ(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+        )
+        environ['wsgi.input_terminated'] = True
+        with self.assertRaises(RequestEntityTooLarge):
+            parse_form_data(environ, max_content_length=50000)
+
+    def test_max_form_memory_size(self):
+        body = _multipart(
+            _field(b'foo', b'x' * 1000),
+            _file(b'bar', b'bar.txt', b'x' * 100000),
+        )
+        req = Request.from_values(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+            content_length=len(body),
+        )
+        req.max_form_memory_size = 2000
+        self.assertEqual(len(req.form['foo']), 1000)
+        self.assertEqual(len(req.files['bar'].read()), 100000)
+        req.close()
+
+        req = Request.from_values(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+            content_length=len(body),
+        )
+        req.max_form_memory_size = 500
+        with self.assertRaises(RequestEntityTooLarge):
+            req.form
+
+    def test_unknown_mimetype(self):
+        req = Request.from_values(
+            input_stream=BytesIO(b'{"foo": "bar"}'), method='POST',
+            content_type='application/json',
+        )
+        self.assertEqual(req.form, {})
+        self.assertEqual(req.files, {})
+        self.assertEqual(req.stream.read(), b'{"foo": "bar"}')
+
+    def test_urlencoded(self):
+        req = Request.from_values(method='POST', data={
+            'foo': 'bar', 'baz': ['one', 'two'], 'empty': '',
+            'unicode': '☃ & =',
+        })
+        self.assertIsInstance(req.form, Request.parameter_storage_class)
+        self.assertEqual(req.form['foo'], 'bar')
+        self.assertEqual(req.form.getlist('baz'), ['one', 'two'])
+        self.assertEqual(req.form['empty'], '')
+        self.assertEqual(req.form['unicode'], '☃ & =')
+        self.assertEqual(req.files, {})
+
+    def test_urlencoded_split_reads(self):
+        body = b'&'.join(
+            b'key%d=' % i + b'%E2%98%83+' * i for i in range(100)
+        ) + b'&&flag'
+        environ = create_environ(
+            input_stream=BytesIO(body), method='POST',
+            content_type='application/x-www-form-urlencoded',
+            content_length=len(body),
+        )
+
+        pairs = list(_iter_urlencoded(BytesIO(body), buffer_size=7))
+        self.assertEqual(len(pairs), 101)
+
+        stream, form, files = parse_form_data(environ)
+        self.assertEqual(len(form), 101)
+        self.assertEqual(form['key3'], '☃ ' * 3)
+        self.assertEqual(form['flag'], '')
+
+    def test_urlencoded_max_form_parts(self):
+        data = {'field%d' % i: 'value' for i in range(10)}
+
+        req = Request.from_values(method='POST', data=data)
+        req.max_form_parts = 10
+        self.assertEqual(len(req.form), 10)
+
+        req = Request.from_values(method='POST', data=data)
+        req.max_form_parts = 9
+        with self.assertRaises(RequestEntityTooLarge):
+            req.form
+
+    def test_urlencoded_max_form_memory_size(self):
+        req = Request.from_values(method='POST', data={'foo': 'x' * 1000})
+        req.max_form_memory_size = 500
+        with self.assertRaises(RequestEntityTooLarge):
+            req.form
+
+        # the limit also applies if no content length was transmitted
+        body = b'foo=' + b'x' * 100000
+        environ = create_environ(
+            input_stream=BytesIO(body), method='POST',
+            content_type='application/x-www-form-urlencoded',
+        )
+        environ['wsgi.input_terminated'] = True
+        with self.assertRaises(RequestEntityTooLarge):
+            parse_form_data(environ, max_form_memory_size=50000)
+
+    def test_multipart_max_form_parts(self):
+        body = _multipart(
+            _field(b'foo', b'bar'),
+            _file(b'baz', b'baz.txt', b'qux'),
+        )
+        environ = create_environ(
+            input_stream=BytesIO(body), method='POST',
+            content_type='multipart/form-data; boundary=boundary',
+            content_length=len(body),
+        )
+        with self.assertRaises(RequestEntityTooLarge):
+            parse_form_data(environ, max_form_parts=1)
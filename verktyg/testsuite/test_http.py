@@ -180,6 +180,38 @@ class HeadersTestCase(unittest.TestCase):
         self.assertEqual(h.get('x-foo-poo', as_bytes=True), b'bleh')
         self.assertEqual(h.get('x-whoops', as_bytes=True), b'\xff')
 
+    def test_lookups_after_mutation(self):
+        headers = self.storage_class([
+            ('Set-Cookie', 'a=1'),
+            ('X-Foo', 'foo'),
+            ('set-cookie', 'b=2'),
+        ])
+        self.assertEqual(headers.getlist('SET-COOKIE'), ['a=1', 'b=2'])
+
+        headers.add('Set-Cookie', 'c=3')
+        self.assertEqual(headers.getlist('Set-Cookie'), ['a=1', 'b=2', 'c=3'])
+
+        del headers[0]
+        self.assertEqual(headers['set-cookie'], 'b=2')
+
+        headers[0] = ('X-Bar', 'bar')
+        self.assertNotIn('X-Foo', headers)
+        self.assertEqual(headers['x-bar'], 'bar')
+
+        headers.set('Set-Cookie', 'd=4')
+        self.assertEqual(headers.getlist('Set-Cookie'), ['d=4'])
+
+        self.assertEqual(headers.pop(), ('Set-Cookie', 'd=4'))
+        self.assertNotIn('Set-Cookie', headers)
+        self.assertEqual(headers.get('X-Bar'), 'bar')
+
+        headers.remove('x-bar')
+        self.assertEqual(headers.to_wsgi_list(), [])
+
+        headers.add('X-Foo', 'foo')
+        headers.clear()
+        self.assertNotIn('X-Foo', headers)
+
     def test_to_wsgi_list(self):
         h = self.storage_class()
         h.set(u'Key', u'Value')
@@ -9,6 +9,7 @@
     :license:
         BSD, see LICENSE for more details.
 """
+import gzip
 import unittest
 
 import pickle
@@ -16,12 +17,16 @@ from io import BytesIO
 from datetime import datetime
 
 from verktyg.datastructures import (
-    MultiDict, ImmutableList,
+    MultiDict, ImmutableMultiDict, ImmutableList,
     ImmutableTypeConversionDict,
 )
 from verktyg.test import Client
 from verktyg.wsgi import LimitedStream
-from verktyg.exceptions import SecurityError
+from verktyg.urls import LazyURLArgs
+from verktyg.exceptions import (
+    SecurityError, BadRequest, RequestEntityTooLarge, RequestURITooLarge,
+    UnsupportedMediaType,
+)
 from verktyg.requests import BaseRequest, Request
 from verktyg.responses import BaseResponse
 
@@ -262,6 +267,56 @@ class RequestsTestCase(unittest.TestCase):
         self.assertEqual(req.get_data(), data)
         self.assertTrue(isinstance(req.stream, LimitedStream))
 
+    def test_lazy_args(self):
+        class LazyRequest(Request):
+            lazy_args = True
+
+        req = LazyRequest.from_values(
+            '/?a=1&b=x+y&a=2&empty=&%C3%A9=%C3%A5&c=3'
+        )
+        self.assertIsInstance(req.args, LazyURLArgs)
+        self.assertEqual(req.args['a'], '1')
+        self.assertEqual(req.args.getlist('a'), ['1', '2'])
+        self.assertEqual(req.args.get('a', type=int), 1)
+        self.assertEqual(req.args.get('b', type=int), None)
+        self.assertEqual(req.args['b'], 'x y')
+        self.assertEqual(req.args['\xe9'], '\xe5')
+        self.assertNotIn('empty', req.args)
+        self.assertIsNone(req.args.get('missing'))
+        self.assertRaises(KeyError, lambda: req.args['missing'])
+        self.assertIsNone(req.args._materialized)
+
+        eager = Request(dict(req.environ))
+        self.assertEqual(list(req.args.items(multi=True)), list(
+            eager.args.items(multi=True)
+        ))
+        self.assertEqual(req.args, eager.args)
+        self.assertEqual(len(req.args), 4)
+        self.assertIs(type(req.args._materialized), ImmutableMultiDict)
+
+        req = LazyRequest.from_values('/?a%26b=1&c=2')
+        self.assertEqual(req.args['a&b'], '1')
+        self.assertEqual(req.args['c'], '2')
+
+    def test_max_query_parameters(self):
+        class LimitedRequest(Request):
+            max_query_parameters = 3
+
+        class LazyRequest(LimitedRequest):
+            lazy_args = True
+
+        for cls in (LimitedRequest, LazyRequest):
+            req = cls.from_values('/?a=1&b=2&c=3')
+            self.assertEqual(req.args['c'], '3')
+
+            req = cls.from_values('/?a=1&b=2&c=3&d=4')
+            with self.assertRaises(RequestURITooLarge):
+                req.args
+
+        # there is no limit unless one is configured
+        query = '&'.join('a%d=b' % i for i in range(2000))
+        self.assertEqual(len(Request.from_values('/?' + query).args), 2000)
+
     def test_storage_classes(self):
         class MyRequest(Request):
             dict_storage_class = dict
@@ -290,3 +345,135 @@ class RequestsTestCase(unittest.TestCase):
     def test_request_method_case_sensitivity(self):
         req = Request({'REQUEST_METHOD': 'get'})
         self.assertEqual(req.method, 'GET')
+
+    def test_spooled_body(self):
+        class SpoolingRequest(Request):
+            body_memory_threshold = 1024
+
+        for size in [0, 100, 100000]:
+            data = bytes(range(256)) * (size // 256)
+            req = SpoolingRequest.from_values(
+                input_stream=BytesIO(data), method='POST',
+                content_length=len(data), content_type='text/plain'
+            )
+            self.assertEqual(req.get_data(), data)
+            self.assertEqual(req.get_data(cache=False), data)
+            self.assertFalse(hasattr(req, '_cached_data'))
+            self.assertEqual(req._body_buffer._rolled, len(data) > 1024)
+
+            view = req.get_data_view()
+            self.assertEqual(view, data)
+            self.assertTrue(view.readonly)
+            view.release()
+
+            buffer = req._body_buffer
+            req.close()
+            self.assertTrue(buffer.closed)
+
+    def test_spooled_body_form_parsing(self):
+        class SpoolingRequest(Request):
+            body_memory_threshold = 16
+
+        req = SpoolingRequest.from_values(method='POST', data={
+            'foo': 'bar', 'baz': 'x' * 100,
+        })
+        data = req.get_data()
+        self.assertIn(b'foo=bar', data)
+        self.assertEqual(req.form['foo'], 'bar')
+        self.assertEqual(req.get_data(), data)
+        req.close()
+
+    def test_data_view(self):
+        data = b'Hello World'
+        req = Request.from_values(
+            input_stream=BytesIO(data), method='POST',
+            content_length=len(data), content_type='text/plain'
+        )
+        self.assertEqual(req.get_data_view(), data)
+        self.assertEqual(req.get_data(), data)
+
+    def test_iter_json_lines(self):
+        data = b'{"id": 1}\n\n[1, 2, 3]\r\n"\xe2\x98\x83"\n{"id": 4}'
+        req = Request.from_values(
+            input_stream=BytesIO(data), method='POST',
+            content_length=len(data), content_type='application/x-ndjson'
+        )
+        self.assertEqual(
+            list(req.iter_json_lines()),
+            [{'id': 1}, [1, 2, 3], '\N{SNOWMAN}', {'id': 4}],
+        )
+
+        # records are decoded as they are read
+        req = Request.from_values(
+            input_stream=BytesIO(b'{"id": 1}\n{"id": 2}\nnot json\n'),
+            method='POST', content_length=29,
+        )
+        records = req.iter_json_lines()
+        self.assertEqual(next(records), {'id': 1})
+        self.assertEqual(next(records), {'id': 2})
+        self.assertRaises(BadRequest, next, records)
+
+    def test_iter_json_lines_limits(self):
+        data = b'{"id": 1}\n{"name": "a long record"}\n'
+
+        def make_request():
+            return Request.from_values(
+                input_stream=BytesIO(data), method='POST',
+                content_length=len(data),
+            )
+
+        self.assertEqual(
+            len(list(make_request().iter_json_lines(max_record_size=25))), 2,
+        )
+        records = make_request().iter_json_lines(max_record_size=20)
+        self.assertEqual(next(records), {'id': 1})
+        self.assertRaises(RequestEntityTooLarge, next, records)
+
+        records = make_request().iter_json_lines(max_size=20)
+        self.assertRaises(RequestEntityTooLarge, next, records)
+
+        req = make_request()
+        req.max_content_length = 20
+        self.assertRaises(RequestEntityTooLarge, list, req.iter_json_lines())
+
+        # the total size is also enforced if no content length is known
+        req = Request.from_values(
+            input_stream=BytesIO(data), method='POST',
+        )
+        req.environ.pop('CONTENT_LENGTH', None)
+        req.environ['wsgi.input_terminated'] = True
+        records = req.iter_json_lines(max_size=20)
+        self.assertEqual(next(records), {'id': 1})
+        self.assertRaises(RequestEntityTooLarge, next, records)
+
+    def test_decompress_body(self):
+        class DecompressingRequest(Request):
+            decompress_body = True
+            max_decompressed_size = 1024
+
+        data = b'{"id": 1}\n{"id": 2}\n'
+        body = gzip.compress(data)
+
+        def make_request(cls, body, encoding):
+            return cls.from_values(
+                input_stream=BytesIO(body), method='POST',
+                content_length=len(body),
+                headers={'Content-Encoding': encoding},
+            )
+
+        req = make_request(DecompressingRequest, body, 'gzip')
+        self.assertEqual(list(req.iter_json_lines()), [{'id': 1}, {'id': 2}])
+
+        req = make_request(DecompressingRequest, data, 'identity')
+        self.assertEqual(req.get_data(), data)
+
+        # disabled by default
+        req = make_request(Request, body, 'gzip')
+        self.assertEqual(req.get_data(), body)
+
+        req = make_request(DecompressingRequest, body, 'br')
+        self.assertRaises(UnsupportedMediaType, req.get_data)
+
+        body = gzip.compress(b'x' * 2048)
+        req = make_request(DecompressingRequest, body, 'gzip')
+        self.assertRaises(RequestEntityTooLarge, req.get_data)
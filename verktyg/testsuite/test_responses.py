@@ -185,6 +185,73 @@ class ResponsesTestCase(unittest.TestCase):
         response.make_conditional(env)
         self.assertEqual(response.content_length, 999)
 
+    def test_streamed_etag(self):
+        closed = []
+
+        def generate():
+            try:
+                yield 'Hello '
+                yield 'World'
+            finally:
+                closed.append(True)
+
+        env = create_environ()
+        response = Response(generate())
+        response.make_conditional(env, add_etag=True)
+        self.assertEqual(
+            response.get_etag(), (generate_etag(b'Hello World'), False)
+        )
+        self.assertEqual(response.content_length, 11)
+        self.assertEqual(response.status_code, 200)
+
+        env['HTTP_IF_NONE_MATCH'] = '"%s"' % generate_etag(b'Hello World')
+        response = Response(generate())
+        response.make_conditional(env, add_etag=True)
+        self.assertEqual(response.status_code, 304)
+        resp = Response.from_app(response, env)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.get_data(), b'')
+
+        # bodies larger than the limit are streamed through untouched
+        del closed[:]
+        response = Response(generate())
+        self.assertFalse(response.add_streamed_etag(max_size=8))
+        self.assertEqual(response.get_etag(), (None, None))
+        self.assertFalse(response.is_sequence)
+        self.assertEqual(closed, [])
+        response.close()
+        self.assertEqual(closed, [True])
+        del closed[:]
+
+        class LimitedResponse(Response):
+            streamed_etag_max_size = 8
+
+        response = LimitedResponse(generate())
+        response.make_conditional(env, add_etag=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('content-length', response.headers)
+        resp = Response.from_app(response, env)
+        self.assertEqual(resp.get_data(), b'Hello World')
+        self.assertEqual(closed, [True])
+
+        # an existing etag does not cause the stream to be buffered
+        del closed[:]
+        response = Response(generate())
+        response.set_etag('abc')
+        self.assertFalse(response.add_streamed_etag())
+        response.make_conditional(create_environ(), add_etag=True)
+        self.assertFalse(response.is_sequence)
+        self.assertNotIn('content-length', response.headers)
+        self.assertEqual(response.get_etag(), ('abc', False))
+        self.assertEqual(b''.join(response.iter_encoded()), b'Hello World')
+
+        # buffered bodies are always hashed
+        response = Response(['Hello ', 'World'])
+        self.assertTrue(response.add_streamed_etag(max_size=8))
+        self.assertEqual(
+            response.get_etag(), (generate_etag(b'Hello World'), False)
+        )
+
     def test_etag_response_mixin_freezing(self):
         class WithFreeze(ETagResponseMixin, BaseResponse):
             pass
@@ -451,6 +518,41 @@ class ResponsesTestCase(unittest.TestCase):
         resp.stream.writelines(['bar', 'baz'])
         self.assertEqual(resp.get_wsgi_headers({})['Content-Length'], '9')
 
+    def test_write_buffer_size(self):
+        class MyResponse(Response):
+            write_buffer_size = 8
+
+        def generate():
+            for i in range(5):
+                yield 'row%d' % i
+            yield ''
+            yield 'x'
+            yield b'0123456789'
+
+        resp = MyResponse(generate())
+        self.assertEqual(list(resp.iter_encoded()), [
+            b'row0row1', b'row2row3', b'row4', b'x0123456789',
+        ])
+
+        resp = MyResponse(iter([b'0123456789', b'a', b'b']))
+        self.assertEqual(list(resp.iter_encoded()), [b'0123456789', b'ab'])
+
+        resp = Response(generate())
+        self.assertEqual(len(list(resp.iter_encoded())), 8)
+
+    def test_write_buffer_stream(self):
+        class MyResponse(Response):
+            write_buffer_size = 1024
+
+        resp = MyResponse()
+        resp.stream.write('foo')
+        resp.stream.write('bar')
+        resp.stream.flush()
+        resp.stream.write('baz')
+        self.assertEqual(resp.response, ['foo', 'bar', 'baz'])
+        self.assertEqual(list(resp.iter_encoded()), [b'foobarbaz'])
+        self.assertEqual(resp.get_wsgi_headers({})['Content-Length'], '9')
+
     def test_disabled_auto_content_length(self):
         class MyResponse(Response):
             automatically_set_content_length = False
@@ -468,6 +570,40 @@ class ResponsesTestCase(unittest.TestCase):
         self.assertIsNone(resp.content_length)
         self.assertNotIn('Content-Length', resp.get_wsgi_headers({}))
 
+    def test_wsgi_header_list(self):
+        env = create_environ()
+
+        def check(resp):
+            self.assertEqual(
+                resp.get_wsgi_header_list(env),
+                resp.get_wsgi_headers(env).to_wsgi_list(),
+            )
+
+        check(Response('{}', mimetype='application/json'))
+        check(Response(['Hello ', 'World!']))
+        check(Response(iter(['Hello World!'])))
+        check(Response('Hello World!', headers={'Location': '/test'}))
+        check(Response('Hello World!', headers={'Content-Location': '/a'}))
+        check(Response('Hello World!', status=204))
+        check(Response('Hello World!', status=304))
+
+        resp = Response(['Hello World!'])
+        self.assertEqual(resp.get_wsgi_header_list(env), [
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Content-Length', '12'),
+        ])
+
+        class MyResponse(Response):
+            def get_wsgi_headers(self, environ):
+                headers = super(MyResponse, self).get_wsgi_headers(environ)
+                headers['X-Foo'] = 'bar'
+                return headers
+
+        resp = MyResponse('Hello World!')
+        self.assertIn(('X-Foo', 'bar'), resp.get_wsgi_header_list(env))
+        app_iter, status, headers = resp.get_wsgi_response(env)
+        self.assertIn(('X-Foo', 'bar'), headers)
+
     def test_location_header_autocorrect(self):
         env = create_environ()
 
@@ -482,3 +618,15 @@ class ResponsesTestCase(unittest.TestCase):
         self.assertEqual(
             resp.get_wsgi_headers(env)['Location'], 'http://localhost/test'
         )
+
+        resp = Response('Hello World!')
+        resp.headers.add('Location', '/first')
+        resp.headers.add('Location', '/second')
+        self.assertEqual(
+            resp.get_wsgi_headers(env).getlist('Location'),
+            ['http://localhost/second'],
+        )
+        self.assertIn(
+            ('Location', 'http://localhost/second'),
+            resp.get_wsgi_header_list(env),
+        )
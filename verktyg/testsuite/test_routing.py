@@ -11,6 +11,7 @@
 """
 import unittest
 import uuid
+import pickle
 
 from verktyg.datastructures import ImmutableDict
 from verktyg.test import create_environ
@@ -18,9 +19,57 @@ from verktyg import routing as r
 
 
 class RoutingTestCase(unittest.TestCase):
+    def make_map(self, *args, map_class=r.URLMap, **kwargs):
+        """Creates the router for a test.  Overridden to rerun the routing
+        tests with different defaults for the arguments to `URLMap`.
+        """
+        return map_class(*args, **kwargs)
+
+    def test_add_routes_in_use(self):
+        def make_routes():
+            return [
+                r.Route('/', endpoint='index'),
+                r.Route('/<int:id>', endpoint='show'),
+                r.Route('/foo/', endpoint='foo'),
+                r.Route('/<id>', endpoint='name'),
+                r.Route('/foo/<path:rest>', endpoint='rest'),
+                r.Route('/bar', endpoint='bar', build_only=True),
+                r.Route('/<a>/<b>', endpoint='pair'),
+                r.Route('/<int:id>', endpoint='duplicate'),
+                r.Route('/foo/bar', endpoint='foo_bar'),
+            ]
+
+        paths = [
+            '/', '/1', '/foo', '/foo/', '/foo/bar', '/foo/a/b', '/bar',
+            '/a/b', '/a/b/c',
+        ]
+
+        def outcomes(adapter):
+            rv = []
+            for path in paths:
+                try:
+                    rv.append(adapter.match(path))
+                except (r.NotFound, r.RequestRedirect) as e:
+                    rv.append(type(e))
+            return rv
+
+        routes = make_routes()
+        map = self.make_map(routes[:1])
+        adapter = map.bind('example.com')
+        adapter.match('/')
+        matcher = map._matcher
+
+        for count, route in enumerate(routes[1:], 2):
+            map.add_routes(route)
+            expected = self.make_map(make_routes()[:count])
+            self.assertEqual(
+                outcomes(adapter), outcomes(expected.bind('example.com')),
+            )
+        # routes are added to the matcher rather than replacing it.
+        self.assertIs(map._matcher, matcher)
 
     def test_basic_routing(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', endpoint='index'),
             r.Route('/foo', endpoint='foo'),
             r.Route('/bar/', endpoint='bar')
@@ -86,7 +135,7 @@ class RoutingTestCase(unittest.TestCase):
     def test_environ_defaults(self):
         environ = create_environ("/foo")
         self.assertEqual(environ["PATH_INFO"], '/foo')
-        m = r.URLMap([
+        m = self.make_map([
             r.Route("/foo", endpoint="foo"),
             r.Route("/bar", endpoint="bar"),
         ])
@@ -98,7 +147,7 @@ class RoutingTestCase(unittest.TestCase):
 
     def test_environ_nonascii_pathinfo(self):
         environ = create_environ(u'/лошадь')
-        m = r.URLMap([
+        m = self.make_map([
             r.Route(u'/', endpoint='index'),
             r.Route(u'/лошадь', endpoint='horse')
         ])
@@ -108,7 +157,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertRaises(r.NotFound, a.match, u'/барсук')
 
     def test_basic_building(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', endpoint='index'),
             r.Route('/foo', endpoint='foo'),
             r.Route('/bar/<baz>', endpoint='bar'),
@@ -180,7 +229,7 @@ class RoutingTestCase(unittest.TestCase):
         )
 
     def test_defaults(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/foo/', defaults={'page': 1}, endpoint='foo'),
             r.Route('/foo/<int:page>', endpoint='foo')
         ])
@@ -200,7 +249,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(adapter.build('foo', {'page': 2}), '/foo/2')
 
     def test_greedy(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/foo', endpoint='foo'),
             r.Route('/<path:bar>', endpoint='bar'),
             r.Route('/<path:bar>/<path:blub>', endpoint='bar')
@@ -228,7 +277,7 @@ class RoutingTestCase(unittest.TestCase):
         )
 
     def test_path(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', defaults={'name': 'FrontPage'}, endpoint='page'),
             r.Route('/Special', endpoint='special'),
             r.Route('/<int:year>', endpoint='year'),
@@ -308,7 +357,7 @@ class RoutingTestCase(unittest.TestCase):
             'REQUEST_METHOD': 'GET',
             'wsgi.url_scheme': 'http'
         }
-        map = r.URLMap([r.Route('/', endpoint='index', subdomain='wiki')])
+        map = self.make_map([r.Route('/', endpoint='index', subdomain='wiki')])
         adapter = map.bind_to_environ(env, server_name='example.com')
         self.assertEqual(
             adapter.match('/'),
@@ -328,7 +377,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(adapter.build('index'), 'http://wiki.example.com/')
 
     def test_adapter_url_parameter_sorting(self):
-        map = r.URLMap(
+        map = self.make_map(
             [r.Route('/', endpoint='index')],
             sort_parameters=True,
             sort_key=lambda x: x[1]
@@ -343,7 +392,7 @@ class RoutingTestCase(unittest.TestCase):
         )
 
     def test_request_direct_charset_bug(self):
-        map = r.URLMap([r.Route(u'/öäü/')])
+        map = self.make_map([r.Route(u'/öäü/')])
         adapter = map.bind('localhost', '/')
         try:
             adapter.match(u'/öäü')
@@ -356,7 +405,7 @@ class RoutingTestCase(unittest.TestCase):
             self.fail('expected request redirect exception')
 
     def test_request_redirect_default(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route(u'/foo', defaults={'bar': 42}),
             r.Route(u'/foo/<int:bar>'),
         ])
@@ -369,7 +418,7 @@ class RoutingTestCase(unittest.TestCase):
             self.fail('expected request redirect exception')
 
     def test_request_redirect_default_subdomain(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route(u'/foo', defaults={'bar': 42}, subdomain='test'),
             r.Route(u'/foo/<int:bar>', subdomain='other'),
         ])
@@ -383,7 +432,7 @@ class RoutingTestCase(unittest.TestCase):
 
     def test_adapter_match_return_route(self):
         route = r.Route('/foo/', endpoint='foo')
-        map = r.URLMap([route])
+        map = self.make_map([route])
         adapter = map.bind('localhost', '/')
         self.assertEqual(
             adapter.match('/foo/', return_route=True),
@@ -392,7 +441,7 @@ class RoutingTestCase(unittest.TestCase):
 
     def test_server_name_interpolation(self):
         server_name = 'example.invalid'
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', endpoint='index'),
             r.Route('/', endpoint='alt', subdomain='alt'),
         ])
@@ -432,7 +481,7 @@ class RoutingTestCase(unittest.TestCase):
             ])
         ])
 
-        url_map = r.URLMap([
+        url_map = self.make_map([
             testcase(app='test1'),
             testcase(app='test2'),
             testcase(app='test3'),
@@ -476,14 +525,14 @@ class RoutingTestCase(unittest.TestCase):
         ])
 
     def test_non_string_parts(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route('/<foo>', endpoint='foo')
         ])
         a = m.bind('example.com')
         self.assertEqual(a.build('foo', {'foo': 42}), '/42')
 
     def test_complex_routing_routes(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route('/', endpoint='index'),
             r.Route('/<int:blub>', endpoint='an_int'),
             r.Route('/<blub>', endpoint='a_string'),
@@ -593,11 +642,11 @@ class RoutingTestCase(unittest.TestCase):
             default_converters = r.URLMap.default_converters.copy()
             default_converters['foo'] = r.UnicodeConverter
         assert isinstance(r.URLMap.default_converters, ImmutableDict)
-        m = MyURLMap([
+        m = self.make_map([
             r.Route('/a/<foo:a>', endpoint='a'),
             r.Route('/b/<foo:b>', endpoint='b'),
             r.Route('/c/<c>', endpoint='c')
-        ], converters={'bar': r.UnicodeConverter})
+        ], converters={'bar': r.UnicodeConverter}, map_class=MyURLMap)
         a = m.bind('example.org', '/')
         self.assertEqual(a.match('/a/1'), ('a', {'a': '1'}))
         self.assertEqual(a.match('/b/2'), ('b', {'b': '2'}))
@@ -605,7 +654,7 @@ class RoutingTestCase(unittest.TestCase):
         assert 'foo' not in r.URLMap.default_converters
 
     def test_uuid_converter(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route('/a/<uuid:a_uuid>', endpoint='a')
         ])
         a = m.bind('example.org', '/')
@@ -613,7 +662,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(type(kwargs['a_uuid']), uuid.UUID)
 
     def test_build_append_unknown(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/bar/<float:bazf>', endpoint='barf')
         ])
         adapter = map.bind('example.org', '/', subdomain='blah')
@@ -629,8 +678,57 @@ class RoutingTestCase(unittest.TestCase):
             'http://example.org/bar/0.815'
         )
 
+    def test_build_relative_path_normalization(self):
+        m = self.make_map([
+            r.Route('/files/<path:name>', endpoint='file'),
+            r.Route('/ünïcode/<name>', endpoint='unicode'),
+        ])
+        a = m.bind('example.org', '/app')
+        self.assertEqual(a.build('file', {'name': 'a/b'}), '/app/files/a/b')
+        self.assertEqual(a.build('file', {'name': 'a/../b'}), '/app/files/b')
+        self.assertEqual(a.build('file', {'name': 'a//b'}), '/app/files/a/b')
+        self.assertEqual(
+            a.build('unicode', {'name': 'x y', 'q': ['1', '2']}),
+            '/app/%C3%BCn%C3%AFcode/x%20y?q=1'
+        )
+
+    def test_build_candidates(self):
+        m = self.make_map([
+            r.Route('/all/', defaults={'page': 1}, endpoint='all'),
+            r.Route('/all/page/<int:page>', endpoint='all'),
+            r.Route('/<lang>/all/', defaults={'page': 1}, endpoint='all'),
+            r.Route('/<lang>/all/page/<int:page>', endpoint='all'),
+        ])
+
+        def candidates(values):
+            return [
+                str(route) for route in m.get_build_candidates('all', values)
+            ]
+
+        self.assertEqual(candidates({}), ['/all/'])
+        self.assertEqual(
+            candidates({'page': 2, 'q': 'x'}),
+            ['/all/', '/all/page/<int:page>'],
+        )
+        self.assertEqual(
+            candidates({'lang': 'en', 'page': 2}),
+            [
+                '/<lang>/all/', '/<lang>/all/page/<int:page>',
+                '/all/', '/all/page/<int:page>',
+            ],
+        )
+        self.assertEqual(m.get_build_candidates('missing', {}), ())
+
+        a = m.bind('example.org')
+        self.assertEqual(a.build('all', {'page': 1}), '/all/')
+        self.assertEqual(a.build('all', {'page': 2}), '/all/page/2')
+        self.assertEqual(
+            a.build('all', {'lang': 'en', 'page': 2}), '/en/all/page/2',
+        )
+        self.assertEqual(a.build('all', {'lang': 'en'}), '/en/all/')
+
     def test_protocol_joining_bug(self):
-        m = r.URLMap([r.Route('/<foo>', endpoint='x')])
+        m = self.make_map([r.Route('/<foo>', endpoint='x')])
         a = m.bind('example.org')
         self.assertEqual(a.build('x', {'foo': 'x:y'}), '/x:y')
         self.assertEqual(
@@ -639,7 +737,7 @@ class RoutingTestCase(unittest.TestCase):
         )
 
     def test_external_building_with_port(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', endpoint='index'),
         ])
         adapter = map.bind('example.org:5000', '/')
@@ -647,7 +745,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(built_url, 'http://example.org:5000/', built_url)
 
     def test_external_building_with_port_bind_to_environ(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', endpoint='index'),
         ])
         adapter = map.bind_to_environ(
@@ -658,7 +756,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(built_url, 'http://example.org:5000/', built_url)
 
     def test_external_building_with_port_bind_to_environ_bad_servername(self):
-        map = r.URLMap([
+        map = self.make_map([
             r.Route('/', endpoint='index'),
         ])
         environ = create_environ('/', 'http://example.org:5000/')
@@ -685,7 +783,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(args, ('foo', 'bar'))
 
     def test_alias_redirects(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route('/', endpoint='index'),
             r.Route('/index.html', endpoint='index', alias=True),
             r.Route('/users/', defaults={'page': 1}, endpoint='users'),
@@ -722,7 +820,7 @@ class RoutingTestCase(unittest.TestCase):
 
     def test_double_defaults(self):
         for prefix in '', '/aaa':
-            m = r.URLMap([
+            m = self.make_map([
                 r.Route(
                     prefix + '/',
                     defaults={'foo': 1, 'bar': False},
@@ -789,7 +887,7 @@ class RoutingTestCase(unittest.TestCase):
             )
 
     def test_host_matching(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route(
                 '/',
                 endpoint='index',
@@ -846,7 +944,7 @@ class RoutingTestCase(unittest.TestCase):
             self.fail('expected redirect')
 
     def test_server_name_casing(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route('/', endpoint='index', subdomain='foo')
         ])
 
@@ -868,7 +966,7 @@ class RoutingTestCase(unittest.TestCase):
             self.fail('Expected not found exception')
 
     def test_redirect_path_quoting(self):
-        url_map = r.URLMap([
+        url_map = self.make_map([
             r.Route('/<category>', defaults={'page': 1}, endpoint='category'),
             r.Route('/<category>/page/<int:page>', endpoint='category')
         ])
@@ -882,7 +980,7 @@ class RoutingTestCase(unittest.TestCase):
             self.fail('Expected redirect')
 
     def test_unicode_routes(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route(u'/войти/', endpoint='enter'),
             r.Route(u'/foo+bar/', endpoint='foobar')
         ])
@@ -919,7 +1017,7 @@ class RoutingTestCase(unittest.TestCase):
         self.assertEqual(url, 'http://xn--n3h.example.com/foo+bar/')
 
     def test_map_repr(self):
-        m = r.URLMap([
+        m = self.make_map([
             r.Route(u'/wat', endpoint='enter'),
             r.Route(u'/woop', endpoint='foobar')
         ])
@@ -928,3 +1026,293 @@ class RoutingTestCase(unittest.TestCase):
             rv,
             "URLMap([<Route '/woop' -> foobar>, <Route '/wat' -> enter>])"
         )
+
+
+class TrieMatcherTestCase(RoutingTestCase):
+    def make_map(self, *args, **kwargs):
+        kwargs.setdefault('matcher_class', r.TrieMatcher)
+        return super(TrieMatcherTestCase, self).make_map(*args, **kwargs)
+
+    def test_matcher_selection(self):
+        map = self.make_map([r.Route('/', endpoint='index')])
+        map.update()
+        self.assertIsInstance(map._matcher, r.TrieMatcher)
+
+        map = self.make_map(
+            [r.Route('/', endpoint='index')], matcher_class=r.LinearMatcher,
+        )
+        map.update()
+        self.assertIsInstance(map._matcher, r.LinearMatcher)
+
+    def test_trie_candidates(self):
+        map = self.make_map([
+            r.Route('/', endpoint='index'),
+            r.Route('/users/', endpoint='users'),
+            r.Route('/users/<int:id>', endpoint='user'),
+            r.Route('/users/<int:id>.json', endpoint='user_json'),
+            r.Route('/pages/<path:page>', endpoint='page'),
+        ])
+        map.update()
+        matcher = map._matcher
+
+        def candidates(path):
+            return [route.endpoint for route in matcher.iter_candidates(path)]
+
+        self.assertEqual(candidates('|/users/1'), ['user', 'page'])
+        self.assertEqual(candidates('|/users/1.json'), ['user_json', 'page'])
+        self.assertEqual(candidates('|/users'), ['users', 'page'])
+        self.assertEqual(candidates('|/users/'), ['users', 'page'])
+        self.assertEqual(candidates('|/missing'), ['page'])
+
+    def test_trie_subdomains(self):
+        map = self.make_map([
+            r.Route('/', endpoint='index'),
+            r.Subdomain('<string(length=2):lang>', [
+                r.Route('/', endpoint='lang_index'),
+                r.Route('/about', endpoint='about'),
+            ]),
+        ], default_subdomain='www')
+
+        adapter = map.bind('example.com', subdomain='de')
+        self.assertEqual(adapter.match('/'), ('lang_index', {'lang': 'de'}))
+        self.assertEqual(adapter.match('/about'), ('about', {'lang': 'de'}))
+
+        adapter = map.bind('example.com')
+        self.assertEqual(adapter.match('/'), ('index', {}))
+        self.assertRaises(r.NotFound, lambda: adapter.match('/about'))
+
+
+class RegexMatcherTestCase(RoutingTestCase):
+    def make_map(self, *args, **kwargs):
+        kwargs.setdefault('matcher_class', r.RegexMatcher)
+        return super(RegexMatcherTestCase, self).make_map(*args, **kwargs)
+
+    def test_validation_fallthrough(self):
+        map = self.make_map([
+            r.Route('/<int(max=10):id>', endpoint='small'),
+            r.Route('/<int:id>', endpoint='large'),
+        ])
+        adapter = map.bind('example.com')
+        self.assertEqual(adapter.match('/5'), ('small', {'id': 5}))
+        self.assertEqual(adapter.match('/50'), ('large', {'id': 50}))
+        self.assertRaises(r.NotFound, lambda: adapter.match('/foo'))
+
+    def test_too_many_routes(self):
+        class SmallRegexMatcher(r.RegexMatcher):
+            max_routes = 1
+
+        map = self.make_map([
+            r.Route('/foo', endpoint='foo'),
+            r.Route('/bar', endpoint='bar'),
+        ], matcher_class=SmallRegexMatcher)
+        adapter = map.bind('example.com')
+        self.assertEqual(adapter.match('/bar'), ('bar', {}))
+        self.assertIsNone(map._matcher._regex)
+        self.assertRaises(r.NotFound, lambda: adapter.match('/baz'))
+
+    def test_pending_routes(self):
+        class SmallRegexMatcher(r.RegexMatcher):
+            max_pending_routes = 2
+
+        map = self.make_map([
+            r.Route('/<int:id>', endpoint='show'),
+        ], matcher_class=SmallRegexMatcher)
+        adapter = map.bind('example.com')
+        self.assertEqual(adapter.match('/1'), ('show', {'id': 1}))
+        matcher = map._matcher
+
+        # inserted routes are matched with a separate expression, in order.
+        map.add_routes(
+            r.Route('/<id>', endpoint='name'),
+            r.Route('/1', endpoint='one'),
+        )
+        self.assertEqual(adapter.match('/1'), ('one', {}))
+        self.assertEqual(adapter.match('/2'), ('show', {'id': 2}))
+        self.assertEqual(adapter.match('/x'), ('name', {'id': 'x'}))
+        self.assertEqual(len(matcher._pending_routes), 2)
+
+        # and joined into the main expression once there are too many.
+        map.add_routes(r.Route('/x', endpoint='x'))
+        self.assertEqual(adapter.match('/x'), ('x', {}))
+        self.assertEqual(matcher._pending_routes, [])
+        self.assertEqual(len(matcher._compiled_routes), 4)
+        self.assertEqual(adapter.match('/y'), ('name', {'id': 'y'}))
+
+
+class MatchCacheTestCase(RoutingTestCase):
+    def make_map(self, *args, **kwargs):
+        kwargs.setdefault('match_cache_size', 16)
+        return super(MatchCacheTestCase, self).make_map(*args, **kwargs)
+
+    def test_cache_hits(self):
+        map = self.make_map([
+            r.Route('/', endpoint='index'),
+            r.Route('/foo/', endpoint='foo'),
+            r.Route('/<int:id>', endpoint='show'),
+        ])
+        adapter = map.bind('example.com')
+
+        for i in range(2):
+            self.assertEqual(adapter.match('/'), ('index', {}))
+            self.assertEqual(adapter.match('/42'), ('show', {'id': 42}))
+            self.assertRaises(r.RequestRedirect, adapter.match, '/foo')
+            self.assertRaises(r.NotFound, adapter.match, '/bar')
+
+        self.assertEqual(map.match_cache.misses, 4)
+        self.assertEqual(map.match_cache.hits, 4)
+
+    def test_cached_values_copied(self):
+        map = self.make_map([r.Route('/<int:id>', endpoint='show')])
+        adapter = map.bind('example.com')
+        endpoint, values = adapter.match('/42')
+        values['id'] = 0
+        self.assertEqual(adapter.match('/42'), ('show', {'id': 42}))
+
+    def test_cache_invalidated(self):
+        map = self.make_map([r.Route('/<int:id>', endpoint='show')])
+        adapter = map.bind('example.com')
+        self.assertRaises(r.NotFound, adapter.match, '/foo')
+
+        map.add_routes(r.Route('/foo', endpoint='foo'))
+        self.assertEqual(adapter.match('/foo'), ('foo', {}))
+
+
+class LazyRoutingTestCase(RoutingTestCase):
+    def make_map(self, *args, **kwargs):
+        kwargs.setdefault('lazy', True)
+        return super(LazyRoutingTestCase, self).make_map(*args, **kwargs)
+
+    def test_compiled_on_demand(self):
+        map = self.make_map([
+            r.Route('/foo', endpoint='foo'),
+            r.Route('/bar', endpoint='bar'),
+        ])
+        routes = {route.endpoint: route for route in map.iter_routes()}
+        self.assertIsNone(routes['foo']._regex)
+        self.assertIsNone(routes['bar']._regex)
+
+        adapter = map.bind('example.com')
+        self.assertEqual(adapter.build('foo'), '/foo')
+        self.assertIsNone(routes['foo']._regex)
+
+        self.assertEqual(adapter.match('/foo'), ('foo', {}))
+        self.assertIsNotNone(routes['foo']._regex)
+
+    def test_compile_routes(self):
+        map = self.make_map([
+            r.Route('/foo', endpoint='foo'),
+            r.Route('/bar', endpoint='bar', build_only=True),
+        ])
+        map.compile_routes()
+        for route in map.iter_routes():
+            self.assertEqual(route._regex is None, route.build_only)
+
+        map.add_routes(r.Route('/baz', endpoint='baz'))
+        map.compile_routes(background=True).join()
+        for route in map.iter_routes():
+            self.assertEqual(route._regex is None, route.build_only)
+
+    def test_incremental_add(self):
+        routes = [
+            r.Route('/', endpoint='index'),
+            r.Route('/<int:id>', endpoint='show'),
+            r.Route('/<id>', endpoint='show'),
+            r.Route('/foo/', endpoint='foo'),
+            r.Route('/foo/<path:rest>', endpoint='foo'),
+            r.Route('/<a>/<b>', endpoint='pair'),
+            r.Route('/bar', endpoint='bar'),
+        ]
+        expected = self.make_map(
+            [route.empty() for route in routes]
+        ).iter_routes()
+
+        map = self.make_map()
+        for route in routes:
+            map.add_routes(route.empty())
+            map.update()
+        self.assertEqual(
+            [repr(route) for route in map.iter_routes()],
+            [repr(route) for route in expected],
+        )
+
+
+def _index_view():
+    pass
+
+
+class RouteTableTestCase(unittest.TestCase):
+
+    def make_map(self, **kwargs):
+        return r.URLMap([
+            r.Route('/', endpoint=_index_view),
+            r.Route('/users/<int:id>', endpoint='user'),
+            r.Subdomain('<lang>', [r.Route('/about', endpoint='about')]),
+        ], default_subdomain='www', **kwargs)
+
+    def test_pickle(self):
+        map = self.make_map(matcher_class=r.TrieMatcher, match_cache_size=8)
+        map.compile_routes()
+
+        loaded = pickle.loads(pickle.dumps(map))
+        for route in loaded.iter_routes():
+            self.assertIsNone(route._regex)
+        self.assertEqual(loaded.fingerprint(), map.fingerprint())
+
+        adapter = loaded.bind('example.com')
+        self.assertEqual(adapter.match('/'), (_index_view, {}))
+        self.assertEqual(adapter.match('/users/1'), ('user', {'id': 1}))
+        self.assertEqual(adapter.build('user', {'id': 2}), '/users/2')
+
+        loaded.add_routes(r.Route('/extra', endpoint='extra'))
+        self.assertEqual(adapter.match('/extra'), ('extra', {}))
+
+    def test_get_fingerprint(self):
+        def make_routes():
+            return [
+                r.Route('/', endpoint=_index_view),
+                r.Route('/users/<int:id>', endpoint='user'),
+                r.Subdomain('<lang>', [r.Route('/about', endpoint='about')]),
+            ]
+
+        routes = make_routes()
+        fingerprint = r.URLMap.get_fingerprint(
+            routes, default_subdomain='www',
+        )
+        # no routes are bound when computing the fingerprint up front
+        self.assertIsNone(routes[0].router)
+        self.assertEqual(self.make_map().fingerprint(), fingerprint)
+        self.assertNotEqual(
+            r.URLMap.get_fingerprint(make_routes()), fingerprint,
+        )
+        self.assertEqual(
+            r.URLMap.get_fingerprint(
+                make_routes(), default_subdomain='www', match_cache_size=8,
+            ),
+            self.make_map(match_cache_size=8).fingerprint(),
+        )
+
+    def test_fingerprint(self):
+        fingerprint = self.make_map().fingerprint()
+        self.assertEqual(self.make_map().fingerprint(), fingerprint)
+        for options in [
+            {'lazy': True},
+            {'strict_slashes': False},
+            {'sort_parameters': True},
+            {'sort_key': len},
+            {'encoding_errors': 'strict'},
+            {'match_cache_size': 8},
+            {'matcher_class': r.TrieMatcher},
+        ]:
+            self.assertNotEqual(
+                self.make_map(**options).fingerprint(), fingerprint, options,
+            )
+
+        # binding and compiling the routes does not change the fingerprint
+        map = self.make_map()
+        map.compile_routes()
+        map.bind('example.com')
+        self.assertEqual(map.fingerprint(), fingerprint)
+
+        map = self.make_map()
+        map.add_routes(r.Route('/extra', endpoint='extra'))
+        self.assertNotEqual(map.fingerprint(), fingerprint)
@@ -9,6 +9,8 @@
     :license:
         BSD, see LICENSE for more details.
 """
+import gzip
+import zlib
 import unittest
 
 from os import path
@@ -17,7 +19,9 @@ from tempfile import TemporaryDirectory
 from contextlib import closing
 
 from verktyg.test import create_environ, run_wsgi_app
-from verktyg.exceptions import BadRequest, ClientDisconnected
+from verktyg.exceptions import (
+    BadRequest, ClientDisconnected, RequestEntityTooLarge,
+)
 from verktyg import wsgi
 
 
@@ -228,6 +232,103 @@ class WsgiTestCase(unittest.TestCase):
         stream = wsgi.LimitedStream(io, 255)
         self.assertRaises(ClientDisconnected, stream.read)
 
+    def test_limited_stream_readinto(self):
+        class RaisingLimitedStream(wsgi.LimitedStream):
+            def on_exhausted(self):
+                raise BadRequest('input stream exhausted')
+
+        class ReadOnlyStream(object):
+            def __init__(self, data):
+                self.read = BytesIO(data).read
+                self.readline = None
+
+        for io in (BytesIO(b'123456'), ReadOnlyStream(b'123456')):
+            stream = RaisingLimitedStream(io, 5)
+            buffer = bytearray(2)
+            self.assertEqual(stream.readinto(buffer), 2)
+            self.assertEqual(buffer, b'12')
+            self.assertEqual(stream.readinto(memoryview(buffer)), 2)
+            self.assertEqual(buffer, b'34')
+            self.assertEqual(stream.tell(), 4)
+            self.assertEqual(stream.readinto1(buffer), 1)
+            self.assertEqual(buffer, b'54')
+            self.assertRaises(BadRequest, stream.readinto, buffer)
+
+        stream = wsgi.LimitedStream(BytesIO(b'123'), 3)
+        self.assertEqual(stream.readinto(bytearray(8)), 3)
+        self.assertEqual(stream.readinto(bytearray(8)), 0)
+
+        stream = wsgi.LimitedStream(BytesIO(b'123'), 8)
+        self.assertRaises(ClientDisconnected, stream.readinto, bytearray(8))
+
+    def test_limited_stream_exhaust(self):
+        io = BytesIO(b'x' * 1000)
+        stream = wsgi.LimitedStream(io, 900)
+        stream.read(10)
+        stream.exhaust(chunk_size=64)
+        self.assertTrue(stream.is_exhausted)
+        self.assertEqual(stream.tell(), 900)
+        self.assertEqual(io.tell(), 900)
+
+    def test_decompressing_stream(self):
+        data = b'The quick brown fox jumps over the lazy dog.\n' * 1000
+        compressed = {
+            'gzip': gzip.compress(data),
+            'deflate': zlib.compress(data),
+        }
+        compressobj = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw = compressobj.compress(data) + compressobj.flush()
+
+        for encoding, body in [
+            ('gzip', compressed['gzip']),
+            ('x-gzip', compressed['gzip']),
+            ('deflate', compressed['deflate']),
+            ('deflate', raw),
+        ]:
+            stream = wsgi.DecompressingStream(
+                wsgi.LimitedStream(BytesIO(body), len(body)), encoding,
+                chunk_size=64,
+            )
+            self.assertEqual(stream.read(10), data[:10])
+            buffer = bytearray(20)
+            self.assertEqual(stream.readinto(buffer), 20)
+            self.assertEqual(buffer, data[10:30])
+            self.assertEqual(stream.read(), data[30:])
+            self.assertEqual(stream.read(), b'')
+            self.assertEqual(stream.tell(), len(data))
+
+        stream = wsgi.DecompressingStream(BytesIO(b''), 'gzip')
+        self.assertEqual(stream.read(), b'')
+
+        self.assertRaises(
+            ValueError, wsgi.DecompressingStream, BytesIO(b''), 'br',
+        )
+
+    def test_decompressing_stream_limits(self):
+        data = b'\0' * (1024 * 1024)
+        body = gzip.compress(data)
+        self.assertLess(len(body), 2048)
+
+        stream = wsgi.DecompressingStream(BytesIO(body), 'gzip')
+        self.assertEqual(len(stream.read()), len(data))
+
+        stream = wsgi.DecompressingStream(
+            BytesIO(body), 'gzip', max_size=1000,
+        )
+        self.assertEqual(len(stream.read(1000)), 1000)
+        self.assertRaises(RequestEntityTooLarge, stream.read, 1)
+
+        stream = wsgi.DecompressingStream(
+            BytesIO(body), 'gzip', max_size=1000,
+        )
+        self.assertRaises(RequestEntityTooLarge, stream.read)
+
+        stream = wsgi.DecompressingStream(BytesIO(body[:-10]), 'gzip')
+        self.assertRaises(BadRequest, stream.read)
+
+        stream = wsgi.DecompressingStream(BytesIO(b'not gzip'), 'gzip')
+        self.assertRaises(BadRequest, stream.read)
+
     def test_get_host_fallback(self):
         self.assertEqual(
             wsgi.get_host({
@@ -292,6 +393,17 @@ class WsgiTestCase(unittest.TestCase):
             ))
             self.assertEqual(lines, ['abc\r', 'def\r\n', 'ghi'])
 
+    def test_make_line_iter_text_other_line_breaks(self):
+        # Only `\r`, `\n` and `\r\n` end a line, unlike `str.splitlines`.
+        data = 'a\x0cb\u2028c\r\nd\x85e\rf\x1c'
+        for buffer_size in range(1, 12):
+            lines = list(wsgi.make_line_iter(
+                StringIO(data), limit=len(data), buffer_size=buffer_size,
+            ))
+            self.assertEqual(
+                lines, ['a\x0cb\u2028c\r\n', 'd\x85e\r', 'f\x1c'],
+            )
+
     def test_iter_functions_support_iterators(self):
         data = ['abcdef\r\nghi', 'jkl\r\nmnopqrstuvwxyz\r', '\nABCDEFGHIJK']
         lines = list(wsgi.make_line_iter(data))
@@ -334,6 +446,93 @@ class WsgiTestCase(unittest.TestCase):
             rv, [b'abcdef', b'ghijkl', b'mnopqrstuvwxyz', b'ABCDEFGHIJK']
         )
 
+    def test_make_line_iter_bytes(self):
+        data = b'abc\rdef\r\nghi\n\r\nlong line\r'
+        for buffer_size in range(1, 12):
+            for as_memoryview in (False, True):
+                lines = list(wsgi.make_line_iter(
+                    BytesIO(data), limit=len(data), buffer_size=buffer_size,
+                    as_memoryview=as_memoryview,
+                ))
+                if as_memoryview:
+                    self.assertTrue(
+                        all(isinstance(line, memoryview) for line in lines)
+                    )
+                    lines = [line.tobytes() for line in lines]
+                self.assertEqual(lines, data.splitlines(True))
+
+    def test_make_line_iter_max_length(self):
+        data = b'short\r\nmuch longer\r\n'
+        for buffer_size in range(1, 12):
+            for as_memoryview in (False, True):
+                lines = list(wsgi.make_line_iter(
+                    BytesIO(data), limit=len(data), buffer_size=buffer_size,
+                    max_length=11, as_memoryview=as_memoryview,
+                ))
+                self.assertEqual(len(lines), 2)
+
+                with self.assertRaises(ValueError):
+                    list(wsgi.make_line_iter(
+                        BytesIO(data), limit=len(data),
+                        buffer_size=buffer_size, max_length=10,
+                        as_memoryview=as_memoryview,
+                    ))
+
+    def test_make_line_iter_memoryview_text(self):
+        with self.assertRaises(TypeError):
+            list(wsgi.make_line_iter(['abc'], as_memoryview=True))
+
+    def test_make_chunk_iter_split_separator(self):
+        data = b'abc<>def<><>ghi<'
+        for buffer_size in range(1, 12):
+            for as_memoryview in (False, True):
+                rv = list(wsgi.make_chunk_iter(
+                    BytesIO(data), b'<>', limit=len(data),
+                    buffer_size=buffer_size, as_memoryview=as_memoryview,
+                ))
+                self.assertEqual(
+                    [bytes(chunk) for chunk in rv],
+                    [b'abc', b'def', b'', b'ghi<'],
+                )
+
+    def test_make_chunk_iter_trailing_separator(self):
+        # As with `str.split` a trailing separator ends in an empty chunk.
+        self.assertEqual(
+            list(wsgi.make_chunk_iter(['a|b|'], '|')), ['a', 'b', ''],
+        )
+        self.assertEqual(list(wsgi.make_chunk_iter(['|'], '|')), ['', ''])
+        self.assertEqual(list(wsgi.make_chunk_iter([], '|')), [])
+
+        cases = [(b'a|b|', b'|'), (b'|', b'|'), (b'a<>', b'<>')]
+        for data, separator in cases:
+            for buffer_size in range(1, 5):
+                for as_memoryview in (False, True):
+                    rv = list(wsgi.make_chunk_iter(
+                        BytesIO(data), separator, limit=len(data),
+                        buffer_size=buffer_size, as_memoryview=as_memoryview,
+                    ))
+                    self.assertEqual(
+                        [bytes(chunk) for chunk in rv], data.split(separator),
+                    )
+
+    def test_make_chunk_iter_max_length(self):
+        data = b'abcXdefghiX'
+        for buffer_size in range(1, 12):
+            for as_memoryview in (False, True):
+                rv = list(wsgi.make_chunk_iter(
+                    BytesIO(data), b'X', limit=len(data),
+                    buffer_size=buffer_size, max_length=6,
+                    as_memoryview=as_memoryview,
+                ))
+                self.assertEqual(len(rv), 3)
+
+                with self.assertRaises(ValueError):
+                    list(wsgi.make_chunk_iter(
+                        BytesIO(data), b'X', limit=len(data),
+                        buffer_size=buffer_size, max_length=5,
+                        as_memoryview=as_memoryview,
+                    ))
+
     def test_lines_longer_buffer_size(self):
         data = '1234567890\n1234567890\n'
         for bufsize in range(1, 15):
@@ -366,6 +565,28 @@ class EnvironHeadersTestCase(unittest.TestCase):
         self.assertFalse(wsgi.EnvironHeaders({'wsgi.version': (1, 0)}))
         self.assertEqual(len(wsgi.EnvironHeaders({'wsgi.version': (1, 0)})), 0)
 
+    def test_lookup(self):
+        headers = wsgi.EnvironHeaders({
+            'HTTP_X_FORWARDED_FOR': '10.0.0.1',
+            'HTTP_CONTENT_TYPE': 'text/html',
+            'CONTENT_TYPE': 'text/plain',
+            'CONTENT_LENGTH': '42',
+            'wsgi.version': (1, 0),
+        })
+        self.assertEqual(headers['X-Forwarded-For'], '10.0.0.1')
+        self.assertEqual(headers['x-forwarded-for'], '10.0.0.1')
+        self.assertEqual(headers['Content-Type'], 'text/plain')
+        self.assertIn('content-length', headers)
+        self.assertNotIn('X-Missing', headers)
+        self.assertNotIn('Version', headers)
+        self.assertRaises(KeyError, lambda: headers['X-Missing'])
+
+        self.assertEqual(headers.getlist('X-Forwarded-For'), ['10.0.0.1'])
+        self.assertEqual(headers.getlist('Content-Length', type=int), [42])
+        self.assertEqual(headers.getlist('Content-Type', type=int), [])
+        self.assertEqual(headers.getlist('X-Missing'), [])
+        self.assertEqual(headers.get('Content-Length', type=int), 42)
+
     def test_return_type_is_unicode(self):
         # environ contains native strings; we return unicode
         headers = wsgi.EnvironHeaders({
@@ -388,3 +609,171 @@ class EnvironHeadersTestCase(unittest.TestCase):
 
         self.assertEqual(h.get('x-foo', as_bytes=True), b'\xff')
         self.assertEqual(h.get('x-foo'), u'\xff')
+
+
+class ResponseCacheMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.now = 1000.0
+
+        class TestCache(wsgi.ResponseCacheMiddleware):
+            def get_time(cache):
+                return self.now
+
+        self.cache_class = TestCache
+
+    def make_app(self, body=b'Hello World', **headers):
+        headers.setdefault('Cache_Control', 'max-age=60')
+
+        def app(environ, start_response):
+            self.calls += 1
+            start_response('200 OK', [
+                (key.replace('_', '-'), value)
+                for key, value in headers.items()
+            ])
+            return iter([body, str(self.calls).encode('ascii')])
+        return app
+
+    def get(self, app, path='/', **kwargs):
+        app_iter, status, headers = run_wsgi_app(
+            app, create_environ(path, **kwargs), buffered=True,
+        )
+        return b''.join(app_iter), status, headers
+
+    def test_basic_caching(self):
+        app = self.cache_class(self.make_app())
+
+        body, status, headers = self.get(app)
+        self.assertEqual(body, b'Hello World1')
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('Age', headers)
+
+        self.now += 30
+        body, status, headers = self.get(app)
+        self.assertEqual(body, b'Hello World1')
+        self.assertEqual(headers['Age'], '30')
+        self.assertEqual(headers['Cache-Control'], 'max-age=60')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(app.hits, 1)
+
+        body, status, headers = self.get(app, method='HEAD')
+        self.assertEqual(body, b'')
+        self.assertEqual(self.calls, 1)
+
+        self.assertEqual(self.get(app, '/?a=b')[0], b'Hello World2')
+        self.assertEqual(self.get(app, method='POST')[0], b'Hello World3')
+        self.assertEqual(self.get(app, headers={
+            'Authorization': 'Basic Zm9vOmJhcg==',
+        })[0], b'Hello World4')
+
+        self.now += 31
+        self.assertEqual(self.get(app)[0], b'Hello World5')
+        self.assertEqual(self.get(app)[0], b'Hello World5')
+
+    def test_age_header(self):
+        app = self.cache_class(self.make_app(Age='10'))
+
+        body, status, headers = self.get(app)
+        self.assertEqual(headers.getlist('Age'), ['10'])
+
+        self.now += 5
+        body, status, headers = self.get(app)
+        self.assertEqual(body, b'Hello World1')
+        self.assertEqual(headers.getlist('Age'), ['15'])
+
+        # the initial age counts towards the max age of the response.
+        self.now += 46
+        self.assertEqual(self.get(app)[0], b'Hello World2')
+
+    def test_no_cache_request(self):
+        for request_headers in [
+            {'Cache-Control': 'no-cache'}, {'Pragma': 'no-cache'},
+        ]:
+            self.calls = 0
+            app = self.cache_class(self.make_app())
+            self.assertEqual(self.get(app)[0], b'Hello World1')
+            self.assertEqual(self.get(app)[0], b'Hello World1')
+
+            body, status, headers = self.get(app, headers=request_headers)
+            self.assertEqual(body, b'Hello World2')
+            self.assertNotIn('Age', headers)
+
+            # the fresh response replaces the cached one.
+            self.assertEqual(self.get(app)[0], b'Hello World2')
+            self.assertEqual(self.calls, 2)
+
+    def test_uncacheable_responses(self):
+        for headers in [
+            {'Cache_Control': 'no-store, max-age=60'},
+            {'Cache_Control': 'private, max-age=60'},
+            {'Cache_Control': 'no-cache'},
+            {'Cache_Control': 'public'},
+            {'Cache_Control': 'max-age=0'},
+            {'Set_Cookie': 'session=abc'},
+            {'Vary': '*'},
+        ]:
+            self.calls = 0
+            app = self.cache_class(self.make_app(**headers))
+            self.get(app)
+            self.get(app)
+            self.assertEqual(self.calls, 2, headers)
+            self.assertEqual(app.size, 0)
+
+    def test_vary(self):
+        app = self.cache_class(self.make_app(Vary='Accept-Language'))
+
+        def get(language):
+            return self.get(app, headers={'Accept-Language': language})[0]
+
+        self.assertEqual(get('en'), b'Hello World1')
+        self.assertEqual(get('sv'), b'Hello World2')
+        self.assertEqual(get('en'), b'Hello World1')
+        self.assertEqual(get('sv'), b'Hello World2')
+        self.assertEqual(self.get(app)[0], b'Hello World3')
+
+    def test_stale_while_revalidate(self):
+        app = self.cache_class(self.make_app(
+            Cache_Control='max-age=60, stale-while-revalidate=30',
+        ))
+        self.get(app)
+
+        self.now += 70
+        environ = create_environ()
+        app_iter, status, headers = run_wsgi_app(app, environ)
+
+        # while the first request is revalidating the stale copy is served
+        self.assertEqual(self.get(app)[0], b'Hello World1')
+        self.assertEqual(b''.join(app_iter), b'Hello World2')
+        app_iter.close()
+        self.assertEqual(self.get(app)[0], b'Hello World2')
+
+        self.now += 100
+        self.assertEqual(self.get(app)[0], b'Hello World3')
+
+    def test_size_limits(self):
+        app = self.cache_class(
+            self.make_app(body=b'x' * 100), max_size=400, max_entry_size=200,
+        )
+        for url in ['/a', '/b', '/c', '/d']:
+            self.get(app, url)
+        self.assertLessEqual(app.size, 400)
+        self.assertEqual(self.calls, 4)
+
+        # the least recently used response has been evicted
+        self.get(app, '/d')
+        self.assertEqual(self.calls, 4)
+        self.get(app, '/a')
+        self.assertEqual(self.calls, 5)
+
+        app = self.cache_class(
+            self.make_app(body=b'x' * 300), max_entry_size=200,
+        )
+        self.get(app)
+        self.assertEqual(app.size, 0)
+
+    def test_incomplete_body(self):
+        app = self.cache_class(self.make_app())
+        app_iter, status, headers = run_wsgi_app(app, create_environ())
+        next(iter(app_iter))
+        app_iter.close()
+        self.assertEqual(app.size, 0)
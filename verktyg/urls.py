@@ -8,10 +8,13 @@
         BSD, see LICENSE for more details.
 """
 from urllib.parse import (
-    urlsplit, urlunsplit,
+    urlsplit, urlunsplit, unquote_to_bytes,
     quote as urlquote, quote_plus as urlquote_plus,
 )
 
+from verktyg.datastructures import ImmutableMultiDict
+from verktyg import exceptions
+
 
 _hexdigits = '0123456789ABCDEFabcdef'
 _hextobyte = dict(
@@ -288,3 +291,164 @@ def url_fix(s, charset='utf-8'):
     return urlunsplit(
         (url.scheme, netloc, path, qs, anchor)
     )
+
+
+class LazyURLArgs(object):
+    """Read only, multi dict like view of a raw WSGI query string that only
+    decodes what is actually asked for.
+
+    The query string is split and the keys are decoded the first time a
+    key is looked up.  Values are decoded per key on first access and
+    cached.  Iterating, comparing or calling any other method of the
+    storage class fully materializes the parameters into an instance of
+    `cls` which is then used for everything but key lookups.
+
+    As with :func:`urllib.parse.parse_qsl` parameters with an empty value
+    are dropped.
+
+    :param query_string:
+        The undecoded query string as found in the WSGI environment.
+    :param cls:
+        The class that the parameters are materialized into.
+    :param charset:
+        The character set the query string is encoded with.
+    :param errors:
+        The error handling for the charset decoding.
+    :param max_parameters:
+        If set and the query string contains more parameters than this a
+        :exc:`~verktyg.exceptions.RequestURITooLarge` exception is raised
+        before any parsing is done.
+    """
+
+    def __init__(
+        self, query_string, cls=ImmutableMultiDict,
+        charset='utf-8', errors='replace', max_parameters=None,
+    ):
+        if (
+            max_parameters is not None and
+            query_string.count('&') >= max_parameters
+        ):
+            raise exceptions.RequestURITooLarge()
+
+        self._query_string = query_string
+        self._cls = cls
+        self._charset = charset
+        self._errors = errors
+
+        self._pairs = None
+        self._index = None
+        self._values = {}
+        self._materialized = None
+
+    def _decode(self, value):
+        if '%' in value or '+' in value or not value.isascii():
+            return unquote_to_bytes(
+                value.replace('+', ' ').encode('latin1')
+            ).decode(self._charset, self._errors)
+        return value
+
+    def _get_index(self):
+        if self._index is None:
+            pairs = [
+                (key, value) for key, _, value in (
+                    pair.partition('=')
+                    for pair in self._query_string.split('&')
+                ) if value
+            ]
+
+            # Decoding all of the keys in one go is a lot cheaper than
+            # decoding them one by one.  This only goes wrong if one of the
+            # keys contains an escaped ampersand.
+            keys = self._decode('&'.join(key for key, _ in pairs)).split('&')
+            if len(keys) != len(pairs):
+                keys = [self._decode(key) for key, _ in pairs]
+
+            pairs = list(zip(keys, (value for _, value in pairs)))
+            index = {}
+            for key, value in pairs:
+                index.setdefault(key, []).append(value)
+            self._pairs = pairs
+            self._index = index
+        return self._index
+
+    def _getlist(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        values = [
+            self._decode(value)
+            for value in self._get_index().get(key, ())
+        ]
+        self._values[key] = values
+        return values
+
+    def _materialize(self):
+        if self._materialized is None:
+            self._get_index()
+            self._materialized = self._cls([
+                (key, self._decode(value)) for key, value in self._pairs
+            ])
+        return self._materialized
+
+    def __getitem__(self, key):
+        values = self._getlist(key)
+        if values:
+            return values[0]
+        raise exceptions.BadRequestKeyError(key)
+
+    def get(self, key, default=None, type=None):
+        """Return the first value for `key` or `default` if there is none.
+        Works the same as :meth:`~verktyg.datastructures.MultiDict.get`.
+        """
+        values = self._getlist(key)
+        if not values:
+            return default
+        if type is None:
+            return values[0]
+        try:
+            return type(values[0])
+        except ValueError:
+            return default
+
+    def getlist(self, key, type=None):
+        """Return the list of values for `key`.  Works the same as
+        :meth:`~verktyg.datastructures.MultiDict.getlist`.
+        """
+        values = self._getlist(key)
+        if type is None:
+            return list(values)
+        rv = []
+        for value in values:
+            try:
+                rv.append(type(value))
+            except ValueError:
+                pass
+        return rv
+
+    def __contains__(self, key):
+        return key in self._get_index()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._materialize(), name)
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __len__(self):
+        return len(self._materialize())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyURLArgs):
+            other = other._materialize()
+        return self._materialize() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self._materialize())
@@ -13,19 +13,24 @@ import re
 import os
 from io import BytesIO
 import sys
+import threading
+from collections import OrderedDict
 import posixpath
 import mimetypes
-from itertools import chain
+from itertools import chain, islice
+import zlib
 from zlib import adler32
 from time import time, mktime
 from datetime import datetime
 from functools import partial
+from operator import itemgetter
 from urllib.parse import quote as urlquote
 
 from verktyg.urls import uri_to_iri, encode_idna
 from verktyg import http
 from verktyg.http import (
-    is_resource_modified, http_date, unicodify_header_value,
+    parse_cache_control_header, is_resource_modified, http_date,
+    unicodify_header_value,
 )
 
 
@@ -276,10 +281,35 @@ def get_script_name(environ, charset='utf-8', errors='replace'):
     return path.decode(charset, errors)
 
 
+# Maps header names, as passed to `EnvironHeaders`, to the keys that they
+# are stored under in the WSGI environment.  Header names come from
+# application code so this will normally stay very small, but it is cleared
+# if it ever grows past `_environ_header_keys_max` entries.
+_environ_header_keys = {}
+_environ_header_keys_max = 1024
+
+
+def _get_environ_header_key(name):
+    try:
+        return _environ_header_keys[name]
+    except KeyError:
+        pass
+    key = name.upper().replace('-', '_')
+    if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+        key = 'HTTP_' + key
+    if len(_environ_header_keys) >= _environ_header_keys_max:
+        _environ_header_keys.clear()
+    _environ_header_keys[name] = key
+    return key
+
+
 class EnvironHeaders(http.ImmutableHeadersMixin, http.Headers):
     """Read only version of the headers from a WSGI environment.  This
     provides the same interface as `Headers` and is constructed from
     a WSGI environment.
+
+    Looking up a header goes straight to the matching environ key so does
+    not depend on the size of the environment.  Only iteration walks it.
     """
 
     def __init__(self, environ):
@@ -291,15 +321,39 @@ class EnvironHeaders(http.ImmutableHeadersMixin, http.Headers):
     def __getitem__(self, key, _get_mode=False):
         # _get_mode is a no-op for this class as there is no index but
         # used because get() calls it.
-        key = key.upper().replace('-', '_')
-        if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
-            return unicodify_header_value(self.environ[key])
-        return unicodify_header_value(self.environ['HTTP_' + key])
+        return unicodify_header_value(
+            self.environ[_get_environ_header_key(key)]
+        )
+
+    def getlist(self, key, type=None, as_bytes=False):
+        # The WSGI environment can only hold a single value per header.
+        try:
+            value = self.__getitem__(key)
+        except KeyError:
+            return []
+        if as_bytes:
+            value = value.encode('latin1')
+        if type is not None:
+            try:
+                value = type(value)
+            except ValueError:
+                return []
+        return [value]
+
+    def __contains__(self, key):
+        return _get_environ_header_key(key) in self.environ
+
+    has_key = __contains__
 
     def __len__(self):
-        # the iter is necessary because otherwise list calls our
-        # len which would call list again and so forth.
-        return len(list(iter(self)))
+        count = 0
+        for key in self.environ:
+            if key.startswith('HTTP_'):
+                if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+                    count += 1
+            elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                count += 1
+        return count
 
     def __iter__(self):
         for key, value in self.environ.items():
@@ -552,6 +606,371 @@ class DispatcherMiddleware(object):
         return app(environ, start_response)
 
 
+class _CachedResponse(object):
+    def __init__(
+        self, status, headers, body, created, max_age, stale_while_revalidate,
+    ):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.created = created
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers)
+        # Set while a request is fetching a replacement for a stale entry so
+        # that concurrent requests are served the stale copy in the meantime.
+        self.revalidating = False
+
+
+class _ResponseCacheIterator(object):
+    """Passes the body of a response through to the server, keeping a copy
+    that is stored in the cache once the body has been consumed in full.
+    """
+
+    def __init__(self, cache, environ, response, app_iter, stale):
+        self._cache = cache
+        self._environ = environ
+        self._response = response
+        self._app_iter = app_iter
+        self._next = iter(app_iter).__next__
+        self._stale = stale
+        self._body = bytearray()
+        self._complete = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = self._next()
+        except StopIteration:
+            self._complete = True
+            raise
+        if self._body is not None:
+            if len(self._body) + len(chunk) > self._cache.max_entry_size:
+                self._body = None
+            else:
+                self._body += chunk
+        return chunk
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, 'close'):
+                self._app_iter.close()
+        finally:
+            body = self._body if self._complete else None
+            self._cache._store(
+                self._environ, self._response, body, self._stale,
+            )
+
+
+class ResponseCacheMiddleware(object):
+
+    """A WSGI middleware that keeps complete responses to ``GET`` requests
+    in memory and replays them, without calling the application, for as long
+    as their ``Cache-Control`` header allows a shared cache to::
+
+        builder.add_middleware(ResponseCacheMiddleware, max_size=64 * 2 ** 20)
+
+    Responses are keyed on the URL, including the query string, and the
+    values of the request headers named in their ``Vary`` header.
+    ``HEAD`` requests are answered from cached ``GET`` responses but are
+    never cached themselves.
+
+    Only responses with a ``max-age`` or ``s-maxage`` directive are stored.
+    Responses marked ``no-store``, ``no-cache`` or ``private``, responses
+    that set cookies and responses to requests with an ``Authorization``
+    header are never cached.  Requests with a ``no-cache`` directive in their
+    ``Cache-Control`` or ``Pragma`` header are always passed on to the
+    application, but the fresh response replaces the cached one.
+
+    An ``Age`` header sent by the application is taken as the age of the
+    response when it was stored.  Cached responses are served with a single
+    ``Age`` header that includes the time spent in the cache.
+
+    Once a response with a ``stale-while-revalidate`` directive expires, the
+    next request for it is passed on to the application to fetch a fresh
+    copy.  Until that has finished, or the stale window has passed, other
+    requests are served the stale response.
+
+    :param app:
+        The WSGI application to wrap.
+    :param max_size:
+        The maximum number of bytes, counting bodies and headers, to keep
+        in the cache.  The least recently used responses are evicted first.
+    :param max_entry_size:
+        Responses larger than this are not cached.
+    """
+
+    #: status codes for which responses can be cached.
+    cacheable_statuses = frozenset([
+        200, 203, 204, 300, 301, 404, 405, 410, 414, 501,
+    ])
+
+    def __init__(
+        self, app, max_size=16 * 1024 * 1024, max_entry_size=1024 * 1024,
+    ):
+        self.app = app
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+
+        #: the number of bytes currently used by cached responses.
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        # Maps the URL part of a cache key to the (lowercased) names of the
+        # headers that its responses vary on and the number of entries
+        # stored for the URL.
+        self._vary = {}
+        self._lock = threading.Lock()
+
+    def get_time(self):
+        """Returns the current time in seconds since the epoch."""
+        return time()
+
+    def _get_url_key(self, environ):
+        return (
+            environ.get('wsgi.url_scheme'),
+            environ.get('HTTP_HOST'),
+            environ.get('SCRIPT_NAME', ''),
+            environ.get('PATH_INFO', ''),
+            environ.get('QUERY_STRING', ''),
+        )
+
+    def _get_key(self, url_key, vary, environ):
+        return url_key, vary, tuple(
+            environ.get(_get_environ_header_key(name)) for name in vary
+        )
+
+    def _requests_fresh(self, environ):
+        """Returns `True` if the client asked for a response that was not
+        served from a cache.
+        """
+        cache_control = environ.get('HTTP_CACHE_CONTROL')
+        if cache_control is not None and 'no-cache' in (
+            parse_cache_control_header(
+                cache_control, cls=http.RequestCacheControl,
+            )
+        ):
+            return True
+
+        pragma = environ.get('HTTP_PRAGMA')
+        return pragma is not None and any(
+            item.strip().lower() == 'no-cache' for item in pragma.split(',')
+        )
+
+    def _get_policy(self, status, headers):
+        """Returns the `(max_age, stale_while_revalidate, vary)` that a
+        response should be cached with, or `None` if it should not be cached.
+        """
+        try:
+            status_code = int(status.split(None, 1)[0])
+        except ValueError:
+            return None
+        if status_code not in self.cacheable_statuses:
+            return None
+
+        headers = http.Headers(headers)
+        if 'set-cookie' in headers:
+            return None
+
+        cache_control = parse_cache_control_header(
+            headers.get('cache-control'), cls=http.ResponseCacheControl,
+        )
+        if (
+            cache_control.no_store or
+            'private' in cache_control or
+            'no-cache' in cache_control
+        ):
+            return None
+
+        max_age = cache_control.s_maxage
+        if max_age is None:
+            max_age = cache_control.max_age
+        try:
+            max_age = int(max_age)
+        except (TypeError, ValueError):
+            return None
+        if max_age <= 0:
+            return None
+
+        try:
+            stale_while_revalidate = max(
+                int(cache_control.stale_while_revalidate), 0,
+            )
+        except (TypeError, ValueError):
+            stale_while_revalidate = 0
+
+        vary = set()
+        for name in headers.getlist('vary'):
+            vary.update(item.strip().lower() for item in name.split(','))
+        vary.discard('')
+        if '*' in vary:
+            return None
+
+        return max_age, stale_while_revalidate, tuple(sorted(vary))
+
+    def _lookup(self, environ, now, revalidate):
+        """Returns a `(response, stale)` tuple.  `response` is the cached
+        response that should be served, if any.  `stale` is set to an expired
+        response if it is up to this request to replace it.
+        """
+        url_key = self._get_url_key(environ)
+        with self._lock:
+            vary = self._vary.get(url_key)
+            if vary is None:
+                self.misses += 1
+                return None, None
+
+            key = self._get_key(url_key, vary[0], environ)
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None, None
+
+            age = now - response.created
+            if age < response.max_age or (
+                age < response.max_age + response.stale_while_revalidate and
+                (response.revalidating or not revalidate)
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response, None
+
+            self.misses += 1
+            if age < response.max_age + response.stale_while_revalidate:
+                response.revalidating = True
+                return None, response
+
+            self._remove(key)
+            return None, None
+
+    def _remove(self, key):
+        response = self._entries.pop(key)
+        self.size -= response.size
+        url_key = key[0]
+        vary = self._vary[url_key]
+        vary[1] -= 1
+        if not vary[1]:
+            del self._vary[url_key]
+
+    def _store(self, environ, response, body, stale):
+        if stale is not None:
+            stale.revalidating = False
+
+        if (
+            body is None or 'status' not in response or
+            response.get('exc_info') or response.get('write')
+        ):
+            return
+
+        policy = self._get_policy(response['status'], response['headers'])
+        if policy is None:
+            return
+        max_age, stale_while_revalidate, vary = policy
+
+        # The age is added again when the response is served, taking the
+        # time spent in the cache into account.
+        headers = []
+        initial_age = 0
+        for name, value in response['headers']:
+            if name.lower() == 'age':
+                try:
+                    initial_age = max(initial_age, int(value))
+                except ValueError:
+                    pass
+                continue
+            headers.append((name, value))
+
+        entry = _CachedResponse(
+            response['status'], headers, bytes(body),
+            self.get_time() - initial_age, max_age, stale_while_revalidate,
+        )
+        if entry.size > self.max_entry_size:
+            return
+
+        url_key = self._get_url_key(environ)
+        key = self._get_key(url_key, vary, environ)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._vary.setdefault(url_key, [vary, 0])
+            self._vary[url_key][0] = vary
+            self._vary[url_key][1] += 1
+            self._entries[key] = entry
+            self.size += entry.size
+
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Remove all responses from the cache.  The counters are not
+        reset.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._vary.clear()
+            self.size = 0
+
+    def __call__(self, environ, start_response):
+        method = environ.get('REQUEST_METHOD')
+        if (
+            method not in ('GET', 'HEAD') or
+            'HTTP_AUTHORIZATION' in environ
+        ):
+            return self.app(environ, start_response)
+
+        now = self.get_time()
+        if self._requests_fresh(environ):
+            cached = stale = None
+        else:
+            cached, stale = self._lookup(environ, now, method == 'GET')
+        if cached is not None:
+            headers = list(cached.headers)
+            headers.append(('Age', str(int(now - cached.created))))
+            start_response(cached.status, headers)
+            if method == 'HEAD' or not cached.body:
+                return []
+            return [cached.body]
+
+        if method == 'HEAD':
+            return self.app(environ, start_response)
+
+        response = {}
+
+        def _start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+            if exc_info is not None:
+                response['exc_info'] = True
+            write = start_response(status, headers, exc_info)
+
+            def _write(data):
+                # Data passed to the legacy write callable can not be
+                # captured, so the response must not be cached.
+                response['write'] = True
+                return write(data)
+            return _write
+
+        try:
+            app_iter = self.app(environ, _start_response)
+        except BaseException:
+            self._store(environ, response, None, stale)
+            raise
+
+        if isinstance(app_iter, list) and 'status' in response:
+            # Buffered responses can be stored straight away.
+            self._store(environ, response, b''.join(app_iter), stale)
+            return app_iter
+
+        return _ResponseCacheIterator(
+            self, environ, response, app_iter, stale,
+        )
+
+
 class ClosingIterator(object):
 
     """The WSGI specification requires that all middlewares and gateways
@@ -677,7 +1096,347 @@ def _make_chunk_iter(stream, limit, buffer_size):
         yield item
 
 
-def make_line_iter(stream, limit=None, buffer_size=10 * 1024):
+_line_endings = frozenset('\r\n')
+
+
+def _split_text_lines(data):
+    """Like ``data.splitlines(True)`` but only treats ``\r``, ``\n`` and
+    ``\r\n`` as line endings.  :meth:`str.splitlines` also splits on form
+    feeds, unicode line separators and a few other characters.
+    """
+    lines = data.splitlines(True)
+    # The last line may be unfinished either way, and is carried over.
+    if _line_endings.issuperset(
+        map(itemgetter(-1), islice(lines, len(lines) - 1))
+    ):
+        return lines
+
+    # Rejoin the lines that were split on one of the other characters.
+    result = []
+    pending = []
+    for line in lines:
+        pending.append(line)
+        if line[-1] in _line_endings:
+            result.append(''.join(pending))
+            pending = []
+    if pending:
+        result.append(''.join(pending))
+    return result
+
+
+def _split_lines(chunks, text, max_length):
+    """Splits the blocks produced by `chunks` into lines.  Each block is
+    split in one go using :meth:`~bytes.splitlines` and only the unfinished
+    line at the end of a block is carried over to the next.
+    """
+    if text:
+        cr, lf, crlf = '\r', '\n', '\r\n'
+        join = ''.join
+        splitlines = _split_text_lines
+    else:
+        cr, lf, crlf = b'\r', b'\n', b'\r\n'
+        join = b''.join
+
+        def splitlines(data):
+            return data.splitlines(True)
+
+    # Parts of the line that is still unfinished at the end of a block.
+    pending = []
+    pending_length = 0
+
+    for data in chunks:
+        lines = splitlines(data)
+
+        if pending:
+            if pending[-1][-1:] == cr:
+                # The previous block ended in a carriage return.  The line
+                # is only complete once we know that it isn't followed by
+                # a line feed.
+                if lines[0] == lf:
+                    pending.append(lf)
+                    del lines[0]
+                yield join(pending)
+                pending = []
+                pending_length = 0
+                if not lines:
+                    continue
+            else:
+                first = lines[0]
+                pending.append(first)
+                pending_length += len(first)
+                if len(lines) == 1 and first[-1:] != lf:
+                    if max_length is not None:
+                        length = pending_length - (first[-1:] == cr)
+                        if length > max_length:
+                            raise ValueError('Line exceeds maximum length')
+                    continue
+                lines[0] = join(pending)
+                pending = []
+                pending_length = 0
+
+        last = lines[-1]
+        if last[-1:] != lf:
+            pending.append(lines.pop())
+            pending_length = len(last)
+
+        if max_length is None:
+            yield from lines
+            continue
+
+        if lines and max(map(len, lines)) > max_length:
+            # Lines preceding the one that is too long are still returned.
+            for line in lines:
+                if len(line.rstrip(crlf)) > max_length:
+                    raise ValueError('Line exceeds maximum length')
+                yield line
+        else:
+            yield from lines
+        if pending_length - (last[-1:] == cr) > max_length:
+            raise ValueError('Line exceeds maximum length')
+
+    if pending:
+        yield join(pending)
+
+
+def _split_chunks(chunks, separator, text, max_length):
+    """Splits the blocks produced by `chunks` on `separator`.  Each block is
+    split in one go, only the trailing unfinished chunk is carried over.
+    """
+    if text:
+        empty, join = '', ''.join
+    else:
+        empty, join = b'', b''.join
+
+    # Searching for a multi character separator is considerably faster
+    # using a regular expression than using :meth:`bytes.split`.
+    if len(separator) > 1:
+        split = re.compile(re.escape(separator)).split
+    else:
+        def split(data):
+            return data.split(separator)
+
+    # Parts of the chunk that is still unfinished at the end of a block.
+    pending = []
+    pending_length = 0
+
+    # The last `len(separator) - 1` characters of the unfinished chunk.
+    # Used to find separators that straddle two blocks.
+    keep = len(separator) - 1
+    tail = empty
+
+    for data in chunks:
+        if tail:
+            index = (tail + data[:keep]).find(separator)
+            if index != -1:
+                cut = len(tail) - index
+                chunk = join(pending)
+                if max_length is not None and len(chunk) - cut > max_length:
+                    raise ValueError('Chunk exceeds maximum length')
+                yield chunk[:len(chunk) - cut]
+                pending = []
+                pending_length = 0
+                tail = empty
+
+                data = data[len(separator) - cut:]
+                if not data:
+                    continue
+
+        parts = split(data)
+
+        if len(parts) == 1:
+            pending.append(data)
+            pending_length += len(data)
+            if max_length is not None and pending_length - keep > max_length:
+                raise ValueError('Chunk exceeds maximum length')
+            if keep:
+                if len(data) >= keep:
+                    tail = data[-keep:]
+                else:
+                    tail = (tail + data)[-keep:]
+            continue
+
+        if pending:
+            pending.append(parts[0])
+            parts[0] = join(pending)
+
+        last = parts.pop()
+        if last:
+            pending = [last]
+            pending_length = len(last)
+            tail = last[-keep:] if keep else empty
+        else:
+            pending = []
+            pending_length = 0
+            tail = empty
+
+        if max_length is None:
+            yield from parts
+            continue
+
+        if max(map(len, parts)) > max_length:
+            for part in parts:
+                if len(part) > max_length:
+                    raise ValueError('Chunk exceeds maximum length')
+                yield part
+        else:
+            yield from parts
+        if pending_length - keep > max_length:
+            raise ValueError('Chunk exceeds maximum length')
+
+    # `chunks` is never empty, so as with :meth:`str.split` there is always
+    # a final chunk, which is empty if the input ended with a separator.
+    if max_length is not None and pending_length > max_length:
+        raise ValueError('Chunk exceeds maximum length')
+    yield join(pending)
+
+
+def _scan_lines(chunks, max_length):
+    """Splits the blocks of bytes produced by `chunks` into lines and returns
+    them as :class:`memoryview` objects.
+
+    Each block is searched for line endings and lines that fit within a block
+    are returned as views into that block.  Only a line that straddles two or
+    more blocks is assembled in a :class:`bytearray`, which is extended in
+    place as data arrives and handed over once the line is complete.
+    """
+    # The unfinished line carried over from previous blocks.
+    buf = bytearray()
+
+    for data in chunks:
+        view = memoryview(data)
+        size = len(data)
+        find = data.find
+        pos = 0
+
+        if buf and buf[-1] == 13:
+            # The previous block ended in a carriage return.  The line is
+            # only complete once we know that it isn't followed by a line
+            # feed.
+            if data[:1] == b'\n':
+                buf += b'\n'
+                pos = 1
+            yield memoryview(buf)
+            buf = bytearray()
+
+        # Index of the next carriage return and line feed at or after `pos`,
+        # or -1 if there isn't one in the block.  Both are only searched for
+        # again once they have been consumed so that each byte is scanned at
+        # most once.
+        next_lf = find(b'\n', pos)
+        next_cr = find(b'\r', pos)
+
+        while True:
+            if 0 <= next_lf < pos:
+                next_lf = find(b'\n', pos)
+            if 0 <= next_cr < pos:
+                next_cr = find(b'\r', pos)
+
+            if next_lf != -1 and (next_cr == -1 or next_lf < next_cr):
+                stop, end = next_lf, next_lf + 1
+            elif next_cr != -1 and next_cr + 1 < size:
+                stop = next_cr
+                end = next_cr + 2 if next_lf == next_cr + 1 else next_cr + 1
+            else:
+                # A carriage return at the end of the block may be the first
+                # half of a `\r\n` pair, so it is carried over as well.
+                break
+
+            if max_length is not None and len(buf) + stop - pos > max_length:
+                raise ValueError('Line exceeds maximum length')
+            if buf:
+                buf += view[pos:end]
+                yield memoryview(buf)
+                buf = bytearray()
+            else:
+                yield view[pos:end]
+            pos = end
+
+        if pos < size:
+            buf += view[pos:]
+            if max_length is not None and (
+                len(buf) - (buf[-1] == 13) > max_length
+            ):
+                raise ValueError('Line exceeds maximum length')
+
+    if buf:
+        yield memoryview(buf)
+
+
+def _scan_chunks(chunks, separator, max_length):
+    """Splits the blocks of bytes produced by `chunks` on `separator` and
+    returns the chunks as :class:`memoryview` objects.
+
+    As with :func:`_scan_lines`, chunks that fit within a block are views into
+    that block, and only chunks that straddle blocks are assembled in a
+    :class:`bytearray`.
+    """
+    separator_length = len(separator)
+
+    # As in :func:`_split_chunks`, a regular expression finds multi byte
+    # separators considerably faster than :meth:`bytes.find`.
+    if separator_length > 1:
+        search = re.compile(re.escape(separator)).search
+
+        def find(data, pos):
+            match = search(data, pos)
+            return -1 if match is None else match.start()
+    else:
+        def find(data, pos):
+            return data.find(separator, pos)
+
+    # The last `len(separator) - 1` bytes of the unfinished chunk.  Used to
+    # find separators that straddle two blocks.
+    keep = separator_length - 1
+
+    # The unfinished chunk carried over from previous blocks.
+    buf = bytearray()
+
+    for data in chunks:
+        view = memoryview(data)
+        pos = 0
+
+        if buf and keep:
+            tail = bytes(buf[-keep:])
+            index = (tail + data[:keep]).find(separator)
+            if index != -1:
+                # Trim the start of the separator that was already buffered.
+                cut = len(tail) - index
+                del buf[len(buf) - cut:]
+                if max_length is not None and len(buf) > max_length:
+                    raise ValueError('Chunk exceeds maximum length')
+                yield memoryview(buf)
+                buf = bytearray()
+                pos = separator_length - cut
+
+        index = find(data, pos)
+        while index != -1:
+            if max_length is not None and len(buf) + index - pos > max_length:
+                raise ValueError('Chunk exceeds maximum length')
+            if buf:
+                buf += view[pos:index]
+                yield memoryview(buf)
+                buf = bytearray()
+            else:
+                yield view[pos:index]
+            pos = index + separator_length
+            index = find(data, pos)
+
+        if pos < len(data):
+            buf += view[pos:]
+            if max_length is not None and len(buf) - keep > max_length:
+                raise ValueError('Chunk exceeds maximum length')
+
+    # As in :func:`_split_chunks` there is always a final, possibly empty,
+    # chunk.
+    if max_length is not None and len(buf) > max_length:
+        raise ValueError('Chunk exceeds maximum length')
+    yield memoryview(buf)
+
+
+def make_line_iter(
+    stream, limit=None, buffer_size=10 * 1024, max_length=None,
+    as_memoryview=False,
+):
     """Safely iterates line-based over an input stream.  If the input stream
     is not a :class:`LimitedStream` the `limit` parameter is mandatory.
 
@@ -690,6 +1449,9 @@ def make_line_iter(stream, limit=None, buffer_size=10 * 1024):
     If you need line-by-line processing it's strongly recommended to iterate
     over the input stream using this helper function.
 
+    Lines are terminated by ``\n``, ``\r`` or ``\r\n`` and are returned
+    with their line endings.
+
     :param stream:
         The stream or iterate to iterate over.
     :param limit:
@@ -697,40 +1459,41 @@ def make_line_iter(stream, limit=None, buffer_size=10 * 1024):
         necessary if the `stream` is a :class:`LimitedStream`.
     :param buffer_size:
         The optional buffer size.
+    :param max_length:
+        The maximum length of a line, not counting the line ending.  If a
+        longer line is encountered a :exc:`ValueError` is raised.  Without a
+        limit a single long line will be buffered in memory in its entirety.
+    :param as_memoryview:
+        If set to `True` lines read from a byte stream are returned as
+        :class:`memoryview` objects referencing the block of data they were
+        read from instead of being copied into new bytestrings.  Lines that
+        span several blocks are assembled in a new buffer.  Each view keeps
+        the block it references alive for as long as it is referenced.
+        Creating a view costs more than copying a short line, so this is only
+        faster for lines of around a kilobyte or more, and is three to four
+        times slower for lines of 80 bytes.
     """
     _iter = _make_chunk_iter(stream, limit, buffer_size)
 
-    def _iter_basic_lines():
-        buffer = []
-        while 1:
-            new_data = next(_iter, '')
-            if not new_data:
-                break
-            new_buf = []
-            for item in chain(buffer, new_data.splitlines(True)):
-                new_buf.append(item)
-                if item and item[-1:] in '\r\n':
-                    yield ''.join(new_buf)
-                    new_buf = []
-            buffer = new_buf
-        if buffer:
-            yield ''.join(buffer)
-
-    # This hackery is necessary to merge 'foo\r' and '\n' into one item
-    # of 'foo\r\n' if we were unlucky and we hit a chunk boundary.
-    previous = ''
-    for item in _iter_basic_lines():
-        if item == '\n' and previous[-1:] == '\r':
-            previous += item
-            item = ''
-        if previous:
-            yield previous
-        previous = item
-    if previous:
-        yield previous
-
-
-def make_chunk_iter(stream, separator, limit=None, buffer_size=10 * 1024):
+    first_item = next(_iter, None)
+    if first_item is None:
+        return
+
+    _iter = chain((first_item,), _iter)
+    if isinstance(first_item, str):
+        if as_memoryview:
+            raise TypeError('Cannot return memoryviews of text streams')
+        yield from _split_lines(_iter, True, max_length)
+    elif as_memoryview:
+        yield from _scan_lines(_iter, max_length)
+    else:
+        yield from _split_lines(_iter, False, max_length)
+
+
+def make_chunk_iter(
+    stream, separator, limit=None, buffer_size=10 * 1024, max_length=None,
+    as_memoryview=False,
+):
     """Works like :func:`make_line_iter` but accepts a separator
     which divides chunks.  If you want newline based processing
     you should use :func:`make_line_iter` instead as it
@@ -745,37 +1508,30 @@ def make_chunk_iter(stream, separator, limit=None, buffer_size=10 * 1024):
         necessary if the `stream` is otherwise already limited).
     :param buffer_size:
         The optional buffer size.
+    :param max_length:
+        The maximum length of a chunk, not counting the separator.  If a
+        longer chunk is encountered a :exc:`ValueError` is raised.
+    :param as_memoryview:
+        If set to `True` chunks read from a byte stream are returned as
+        :class:`memoryview` objects.  See :func:`make_line_iter`.  Unlike
+        lines, chunks are split in bulk when copied, which makes returning
+        views somewhat slower at any chunk size, and about three times slower
+        for chunks of 80 bytes.
     """
     _iter = _make_chunk_iter(stream, limit, buffer_size)
 
-    first_item = next(_iter, '')
-    if not first_item:
+    first_item = next(_iter, None)
+    if first_item is None:
         return
 
     _iter = chain((first_item,), _iter)
-    if isinstance(first_item, str):
-        _split = re.compile(r'(%s)' % re.escape(separator)).split
-        _join = ''.join
+    text = isinstance(first_item, str)
+    if as_memoryview:
+        if text:
+            raise TypeError('Cannot return memoryviews of text streams')
+        yield from _scan_chunks(_iter, separator, max_length)
     else:
-        _split = re.compile(b'(' + re.escape(separator) + b')').split
-        _join = b''.join
-
-    buffer = []
-    while 1:
-        new_data = next(_iter, '')
-        if not new_data:
-            break
-        chunks = _split(new_data)
-        new_buf = []
-        for item in chain(buffer, chunks):
-            if item == separator:
-                yield _join(new_buf)
-                new_buf = []
-            else:
-                new_buf.append(item)
-        buffer = new_buf
-    if buffer:
-        yield _join(buffer)
+        yield from _split_chunks(_iter, separator, text, max_length)
 
 
 class LimitedStream(object):
@@ -817,6 +1573,8 @@ class LimitedStream(object):
     def __init__(self, stream, limit):
         self._read = stream.read
         self._readline = stream.readline
+        self._readinto = getattr(stream, 'readinto', None)
+        self._readinto1 = getattr(stream, 'readinto1', self._readinto)
         self._pos = 0
         self.limit = limit
 
@@ -856,9 +1614,12 @@ class LimitedStream(object):
         """
         to_read = self.limit - self._pos
         chunk = chunk_size
+
+        # Discarded data is read into the same buffer over and over again.
+        buffer = memoryview(bytearray(min(to_read, chunk_size)))
         while to_read > 0:
             chunk = min(to_read, chunk)
-            self.read(chunk)
+            self.readinto(buffer[:chunk])
             to_read -= chunk
 
     def read(self, size=None):
@@ -881,6 +1642,57 @@ class LimitedStream(object):
         self._pos += len(read)
         return read
 
+    def _copy_into(self, view, data):
+        # Used to forward the result of `on_exhausted` and `on_disconnect`.
+        size = len(data)
+        view[:size] = data
+        return size
+
+    def _read_into(self, view, readinto, partial):
+        if self._pos >= self.limit:
+            return self._copy_into(view, self.on_exhausted())
+        to_read = min(self.limit - self._pos, len(view))
+        try:
+            if readinto is not None:
+                size = readinto(view[:to_read])
+            else:
+                size = self._copy_into(view, self._read(to_read))
+        except (IOError, ValueError):
+            return self._copy_into(view, self.on_disconnect())
+        if to_read and (not size or size != to_read and not partial):
+            return self._copy_into(view, self.on_disconnect())
+        self._pos += size
+        return size
+
+    def readinto(self, buffer):
+        """Read bytes into a pre-allocated, writable bytes-like object
+        instead of allocating a new bytestring.  At most `len(buffer)` bytes
+        are read and the stream is never read past its limit.
+
+        :param buffer:
+            A writable bytes-like object, for example a :class:`bytearray`
+            or a :class:`memoryview` over one.
+        :return:
+            The number of bytes read into `buffer`.
+        """
+        return self._read_into(
+            memoryview(buffer).cast('B'), self._readinto, False,
+        )
+
+    def readinto1(self, buffer):
+        """Like :meth:`readinto` but uses at most one call to the
+        underlying stream's `readinto1` method if it has one.  May return
+        fewer bytes than requested even if the limit has not been reached.
+
+        :param buffer:
+            A writable bytes-like object.
+        :return:
+            The number of bytes read into `buffer`.
+        """
+        return self._read_into(
+            memoryview(buffer).cast('B'), self._readinto1, True,
+        )
+
     def readline(self, size=None):
         """Reads one line from the stream."""
         if self._pos >= self.limit:
@@ -930,3 +1742,144 @@ class LimitedStream(object):
         if not line:
             raise StopIteration()
         return line
+
+
+class DecompressingStream(object):
+
+    """Wraps a stream of compressed data and decompresses it incrementally
+    as it is read.  Used to transparently decode request bodies that were
+    sent with a `Content-Encoding` of `gzip` or `deflate`.
+
+    Only as much of the compressed stream is read and inflated as is needed
+    to satisfy each read, so neither the compressed nor the decompressed
+    body is ever buffered in full.  Once more than `max_size` bytes have
+    been decompressed :meth:`on_too_large` is called, which by default
+    raises a :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception.
+    This protects against small payloads that decompress to huge bodies.
+
+    :param stream:
+        The stream to read the compressed data from.  This should already
+        be limited to the content length, see :func:`get_input_stream`.
+    :param encoding:
+        The content coding of the data.  One of `gzip`, `x-gzip` or
+        `deflate`.
+    :param max_size:
+        The maximum number of bytes that may be decompressed, or `None` for
+        no limit.
+    :param chunk_size:
+        The number of compressed bytes to read from `stream` at a time.
+    """
+
+    def __init__(
+        self, stream, encoding='gzip', max_size=None, chunk_size=16 * 1024,
+    ):
+        encoding = encoding.lower()
+        if encoding in ('gzip', 'x-gzip'):
+            wbits = 16 + zlib.MAX_WBITS
+        elif encoding == 'deflate':
+            wbits = zlib.MAX_WBITS
+        else:
+            raise ValueError('Unsupported content encoding: %r' % encoding)
+
+        self._read = stream.read
+        self._decompressor = zlib.decompressobj(wbits)
+        self._encoding = encoding
+        self._started = False
+        self._pos = 0
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+
+    def on_too_large(self):
+        """Called when more than `max_size` bytes would be decompressed.  By
+        default a :exc:`~verktyg.exceptions.RequestEntityTooLarge` exception
+        is raised.
+        """
+        from verktyg.exceptions import RequestEntityTooLarge
+        raise RequestEntityTooLarge()
+
+    def on_invalid(self):
+        """Called if the compressed data is corrupt or truncated.  By default
+        a :exc:`~verktyg.exceptions.BadRequest` exception is raised.
+        """
+        from verktyg.exceptions import BadRequest
+        raise BadRequest('Invalid compressed request body')
+
+    def _decompress(self, size):
+        # Returns at most `size` decompressed bytes, or an empty bytestring
+        # once the end of the compressed data has been reached.
+        while True:
+            decompressor = self._decompressor
+            if decompressor.eof:
+                return b''
+
+            data = decompressor.unconsumed_tail
+            if not data:
+                data = self._read(self.chunk_size)
+                if not data:
+                    if not self._started:
+                        # An empty body is not an error.
+                        return b''
+                    return self.on_invalid()
+
+            try:
+                rv = decompressor.decompress(data, size)
+            except zlib.error:
+                if self._encoding != 'deflate' or self._started:
+                    return self.on_invalid()
+                # Some clients send raw deflate data without a zlib header.
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                try:
+                    rv = self._decompressor.decompress(data, size)
+                except zlib.error:
+                    return self.on_invalid()
+            self._started = True
+
+            if rv:
+                return rv
+
+    def read(self, size=None):
+        """Read and decompress up to `size` bytes, or everything if size is
+        not provided.
+
+        :param size:
+            The maximum number of decompressed bytes to return.
+        """
+        if size is None or size < 0:
+            size = None
+        elif size == 0:
+            return b''
+
+        chunks = []
+        remaining = size
+        while remaining is None or remaining > 0:
+            chunk = self._decompress(remaining or self.chunk_size * 4)
+            if not chunk:
+                break
+            self._pos += len(chunk)
+            if self.max_size is not None and self._pos > self.max_size:
+                return self.on_too_large()
+            chunks.append(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+        if len(chunks) == 1:
+            return chunks[0]
+        return b''.join(chunks)
+
+    def readinto(self, buffer):
+        """Read decompressed bytes into a pre-allocated, writable bytes-like
+        object.
+
+        :return:
+            The number of bytes read into `buffer`.
+        """
+        view = memoryview(buffer).cast('B')
+        data = self.read(len(view))
+        size = len(data)
+        view[:size] = data
+        return size
+
+    def tell(self):
+        """Returns the number of decompressed bytes read so far.
+        """
+        return self._pos